@@ -40,6 +40,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Opt-in (PROFILER below); first so it times the whole stack.
+    'core.profiling.SlowRequestProfilerMiddleware',
+    'core.slow_queries.SlowQueryMiddleware',  # opt-in (SLOW_QUERY_LOG below)
     'django.middleware.security.SecurityMiddleware',
     "whitenoise.middleware.WhiteNoiseMiddleware",
     'corsheaders.middleware.CorsMiddleware',
@@ -47,6 +50,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.sharding.ShardMiddleware',  # only with more than one shard
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -88,14 +92,86 @@ WSGI_APPLICATION = 'config.wsgi.application'
 #     }
 # }
 
+# SQLite URLs (local testing, see config.test_settings) take no SSL options.
 DATABASES = {
     "default": dj_database_url.config(
         default=os.environ.get("DATABASE_URL"),
         conn_max_age=600,
-        ssl_require=True,
+        ssl_require=not os.environ.get("DATABASE_URL", "").startswith("sqlite:"),
     )
 }
 
+# core.sharding: extra databases for user-owned rows, as a comma-separated
+# SHARD_DATABASE_URLS (aliases shard_1, shard_2, ...). The default database
+# keeps the user directory and is a shard itself. Without it everything
+# lives on default and the router stays out of the way.
+for _index, _url in enumerate(filter(None, os.getenv("SHARD_DATABASE_URLS", "").split(",")), start=1):
+    _url = _url.strip()
+    DATABASES[f"shard_{_index}"] = dj_database_url.parse(
+        _url, conn_max_age=600, ssl_require=not _url.startswith("sqlite:")
+    )
+SHARDS = list(DATABASES)
+DATABASE_ROUTERS = ["core.sharding.ShardRouter"]
+
+# Covering-index INCLUDE columns only exist on PostgreSQL; SQLite (local dev,
+# tests) builds the same indexes without them, which is fine.
+SILENCED_SYSTEM_CHECKS = ["models.W040"]
+
+
+# Cache
+# Process-local by default. Set REDIS_URL so every worker/machine shares one
+# cache (single-flight coordination, response caches, throttling).
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    }
+
+# core.singleflight: coalescing of identical report / analysis / PDF work.
+SINGLE_FLIGHT = {
+    "LOCK_TIMEOUT": int(os.getenv("SINGLE_FLIGHT_LOCK_TIMEOUT", "60")),
+    "WAIT_TIMEOUT": int(os.getenv("SINGLE_FLIGHT_WAIT_TIMEOUT", "30")),
+    "RESULT_TTL": int(os.getenv("SINGLE_FLIGHT_RESULT_TTL", "30")),
+}
+
+# core.response_cache: windows (seconds) per endpoint ("<endpoint>" or
+# "<endpoint>:<variant>") and plan. "fresh" is how long an up-to-date entry
+# is trusted; "max_stale" how long an outdated one may still be served while
+# it is recomputed in the background. Long "fresh" windows let the nightly
+# warm_caches run carry over to the morning. Unlisted combinations are
+# recomputed on every request.
+RESPONSE_CACHE = {
+    "weekly-dashboard": {
+        "free": {"fresh": 86400, "max_stale": 0},
+        "plus": {"fresh": 86400, "max_stale": 0},
+    },
+    "reports": {
+        "free": {"fresh": 86400, "max_stale": 0},
+        "plus": {"fresh": 86400, "max_stale": 0},
+    },
+    "reports:thisyear": {
+        "free": {"fresh": 86400, "max_stale": 600},
+        "plus": {"fresh": 86400, "max_stale": 3600},
+    },
+    "skill-analysis": {
+        "free": {"fresh": 21600, "max_stale": 300},
+        "plus": {"fresh": 21600, "max_stale": 300},
+    },
+    "skill-cooccurrence": {
+        "free": {"fresh": 86400, "max_stale": 0},
+        "plus": {"fresh": 86400, "max_stale": 0},
+    },
+}
+# "thread" refreshes stale entries in the background; "inline" refreshes
+# after serving the stale payload (tests, debugging).
+RESPONSE_CACHE_REFRESH = os.getenv("RESPONSE_CACHE_REFRESH", "thread")
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -145,4 +221,68 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # orjson-backed JSON (core.renderers); falls back to DRF's stdlib JSON.
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    'DEFAULT_THROTTLE_CLASSES': (
+        'core.throttling.CostThrottle',
+    ),
+}
+
+# core.throttling: token bucket per user (per IP when anonymous), sized by
+# plan. Every request spends its view's cost (1 by default, 2-3 for
+# analytics, 5 for reports, 15 for the "thisyear" report, 30 for PDFs) and
+# buckets refill continuously.
+THROTTLE_BUDGETS = {
+    "anon": {"capacity": 30, "refill_per_minute": 30},
+    "free": {"capacity": 120, "refill_per_minute": 60},
+    "plus": {"capacity": 240, "refill_per_minute": 120},
+}
+
+# At most this many PDFs render at once (overall / per user); further
+# requests get 503 / 429 with Retry-After instead of waiting for a worker.
+PDF_RENDER_LIMITS = {
+    "MAX_CONCURRENT": int(os.getenv("PDF_MAX_CONCURRENT", "2")),
+    "MAX_PER_USER": 1,
+    "SLOT_TIMEOUT": 120,
+    "RETRY_AFTER": 10,
+}
+
+# core.events: live dashboard events over server-sent events (/api/events/).
+# In-process delivery only reaches streams served by the same process; with
+# REDIS_URL set, events go through Redis pub/sub and reach every machine.
+EVENTS = {
+    "BROKER": "core.events.RedisBroker" if os.getenv("REDIS_URL") else "core.events.InProcessBroker",
+    "REDIS_URL": os.getenv("REDIS_URL"),
+    "KEEPALIVE": 20,
+    "MAX_STREAM_SECONDS": 3600,
+}
+
+# core.profiling: keep cProfile captures (with query log) of requests slower
+# than THRESHOLD_MS, newest MAX_PROFILES per machine; see /api/admin/profiles/.
+PROFILER = {
+    "ENABLED": os.getenv("PROFILE_SLOW_REQUESTS", "").lower() in ("1", "true"),
+    "THRESHOLD_MS": int(os.getenv("PROFILE_THRESHOLD_MS", "1000")),
+    "SAMPLE_RATE": float(os.getenv("PROFILE_SAMPLE_RATE", "1.0")),
+    "DIR": os.getenv("PROFILE_DIR"),
+    "MAX_PROFILES": 50,
+}
+
+# core.slow_queries: statements slower than THRESHOLD_MS are aggregated by
+# SQL fingerprint (python manage.py slow_queries, /api/admin/slow-queries/).
+# A sampled share of slow SELECTs get their plan captured; EXPLAIN_ANALYZE
+# re-runs them on PostgreSQL.
+SLOW_QUERY_LOG = {
+    "ENABLED": os.getenv("SLOW_QUERY_LOG", "").lower() in ("1", "true"),
+    "THRESHOLD_MS": int(os.getenv("SLOW_QUERY_MS", "200")),
+    "EXPLAIN_SAMPLE_RATE": float(os.getenv("SLOW_QUERY_EXPLAIN_RATE", "0.1")),
+    "EXPLAIN_ANALYZE": os.getenv("SLOW_QUERY_EXPLAIN_ANALYZE", "").lower() in ("1", "true"),
+    "EXPLAIN_INTERVAL": 3600,
 }
@@ -0,0 +1,22 @@
+"""
+Settings for running the test suite with sharding on.
+
+Adds two SQLite shards (see ``core.sharding``) through
+``SHARD_DATABASE_URLS``, and a SQLite default database unless
+``DATABASE_URL`` names one, so routing, user copies and moves are
+exercised:
+
+    DJANGO_SETTINGS_MODULE=config.test_settings python manage.py test core
+"""
+
+import os
+from pathlib import Path
+
+_BASE_DIR = Path(__file__).resolve().parent.parent
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_BASE_DIR / 'test_default.sqlite3'}")
+os.environ.setdefault(
+    "SHARD_DATABASE_URLS",
+    ",".join(f"sqlite:///{_BASE_DIR / f'test_shard_{index}.sqlite3'}" for index in (1, 2)),
+)
+
+from config.settings import *  # noqa: E402,F401,F403
@@ -1,6 +1,91 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import QueryDict
+from django.utils.functional import cached_property
 
-from core.models import Activity, ActivitySkill, Child, SkillCategory, Subscription, Suggestion, User
+from core.models import Activity, ActivitySkill, Child, SkillCategory, SlowQuery, Subscription, Suggestion, User
+from core.sharding import is_sharded, shard_aliases
+
+# Below this many rows an exact COUNT(*) is cheap enough to keep.
+ESTIMATED_COUNT_THRESHOLD = 100_000
+
+
+class EstimatedCountPaginator(Paginator):
+	"""Uses PostgreSQL's planner estimate for unfiltered changelists of big tables.
+
+	An exact ``COUNT(*)`` over millions of rows is a full scan; the
+	``pg_class.reltuples`` estimate is maintained by ANALYZE/autovacuum and
+	is close enough for a page count. Filtered or searched changelists, small
+	tables and other databases still count exactly.
+	"""
+
+	@cached_property
+	def count(self):
+		queryset = self.object_list
+		connection = connections[queryset.db]
+		if connection.vendor == "postgresql" and not queryset.query.where:
+			with connection.cursor() as cursor:
+				cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [queryset.model._meta.db_table])
+				row = cursor.fetchone()
+			if row and row[0] >= ESTIMATED_COUNT_THRESHOLD:
+				return row[0]
+		return super().count
+
+
+SHARD_VAR = "shard"
+
+
+def _requested_shard(request) -> str:
+	"""The shard picked in the changelist filter, also carried into change/delete views."""
+	alias = request.GET.get(SHARD_VAR)
+	if alias is None:
+		alias = QueryDict(request.GET.get("_changelist_filters", "")).get(SHARD_VAR)
+	return alias if alias in shard_aliases() else DEFAULT_DB_ALIAS
+
+
+class ShardListFilter(admin.SimpleListFilter):
+	title = "shard"
+	parameter_name = SHARD_VAR
+
+	def lookups(self, request, model_admin):
+		return [(alias, alias) for alias in shard_aliases()]
+
+	def queryset(self, request, queryset):
+		return queryset  # ShardedAdmin.get_queryset already picked the database
+
+	def choices(self, changelist):
+		current = self.value() if self.value() in shard_aliases() else DEFAULT_DB_ALIAS
+		for alias, title in self.lookup_choices:
+			yield {
+				"selected": alias == current,
+				"query_string": changelist.get_query_string({self.parameter_name: alias}),
+				"display": title,
+			}
+
+
+class ShardedAdmin(admin.ModelAdmin):
+	"""User-owned rows (core.sharding): one shard at a time, ``default`` unless filtered.
+
+	Without it a changelist would show whichever shard the admin's own
+	account lives on. Saves and deletes follow the object's database.
+	"""
+
+	def get_queryset(self, request):
+		queryset = super().get_queryset(request)
+		return queryset.using(_requested_shard(request)) if is_sharded() else queryset
+
+	def get_list_filter(self, request):
+		list_filter = super().get_list_filter(request)
+		return (ShardListFilter, *list_filter) if is_sharded() else list_filter
+
+
+class LargeTableAdmin(ShardedAdmin):
+	"""Changelist settings for tables that grow with every user's history."""
+
+	paginator = EstimatedCountPaginator
+	# Skip the second, unfiltered COUNT(*) behind "N total".
+	show_full_result_count = False
 
 
 @admin.register(User)
@@ -10,16 +95,42 @@ class UserAdmin(admin.ModelAdmin):
 
 
 @admin.register(Subscription)
-class SubscriptionAdmin(admin.ModelAdmin):
+class SubscriptionAdmin(LargeTableAdmin):
 	list_display = ("user", "plan", "started_at", "ends_at", "canceled_at")
 	list_filter = ("plan",)
-	search_fields = ("user__email",)
+	list_select_related = ("user",)
+	# Exact match uses the unique index on email.
+	search_fields = ("=user__email",)
 	list_editable = ("plan",)
 	raw_id_fields = ("user",)
 
 
-admin.site.register(Child)
-admin.site.register(Activity)
-admin.site.register(ActivitySkill)
+@admin.register(Activity)
+class ActivityAdmin(LargeTableAdmin):
+	list_display = ("title", "child", "activity_date", "duration_minutes")
+	list_select_related = ("child",)
+	search_fields = ("=id", "=child__user__email")
+	date_hierarchy = "activity_date"
+	raw_id_fields = ("child",)
+
+
+@admin.register(ActivitySkill)
+class ActivitySkillAdmin(LargeTableAdmin):
+	list_display = ("id", "activity", "skill")
+	list_select_related = ("activity__child", "skill")
+	list_filter = ("skill",)
+	search_fields = ("=activity__id",)
+	raw_id_fields = ("activity", "skill")
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+	list_display = ("sql", "calls", "total_ms", "max_ms", "view", "last_seen")
+	search_fields = ("sql", "view")
+	readonly_fields = ("fingerprint", "first_seen", "explained_at")
+	ordering = ("-total_ms",)
+
+
+admin.site.register(Child, ShardedAdmin)
 admin.site.register(SkillCategory)
 admin.site.register(Suggestion)
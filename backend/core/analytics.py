@@ -0,0 +1,236 @@
+"""
+Skill-balance analytics over a child's (day × skill) incidence arrays.
+
+``load_incidence`` runs one grouped query over a child's activities in a
+date window and lays the result out as dense NumPy arrays: for every day,
+how many activities touched each skill (and their minutes), plus the number
+of distinct activities that day. Everything the dashboard, skill analysis
+and reports need — windowed counts, rich/missing classification, share of
+time, week-over-week deltas — is then an array reduction rather than a
+query or a Python counting loop.
+
+An activity tagged with several skills counts once per skill in the skill
+columns and once in the per-day activity totals.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+
+RICH_THRESHOLD = 2  # activities in the window for a skill to count as "rich"
+RICH_LIMIT = 3
+
+
+@dataclass
+class SkillIncidence:
+    start: date
+    end: date
+    skill_ids: list[int]
+    skill_names: list[str]
+    counts: np.ndarray  # (days, skills): activities touching the skill
+    minutes: np.ndarray  # (days, skills): minutes of those activities
+    activities: np.ndarray  # (days,): distinct activities
+    activity_minutes: np.ndarray  # (days,): their minutes
+
+    @property
+    def days(self) -> int:
+        return len(self.activities)
+
+    def window(self, start: date, end: date) -> SkillIncidence:
+        """The sub-range ``[start, end]`` (clipped to this incidence's range)."""
+        start, end = max(start, self.start), min(end, self.end)
+        lo, hi = (start - self.start).days, (end - self.start).days + 1
+        return SkillIncidence(
+            start=start,
+            end=end,
+            skill_ids=self.skill_ids,
+            skill_names=self.skill_names,
+            counts=self.counts[lo:hi],
+            minutes=self.minutes[lo:hi],
+            activities=self.activities[lo:hi],
+            activity_minutes=self.activity_minutes[lo:hi],
+        )
+
+    # -- reductions ---------------------------------------------------
+
+    def skill_counts(self) -> np.ndarray:
+        return self.counts.sum(axis=0)
+
+    def count_map(self) -> dict[str, int]:
+        return dict(zip(self.skill_names, self.skill_counts().tolist()))
+
+    def total_activities(self) -> int:
+        return int(self.activities.sum())
+
+    def total_minutes(self) -> int:
+        return int(self.activity_minutes.sum())
+
+    def ranked(self) -> list[tuple[str, int]]:
+        """(skill, count) by descending count; ties keep skill order."""
+        counts = self.skill_counts()
+        order = np.argsort(-counts, kind="stable")
+        return [(self.skill_names[index], int(counts[index])) for index in order]
+
+    def classify(self, rich_threshold: int = RICH_THRESHOLD, rich_limit: int = RICH_LIMIT) -> tuple[list[str], list[str]]:
+        """Rich skills (most used first) and missing skills (unused, then used once)."""
+        ranked = self.ranked()
+        rich = [name for name, count in ranked if count >= rich_threshold][:rich_limit]
+        missing = [name for name, count in ranked if count == 0] + [name for name, count in ranked if count == 1]
+        return rich, missing
+
+    def time_share(self) -> dict[str, float]:
+        """Each skill's fraction of the minutes logged against skills."""
+        minutes = self.minutes.sum(axis=0)
+        total = minutes.sum()
+        shares = minutes / total if total else np.zeros(len(minutes))
+        return dict(zip(self.skill_names, np.round(shares, 3).tolist()))
+
+    def weekly_counts(self) -> np.ndarray:
+        """(weeks, skills) counts over whole 7-day blocks ending at ``end``, oldest first."""
+        weeks = self.days // 7
+        if not weeks:
+            return np.zeros((0, len(self.skill_names)), dtype=self.counts.dtype)
+        return self.counts[self.days - weeks * 7:].reshape(weeks, 7, -1).sum(axis=1)
+
+    def week_over_week(self) -> dict[str, dict[str, int]]:
+        """Counts for the last 7 days against the 7 before, per skill."""
+        weekly = self.weekly_counts()
+        this_week = weekly[-1] if len(weekly) else np.zeros(len(self.skill_names), dtype=int)
+        last_week = weekly[-2] if len(weekly) > 1 else np.zeros_like(this_week)
+        return {
+            name: {"this_week": int(current), "last_week": int(previous), "change": int(current - previous)}
+            for name, current, previous in zip(self.skill_names, this_week, last_week)
+        }
+
+
+def skill_count_entries(incidence: SkillIncidence) -> list[dict]:
+    """``[{"skill_id", "skill", "count"}]`` for every skill, in skill order."""
+    return [
+        {"skill_id": skill_id, "skill": name, "count": count}
+        for skill_id, name, count in zip(incidence.skill_ids, incidence.skill_names, incidence.skill_counts().tolist())
+    ]
+
+
+def load_incidence(child, start: date, end: date, skills: list[tuple[int, str]] | None = None) -> SkillIncidence:
+    """Load ``child``'s activities between ``start`` and ``end`` (inclusive).
+
+    ``skills`` is the list of ``(id, name)`` columns, defaulting to every
+    skill category; the activity data itself is one grouped query.
+    """
+    return load_incidences([child.pk], start, end, skills)[child.pk]
+
+
+def load_incidences(
+    child_ids: list[int], start: date, end: date, skills: list[tuple[int, str]] | None = None
+) -> dict[int, SkillIncidence]:
+    """``load_incidence`` for several children, still from one grouped query."""
+    from core.models import Activity, ActivitySkill, SkillCategory
+
+    if skills is None:
+        skills = list(SkillCategory.objects.values_list("id", "name"))
+    column = {skill_id: index for index, (skill_id, _) in enumerate(skills)}
+    days = max((end - start).days + 1, 0)
+    incidences = {
+        child_id: SkillIncidence(
+            start=start,
+            end=end,
+            skill_ids=[skill_id for skill_id, _ in skills],
+            skill_names=[name for _, name in skills],
+            counts=np.zeros((days, len(skills)), dtype=np.int32),
+            minutes=np.zeros((days, len(skills)), dtype=np.int32),
+            activities=np.zeros(days, dtype=np.int32),
+            activity_minutes=np.zeros(days, dtype=np.int32),
+        )
+        for child_id in child_ids
+    }
+    if not days or not child_ids:
+        return incidences
+
+    # Each activity is joined once per skill; it counts towards the day's
+    # totals only on the row of its lowest skill id (or its only, skill-less row).
+    first_skill = ActivitySkill.objects.filter(activity=OuterRef("pk")).order_by("skill_id").values("skill_id")[:1]
+    once = Q(skills__isnull=True) | Q(skills__id=Subquery(first_skill))
+    rows = (
+        Activity.objects.filter(child_id__in=child_ids, activity_date__range=[start, end])
+        .values("child_id", "activity_date", "skills__id")
+        .annotate(
+            count=Count("id"),
+            minutes=Sum("duration_minutes"),
+            activities=Count("id", filter=once),
+            activity_minutes=Sum("duration_minutes", filter=once),
+        )
+        .order_by()
+    )
+    for row in rows:
+        incidence = incidences[row["child_id"]]
+        day = (row["activity_date"] - start).days
+        incidence.activities[day] += row["activities"]
+        incidence.activity_minutes[day] += row["activity_minutes"] or 0
+        skill = column.get(row["skills__id"])
+        if skill is not None:
+            incidence.counts[day, skill] = row["count"]
+            incidence.minutes[day, skill] = row["minutes"] or 0
+    return incidences
+
+
+@dataclass
+class SkillCooccurrence:
+    skill_names: list[str]
+    matrix: np.ndarray  # (skills, skills): activities tagged with both; diagonal = with the skill
+    activities: int  # activities with at least one skill
+
+    def top_pairs(self, limit: int = 10) -> list[dict]:
+        """Most frequent distinct pairs, with their Jaccard similarity."""
+        rows, cols = np.triu_indices(len(self.skill_names), k=1)
+        together = self.matrix[rows, cols]
+        either = self.matrix[rows, rows] + self.matrix[cols, cols] - together
+        jaccard = np.divide(together, either, out=np.zeros(len(together)), where=either > 0)
+        order = np.argsort(-together, kind="stable")[:limit]
+        return [
+            {
+                "skills": [self.skill_names[rows[index]], self.skill_names[cols[index]]],
+                "count": int(together[index]),
+                "jaccard": round(float(jaccard[index]), 3),
+            }
+            for index in order
+            if together[index]
+        ]
+
+
+def load_cooccurrence(child, start: date, end: date, skills: list[tuple[int, str]] | None = None) -> SkillCooccurrence:
+    """Skill × skill co-occurrence over ``child``'s activities in ``[start, end]``.
+
+    Fetches the (activity, skill) pairs in one query and forms the 0/1
+    activity × skill incidence ``B``; ``B.T @ B`` counts, for every pair of
+    skills, the activities tagged with both.
+    """
+    from core.models import ActivitySkill, SkillCategory
+
+    if skills is None:
+        skills = list(SkillCategory.objects.values_list("id", "name"))
+    pairs = np.array(
+        ActivitySkill.objects.filter(activity__child=child, activity__activity_date__range=[start, end])
+        .values_list("activity_id", "skill_id")
+        .order_by(),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+
+    # Map skill ids to columns (-1: not a known skill) and activities to rows.
+    skill_ids = np.array([skill_id for skill_id, _ in skills], dtype=np.int64)
+    lookup = np.full(max(skill_ids.max(initial=0), pairs[:, 1].max(initial=0)) + 1, -1)
+    lookup[skill_ids] = np.arange(len(skill_ids))
+    columns = lookup[pairs[:, 1]]
+    known = columns >= 0
+    activity_ids, rows = np.unique(pairs[known, 0], return_inverse=True)
+
+    incidence = np.zeros((len(activity_ids), len(skills)), dtype=np.int32)
+    incidence[rows, columns[known]] = 1
+    return SkillCooccurrence(
+        skill_names=[name for _, name in skills],
+        matrix=incidence.T @ incidence,
+        activities=len(activity_ids),
+    )
@@ -0,0 +1,248 @@
+"""
+Cold storage for activities that no visibility window can reach.
+
+Free accounts only ever see the last ``visibility_days`` (``core.plans``),
+but their old activity rows would otherwise stay in the hot tables, and in
+every index scan over them, forever. ``archive_child`` moves each whole
+month that ended more than ``ARCHIVE_GRACE_DAYS`` before the window into a
+single ``ActivityArchive`` row per child-month. The row holds the
+activities and their skill ids as zlib-compressed JSON, plus per-day and
+per-week summaries.
+
+The summaries keep archived activities in the derived data: weekly rollups
+(``core.trends``) and streaks (``core.streaks``) read them next to the live
+rows. ``restore_child`` puts the rows back with their original ids, and
+``set_user_plan`` calls it when an account moves to a plan that can see
+them.
+
+Both directions write in bulk with the per-row Activity signals suppressed,
+and update data versions, sync tombstones and heatmap blocks themselves.
+Commands: ``python manage.py archive_activities`` / ``restore_activities``.
+"""
+
+from __future__ import annotations
+
+import json
+import zlib
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from datetime import date, datetime, timedelta
+
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+
+from core.heatmap import invalidate_months, month_end
+from core.plans import PLAN_FREE, PLAN_LIMITS
+from core.sharding import atomic_for
+from core.timeseries import bucket_start
+
+# Months are archived only once they ended this long before the visibility window.
+ARCHIVE_GRACE_DAYS = 30
+RESTORE_BATCH_SIZE = 1000
+
+
+def archive_before(plan: str, today: date) -> date | None:
+    """First day of the oldest month ``plan`` keeps live (``None``: archive nothing)."""
+    visibility_days = PLAN_LIMITS.get(plan, PLAN_LIMITS[PLAN_FREE])["visibility_days"]
+    if visibility_days is None:
+        return None
+    return (today - timedelta(days=visibility_days + ARCHIVE_GRACE_DAYS)).replace(day=1)
+
+
+def archivable_children(today: date, user_ids: list[int] | None = None) -> list[tuple[int, date]]:
+    """``(child_id, archive_before)`` for every child on a plan with a visibility window."""
+    from core.models import Child
+
+    children = Child.objects.annotate(plan=Coalesce("user__subscription__plan", Value(PLAN_FREE))).order_by("pk")
+    if user_ids is not None:
+        children = children.filter(user_id__in=user_ids)
+    pending = []
+    for child_id, plan in children.values_list("pk", "plan"):
+        before = archive_before(plan, today)
+        if before is not None:
+            pending.append((child_id, before))
+    return pending
+
+
+# ------------------------------------------------------------------
+# Payload and summaries
+# ------------------------------------------------------------------
+
+def _encode(entries: list[dict]) -> bytes:
+    return zlib.compress(json.dumps(entries, separators=(",", ":")).encode())
+
+
+def _decode(payload) -> list[dict]:
+    return json.loads(zlib.decompress(bytes(payload))) if payload else []
+
+
+def _entry(row: dict, skill_ids: list[int]) -> dict:
+    return {
+        "id": row["id"],
+        "title": row["title"],
+        "notes": row["notes"],
+        "duration_minutes": row["duration_minutes"],
+        "activity_date": row["activity_date"].isoformat(),
+        "created_at": row["created_at"].isoformat(),
+        "skills": skill_ids,
+    }
+
+
+def _summaries(entries: list[dict]) -> tuple[dict, dict]:
+    """Per-day and per-week (overall and per-skill) ``[activities, minutes]``."""
+    days = defaultdict(lambda: [0, 0])
+    weeks = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+    for entry in entries:
+        minutes = entry["duration_minutes"] or 0
+        day = date.fromisoformat(entry["activity_date"])
+        week = weeks[bucket_start(day, "week").isoformat()]
+        for totals in (days[day.isoformat()], week[""], *(week[str(skill_id)] for skill_id in entry["skills"])):
+            totals[0] += 1
+            totals[1] += minutes
+    return dict(sorted(days.items())), {week: dict(skills) for week, skills in sorted(weeks.items())}
+
+
+def archived_days(child_id: int) -> list[date]:
+    """Days with archived activity for ``child_id``."""
+    from core.models import ActivityArchive
+
+    return [
+        date.fromisoformat(day)
+        for days in ActivityArchive.objects.filter(child_id=child_id).values_list("days", flat=True)
+        for day in days
+    ]
+
+
+def archived_week_totals(archives, week_start: date | None = None) -> Iterator[tuple]:
+    """``(child_id, week_start, skill_id | None, activities, minutes)`` from archive summaries.
+
+    ``archives`` is an ``ActivityArchive`` queryset; with ``week_start`` only
+    that week is reported. Skills deleted since archiving are left out.
+    """
+    from core.models import SkillCategory
+
+    rows = list(archives.values_list("child_id", "weeks"))
+    if not rows:
+        return
+    known_skills = set(SkillCategory.objects.values_list("pk", flat=True))
+    wanted = week_start.isoformat() if week_start is not None else None
+    for child_id, weeks in rows:
+        for week, totals in weeks.items():
+            if wanted is not None and week != wanted:
+                continue
+            for skill, (activities, minutes) in totals.items():
+                skill_id = int(skill) if skill else None
+                if skill_id is None or skill_id in known_skills:
+                    yield child_id, date.fromisoformat(week), skill_id, activities, minutes
+
+
+# ------------------------------------------------------------------
+# Archive / restore
+# ------------------------------------------------------------------
+
+def _archive_month(child_id: int, month: date) -> int:
+    from core.models import Activity, ActivityArchive, ActivitySkill, Child, Tombstone
+    from core.signals import suppress_activity_signals
+    from core.versioning import bump_child_version
+
+    activities = Activity.objects.filter(child_id=child_id, activity_date__range=[month, month_end(month)])
+    with atomic_for(ActivityArchive):
+        rows = list(
+            activities.order_by("activity_date", "created_at").values(
+                "id", "title", "notes", "duration_minutes", "activity_date", "created_at"
+            )
+        )
+        if not rows:
+            return 0
+        skills = defaultdict(list)
+        pairs = ActivitySkill.objects.filter(activity_id__in=[row["id"] for row in rows]).order_by("skill_id")
+        for activity_id, skill_id in pairs.values_list("activity_id", "skill_id"):
+            skills[activity_id].append(skill_id)
+
+        archive, _ = ActivityArchive.objects.select_for_update().get_or_create(child_id=child_id, month=month)
+        entries = _decode(archive.payload) + [_entry(row, skills[row["id"]]) for row in rows]
+        archive.payload = _encode(entries)
+        archive.activity_count = len(entries)
+        archive.days, archive.weeks = _summaries(entries)
+        archive.save()
+
+        # Clients drop archived rows like deleted ones; the plan can't show them.
+        user_id = Child.objects.filter(pk=child_id).values_list("user_id", flat=True).get()
+        Tombstone.objects.bulk_create(
+            Tombstone(user_id=user_id, kind=Tombstone.KIND_ACTIVITY, object_id=row["id"]) for row in rows
+        )
+        with suppress_activity_signals():
+            Activity.objects.filter(pk__in=[row["id"] for row in rows]).delete()
+        bump_child_version(child_id, user_id)
+    invalidate_months(child_id, month)
+    return len(rows)
+
+
+def archive_child(child_id: int, before: date) -> int:
+    """Archive ``child_id``'s activities dated before ``before``; returns how many."""
+    from core.models import Activity
+
+    months = Activity.objects.filter(child_id=child_id, activity_date__lt=before).dates("activity_date", "month")
+    return sum(_archive_month(child_id, month) for month in list(months))
+
+
+def restore_child(child_id: int) -> int:
+    """Move all of ``child_id``'s archived activities back; returns how many."""
+    from core.models import Activity, ActivityArchive, ActivitySkill, SkillCategory, Tombstone
+    from core.versioning import bump_child_version
+
+    restored = 0
+    with atomic_for(ActivityArchive):
+        archives = list(ActivityArchive.objects.select_for_update().filter(child_id=child_id))
+        if not archives:
+            return 0
+        known_skills = set(SkillCategory.objects.values_list("pk", flat=True))
+        for archive in archives:
+            entries = _decode(archive.payload)
+            # bulk_create stamps updated_at (so delta sync picks the rows up
+            # again) but also created_at, which is put back afterwards.
+            activities = [
+                Activity(
+                    id=entry["id"],
+                    child_id=child_id,
+                    title=entry["title"],
+                    notes=entry["notes"],
+                    duration_minutes=entry["duration_minutes"],
+                    activity_date=date.fromisoformat(entry["activity_date"]),
+                )
+                for entry in entries
+            ]
+            Activity.objects.bulk_create(activities, batch_size=RESTORE_BATCH_SIZE)
+            for activity, entry in zip(activities, entries):
+                activity.created_at = datetime.fromisoformat(entry["created_at"])
+            Activity.objects.bulk_update(activities, ["created_at"], batch_size=RESTORE_BATCH_SIZE)
+            ActivitySkill.objects.bulk_create(
+                (
+                    ActivitySkill(activity_id=entry["id"], skill_id=skill_id)
+                    for entry in entries
+                    for skill_id in entry["skills"]
+                    if skill_id in known_skills
+                ),
+                batch_size=RESTORE_BATCH_SIZE,
+            )
+            Tombstone.objects.filter(
+                kind=Tombstone.KIND_ACTIVITY, object_id__in=[entry["id"] for entry in entries]
+            ).delete()
+            archive.delete()
+            restored += len(entries)
+        bump_child_version(child_id)
+    invalidate_months(child_id, *(archive.month for archive in archives))
+    return restored
+
+
+def restore_users(user_ids: Iterable[int]) -> int:
+    """Restore every archive of the given users' children."""
+    from core.models import ActivityArchive
+
+    child_ids = (
+        ActivityArchive.objects.filter(child__user_id__in=list(user_ids))
+        .order_by("child_id")
+        .values_list("child_id", flat=True)
+        .distinct()
+    )
+    return sum(restore_child(child_id) for child_id in list(child_ids))
@@ -0,0 +1,116 @@
+"""
+In-process execution of batched API sub-requests.
+
+``POST /api/batch/`` hands a list of GET sub-requests to ``run_batch``. Each
+one is resolved against the URLconf and dispatched straight to its view,
+authenticated as the batch caller: DRF's forced authentication skips the
+per-request JWT decode, and because every sub-request carries the same user
+instance, the plan lookup cached on it by ``get_subscription`` is shared.
+Views that don't answer with JSON set ``batchable = False`` and are
+rejected up front.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from urllib.parse import urlsplit
+
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_SIZE = 20
+BATCH_PATH = "/api/batch/"
+
+# Parent request metadata a sub-request inherits (host checks, client address).
+_INHERITED_META = ("SERVER_NAME", "SERVER_PORT", "REMOTE_ADDR", "HTTP_HOST", "HTTP_X_FORWARDED_PROTO")
+# Response headers worth passing back to the client.
+_RETURNED_HEADERS = ("ETag", "Cache-Control", "Age", "Retry-After", "Content-Type")
+
+
+class BatchError(ValueError):
+    pass
+
+
+def parse_batch(payload) -> list[dict]:
+    """Validate the request body and return the sub-request specs."""
+    specs = payload.get("requests") if isinstance(payload, dict) else None
+    if not isinstance(specs, list) or not specs:
+        raise BatchError("'requests' must be a non-empty list.")
+    if len(specs) > MAX_BATCH_SIZE:
+        raise BatchError(f"A batch may contain at most {MAX_BATCH_SIZE} requests.")
+    for spec in specs:
+        if not isinstance(spec, dict) or not isinstance(spec.get("path"), str):
+            raise BatchError("Each request needs a 'path'.")
+        if spec.get("method", "GET").upper() != "GET":
+            raise BatchError("Only GET sub-requests can be batched.")
+        if not isinstance(spec.get("headers", {}), dict):
+            raise BatchError("'headers' must be an object.")
+        if not _batchable(urlsplit(spec["path"]).path):
+            raise BatchError(f"{spec['path']} does not return JSON and cannot be batched.")
+    return specs
+
+
+def _batchable(path: str) -> bool:
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return True  # answered with a 404 of its own
+    return getattr(getattr(match.func, "cls", None), "batchable", True)
+
+
+def _build_subrequest(parent, path: str, query: str, headers: dict) -> HttpRequest:
+    sub = HttpRequest()
+    sub.method = "GET"
+    sub.path = sub.path_info = path
+    sub.META = {key: parent.META[key] for key in _INHERITED_META if key in parent.META}
+    sub.META["REQUEST_METHOD"] = "GET"
+    sub.META["QUERY_STRING"] = query
+    for name, value in headers.items():
+        sub.META["HTTP_" + name.upper().replace("-", "_")] = str(value)
+    sub.GET = QueryDict(query)
+    sub.user = parent.user
+    sub._force_auth_user = parent.user
+    sub._force_auth_token = parent.auth
+    return sub
+
+
+def _body(response):
+    if isinstance(response, Response):
+        return response.data
+    if response.get("Content-Type", "").startswith("application/json") and not response.streaming:
+        return json.loads(response.content or b"null")
+    return None
+
+
+def run_subrequest(parent, spec: dict) -> dict:
+    url = urlsplit(spec["path"])
+    result = {"path": spec["path"]}
+    if not url.path.startswith("/api/") or url.path == BATCH_PATH:
+        return {**result, "status": 400, "headers": {}, "body": {"detail": "Path cannot be batched."}}
+
+    try:
+        match = resolve(url.path)
+    except Resolver404:
+        match = None
+    # Only DRF views (``as_view`` sets ``cls``); this also skips the SPA catch-all.
+    if match is None or not hasattr(match.func, "cls"):
+        return {**result, "status": 404, "headers": {}, "body": {"detail": "Not found."}}
+
+    sub = _build_subrequest(parent, url.path, url.query, spec.get("headers", {}))
+    sub.resolver_match = match
+    try:
+        response = match.func(sub, *match.args, **match.kwargs)
+    except Exception:
+        logger.exception("Batched sub-request to %s failed", url.path)
+        return {**result, "status": 500, "headers": {}, "body": {"detail": "Internal server error."}}
+
+    headers = {name: response[name] for name in _RETURNED_HEADERS if response.has_header(name)}
+    return {**result, "status": response.status_code, "headers": headers, "body": _body(response)}
+
+
+def run_batch(parent, specs: list[dict]) -> list[dict]:
+    return [run_subrequest(parent, spec) for spec in specs]
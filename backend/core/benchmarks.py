@@ -0,0 +1,215 @@
+"""
+Micro-benchmarks for ``python manage.py benchmark <target>``.
+
+Each target builds its own fixture inside a transaction that is rolled back
+afterwards, so it can run against any database (including production-like
+copies) without leaving data behind. Targets return ``Timing`` rows; the
+command prints them.
+"""
+
+from __future__ import annotations
+
+import random
+import statistics
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from django.db import transaction
+
+TARGETS: dict[str, Callable[..., list["Timing"]]] = {}
+
+
+@dataclass(frozen=True)
+class Timing:
+    name: str
+    best: float
+    median: float
+    detail: str = ""
+
+    def __str__(self) -> str:
+        line = f"{self.name:<40} best {self.best * 1000:9.1f} ms   median {self.median * 1000:9.1f} ms"
+        return f"{line}   {self.detail}" if self.detail else line
+
+
+def target(name: str):
+    def register(func):
+        TARGETS[name] = func
+        return func
+
+    return register
+
+
+def measure(name: str, func: Callable[[], object], repeat: int, detail: str = "") -> Timing:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return Timing(name, min(samples), statistics.median(samples), detail)
+
+
+class _Rollback(Exception):
+    pass
+
+
+# ------------------------------------------------------------------
+# analytics: dict counting vs. NumPy incidence arrays
+# ------------------------------------------------------------------
+
+def _legacy_report_counts(child, start: date, end: date):
+    """The per-activity counting loop ``build_report`` used before ``core.analytics``."""
+    from core.models import Activity
+
+    activities = Activity.objects.filter(child=child, activity_date__range=[start, end]).prefetch_related("skills")
+    total_minutes = sum(activity.duration_minutes or 0 for activity in activities)
+    skill_counts = {}
+    for activity in activities:
+        for skill in activity.skills.all():
+            skill_counts[skill.name] = skill_counts.get(skill.name, 0) + 1
+    return activities.count(), total_minutes, sorted(skill_counts.items(), key=lambda item: item[1], reverse=True)
+
+
+def _legacy_analysis_counts(child, start: date):
+    """The one-query-per-skill counting ``build_skill_analysis`` used before."""
+    from core.models import Activity, SkillCategory
+
+    recent = Activity.objects.filter(child=child, activity_date__gte=start)
+    return {skill.name: recent.filter(skills=skill).count() for skill in SkillCategory.objects.all()}, recent.count()
+
+
+def _vectorized_report_counts(child, start: date, end: date):
+    from core.analytics import load_incidence
+
+    incidence = load_incidence(child, start, end)
+    return incidence.total_activities(), incidence.total_minutes(), [item for item in incidence.ranked() if item[1]]
+
+
+def _vectorized_analysis_counts(child, start: date, end: date):
+    from core.analytics import load_incidence
+
+    incidence = load_incidence(child, start, end)
+    incidence.classify()
+    return incidence.count_map(), incidence.total_activities()
+
+
+def _naive_cooccurrence(child, start: date, end: date):
+    """Pair counting over every activity's ``skills.all()``."""
+    from core.models import Activity
+
+    pairs = {}
+    for activity in Activity.objects.filter(child=child, activity_date__range=[start, end]).prefetch_related("skills"):
+        names = sorted(skill.name for skill in activity.skills.all())
+        for index, first in enumerate(names):
+            for second in names[index:]:
+                pairs[first, second] = pairs.get((first, second), 0) + 1
+    return pairs
+
+
+def _make_child(activities: int, today: date):
+    from core.models import Activity, ActivitySkill, Child, SkillCategory, User
+
+    skills = list(SkillCategory.objects.all())
+    if not skills:
+        skills = [SkillCategory.objects.create(name=f"Benchmark skill {index}") for index in range(8)]
+    user = User.objects.create(email=f"benchmark-{time.time_ns()}@example.invalid")
+    child = Child.objects.create(user=user, name="Benchmark", date_of_birth=today - timedelta(days=4 * 365))
+
+    rng = random.Random(42)
+    span = 3 * 365
+    created = Activity.objects.bulk_create(
+        (
+            Activity(
+                child=child,
+                title="Benchmark activity",
+                activity_date=today - timedelta(days=rng.randrange(span)),
+                duration_minutes=rng.choice([None, 10, 15, 30, 45]),
+            )
+            for _ in range(activities)
+        ),
+        batch_size=2000,
+    )
+    ActivitySkill.objects.bulk_create(
+        (
+            ActivitySkill(activity=activity, skill=skill)
+            for activity in created
+            for skill in rng.sample(skills, rng.randint(1, min(3, len(skills))))
+        ),
+        batch_size=2000,
+    )
+    return child
+
+
+@target("analytics")
+def benchmark_analytics(activities: int = 100_000, repeat: int = 5, **options) -> list[Timing]:
+    from core.analytics import load_cooccurrence
+
+    today = date.today()
+    timings = []
+    try:
+        with transaction.atomic():
+            child = _make_child(activities, today)
+            year_start = today - timedelta(days=365)
+            two_weeks_ago = today - timedelta(days=14)
+            timings += [
+                measure("report counts, 1 year (legacy)", lambda: _legacy_report_counts(child, year_start, today), repeat),
+                measure("report counts, 1 year (numpy)", lambda: _vectorized_report_counts(child, year_start, today), repeat),
+                measure("skill analysis, 14 days (legacy)", lambda: _legacy_analysis_counts(child, two_weeks_ago), repeat),
+                measure(
+                    "skill analysis, 14 days (numpy)",
+                    lambda: _vectorized_analysis_counts(child, two_weeks_ago, today),
+                    repeat,
+                ),
+                measure("co-occurrence, all time (naive)", lambda: _naive_cooccurrence(child, date.min, today), repeat),
+                measure("co-occurrence, all time (numpy)", lambda: load_cooccurrence(child, date.min, today), repeat),
+            ]
+            raise _Rollback
+    except _Rollback:
+        pass
+    return timings
+
+
+# ------------------------------------------------------------------
+# renderers: DRF's stdlib JSONRenderer vs. the orjson renderer
+# ------------------------------------------------------------------
+
+@target("renderers")
+def benchmark_renderers(activities: int = 100_000, repeat: int = 5, **options) -> list[Timing]:
+    from rest_framework.renderers import JSONRenderer
+
+    from core.renderers import FastJSONRenderer, orjson
+    from core.report_service import build_report
+    from core.serializers import ActivitySerializer
+    from core.sync import build_sync_payload
+
+    today = date.today()
+    renderers = [("stdlib", JSONRenderer())]
+    if orjson is not None:
+        renderers.append(("orjson", FastJSONRenderer()))
+    timings = []
+    try:
+        with transaction.atomic():
+            child = _make_child(activities, today)
+            payloads = {
+                "report, this year": build_report(child, "thisyear", None, today),
+                "activity list": ActivitySerializer(
+                    child.activities.prefetch_related("skills"), many=True
+                ).data,
+                "sync snapshot": build_sync_payload(child.user, None, {}),
+            }
+            for label, payload in payloads.items():
+                for renderer_name, renderer in renderers:
+                    size = len(renderer.render(payload))
+                    timings.append(
+                        measure(
+                            f"{label} ({renderer_name})",
+                            lambda: renderer.render(payload),
+                            repeat,
+                            detail=f"{size / 1024:9.1f} KiB",
+                        )
+                    )
+            raise _Rollback
+    except _Rollback:
+        pass
+    return timings
@@ -0,0 +1,123 @@
+"""
+Precompute dashboard, skill analysis and report payloads for active users.
+
+``warm_user`` fills the response cache for one user's children using the
+same entry points as the views (``core.report_service.cached_*``), so the
+warmed entries are exactly the ones the morning's requests will look up.
+The ``warm_caches`` management command drives it over all recently active
+users. Model imports are deferred so pool workers can unpickle ``warm_user``
+before ``django.setup()`` has run.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from collections import deque
+from datetime import date, timedelta
+from pathlib import Path
+
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from core.sharding import shard_aliases, use_user_shard
+
+
+def active_user_ids(days: int, after_id: int = 0, shards: list[str] | None = None) -> list[int]:
+    """Ids of users who changed a child, activity or reflection recently.
+
+    Each shard is asked about the users it holds (its copies of their
+    ``User`` rows); ``shards`` defaults to all of them.
+    """
+    from core.models import Activity, Child, Reflection, User
+
+    since = timezone.now() - timedelta(days=days)
+    recent_activity = Activity.objects.filter(child__user=OuterRef("pk"), updated_at__gte=since)
+    recent_reflection = Reflection.objects.filter(child__user=OuterRef("pk"), updated_at__gte=since)
+    recent_child = Child.objects.filter(user=OuterRef("pk"), updated_at__gte=since)
+    user_ids = []
+    for alias in shards or shard_aliases():
+        user_ids += (
+            User.objects.using(alias)
+            .filter(pk__gt=after_id, is_active=True, shard=alias)
+            .filter(Q(Exists(recent_activity)) | Q(Exists(recent_reflection)) | Q(Exists(recent_child)))
+            .values_list("pk", flat=True)
+        )
+    return sorted(user_ids)
+
+
+def warm_user(user_id: int, today: date | None = None) -> int:
+    """Recompute and store the cached payloads for every child of a user.
+
+    Returns the number of children warmed.
+    """
+    from core.models import Child, User
+    from core.plan_service import get_subscription, get_visibility_start
+    from core.report_service import (
+        DEFAULT_REPORT_TIME_RANGE,
+        cached_report,
+        cached_skill_analysis,
+        cached_weekly_dashboard,
+    )
+
+    today = today or date.today()
+    user = User.objects.get(pk=user_id)
+    with use_user_shard(user):
+        plan = get_subscription(user).plan
+        vis_start = get_visibility_start(user)
+        children = list(Child.objects.filter(user=user))
+        for child in children:
+            cached_weekly_dashboard(child, plan, vis_start, today, prime=True)
+            cached_skill_analysis(child, plan, vis_start, today, prime=True)
+            cached_report(child, plan, DEFAULT_REPORT_TIME_RANGE, vis_start, today, prime=True)
+    return len(children)
+
+
+class RateLimiter:
+    """Spaces out calls so at most ``per_second`` happen per second."""
+
+    def __init__(self, per_second: float | None):
+        self.interval = 1 / per_second if per_second else 0
+        self._next = time.monotonic()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if now < self._next:
+            time.sleep(self._next - now)
+        self._next = max(now, self._next) + self.interval
+
+
+class Checkpoint:
+    """Persists the highest user id below which every user has been warmed.
+
+    Work can finish out of order in a process pool, so the checkpoint only
+    advances over a contiguous prefix of completed ids.
+    """
+
+    def __init__(self, path: Path | None, user_ids: list[int], start_after: int = 0):
+        self.path = path
+        self._pending = deque(user_ids)
+        self._done: set[int] = set()
+        self.last_id = start_after
+
+    @staticmethod
+    def load(path: Path | None) -> int:
+        if path is None or not path.exists():
+            return 0
+        return int(json.loads(path.read_text()).get("last_user_id", 0))
+
+    def mark_done(self, user_id: int) -> None:
+        self._done.add(user_id)
+        while self._pending and self._pending[0] in self._done:
+            self.last_id = self._pending.popleft()
+            self._done.discard(self.last_id)
+
+    def save(self) -> None:
+        if self.path is not None:
+            self.path.write_text(json.dumps({"last_user_id": self.last_id}))
+
+    def clear(self) -> None:
+        if self.path is not None and self.path.exists():
+            self.path.unlink()
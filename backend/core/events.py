@@ -0,0 +1,318 @@
+"""
+Live "child changed" events for dashboards, streamed as server-sent events.
+
+The signal receivers in ``core.signals`` call ``publish_child_changed``
+when a child's activities, activity skills or reflections change. Once the
+transaction commits, one compact event per touched child goes to its
+owner's channel: the child's data version and this week's totals from the
+weekly rollups (``core.trends``). Clients update the counts they show in
+place and refetch details only when they need them.
+
+``GET /api/events/`` (``EventStreamView``) streams a user's channel. It is
+an async view: under ASGI an open stream costs an asyncio task, not a
+worker thread. It needs an ASGI server; ``runserver`` (WSGI) gets a 501.
+
+Events travel through a broker (``settings.EVENTS["BROKER"]``):
+
+* ``InProcessBroker`` delivers to streams in the same process, which is
+  all a single ASGI server process needs;
+* ``RedisBroker`` publishes through Redis pub/sub, so a write handled on
+  one machine reaches streams held open by any other. Each process keeps a
+  single Redis subscription and fans messages out locally.
+
+Events are best effort. A stream that falls behind drops its oldest
+events, and nothing is replayed after a reconnect; the ``hello`` event
+sent first on every connection carries each child's data version so the
+client can tell what changed while it was away.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+from contextlib import asynccontextmanager
+from functools import cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.timeseries import bucket_start
+
+logger = logging.getLogger(__name__)
+
+_DEFAULTS = {
+    "BROKER": "core.events.InProcessBroker",
+    "REDIS_URL": None,
+    "CHANNEL_PREFIX": "events:",
+    "QUEUE_SIZE": 64,  # undelivered events kept per stream
+    "KEEPALIVE": 20,  # seconds between comment lines on an idle stream
+    "MAX_STREAM_SECONDS": 3600,  # streams end after this; EventSource reconnects
+    "RETRY_MS": 5000,  # reconnect delay suggested to the client
+}
+
+
+def events_config() -> dict:
+    return {**_DEFAULTS, **getattr(settings, "EVENTS", {})}
+
+
+def user_channel(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+# ------------------------------------------------------------------
+# Brokers
+# ------------------------------------------------------------------
+
+class Subscription:
+    """Events for one channel, buffered for one stream."""
+
+    def __init__(self, channel: str, maxsize: int):
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+
+    def deliver(self, message: dict) -> None:
+        # Runs on self.loop. A stream that stopped reading loses its oldest event.
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout: float) -> dict | None:
+        """The next event, or ``None`` if none arrives within ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except TimeoutError:
+            return None
+
+
+class Broker:
+    def publish(self, channel: str, message: dict) -> None:
+        raise NotImplementedError
+
+    def subscribe(self, channel: str):
+        """Async context manager yielding a ``Subscription`` to ``channel``."""
+        raise NotImplementedError
+
+
+class InProcessBroker(Broker):
+    """Delivers to subscriptions in this process.
+
+    ``publish`` is called from request threads; each subscription lives on
+    an event loop, so delivery is handed to that loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions: dict[str, set[Subscription]] = {}
+
+    def publish(self, channel: str, message: dict) -> None:
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+            except RuntimeError:  # the loop has closed
+                self._remove(subscription)
+
+    def _remove(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str):
+        subscription = Subscription(channel, events_config()["QUEUE_SIZE"])
+        with self._lock:
+            self._subscriptions.setdefault(channel, set()).add(subscription)
+        try:
+            yield subscription
+        finally:
+            self._remove(subscription)
+
+
+class RedisBroker(Broker):
+    """Publishes through Redis pub/sub; each process fans out to its own streams.
+
+    The process subscribes to every event channel (one pattern subscription
+    per event loop) while it has at least one open stream.
+    """
+
+    def __init__(self, url: str | None = None):
+        self.url = url or events_config()["REDIS_URL"]
+        self.prefix = events_config()["CHANNEL_PREFIX"]
+        self._local = InProcessBroker()
+        self._client = None
+        self._listeners: dict[asyncio.AbstractEventLoop, asyncio.Task] = {}
+        self._streams: dict[asyncio.AbstractEventLoop, int] = {}
+
+    def publish(self, channel: str, message: dict) -> None:
+        import redis
+
+        if self._client is None:
+            self._client = redis.Redis.from_url(self.url)
+        try:
+            self._client.publish(self.prefix + channel, json.dumps(message, separators=(",", ":")))
+        except redis.RedisError:
+            # The write itself succeeded; open dashboards miss one update.
+            logger.warning("Could not publish event to %s", channel, exc_info=True)
+
+    async def _listen(self) -> None:
+        import redis.asyncio as aioredis
+        from redis.exceptions import RedisError
+
+        while True:
+            client = aioredis.Redis.from_url(self.url)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(self.prefix + "*")
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    channel = message["channel"].decode()[len(self.prefix):]
+                    self._local.publish(channel, json.loads(message["data"]))
+            except RedisError:
+                logger.warning("Event subscription to Redis lost; reconnecting", exc_info=True)
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str):
+        loop = asyncio.get_running_loop()
+        if loop not in self._listeners:
+            self._listeners[loop] = loop.create_task(self._listen())
+        self._streams[loop] = self._streams.get(loop, 0) + 1
+        try:
+            async with self._local.subscribe(channel) as subscription:
+                yield subscription
+        finally:
+            self._streams[loop] -= 1
+            if not self._streams[loop]:
+                del self._streams[loop]
+                self._listeners.pop(loop).cancel()
+
+
+@cache
+def get_broker() -> Broker:
+    return import_string(events_config()["BROKER"])()
+
+
+# ------------------------------------------------------------------
+# Publishing
+# ------------------------------------------------------------------
+
+class _ChildChanges:
+    """Children touched in one transaction, published by one on_commit callback."""
+
+    def __init__(self):
+        self.child_ids: set[int] = set()
+
+    def __call__(self) -> None:
+        broker = get_broker()
+        for user_id, event in child_events(sorted(self.child_ids)):
+            broker.publish(user_channel(user_id), event)
+
+
+def pending_on_commit(connection, callback_type: type):
+    """The ``callback_type`` callback already waiting on the innermost transaction, if any."""
+    if not connection.in_atomic_block:
+        return None
+    # ``atomic(savepoint=False)`` blocks record ``None``; only real savepoints
+    # can roll back on their own.
+    savepoints = set(connection.savepoint_ids) - {None}
+    for callback_savepoints, callback, *_ in connection.run_on_commit:
+        if isinstance(callback, callback_type) and callback_savepoints - {None} == savepoints:
+            return callback
+    return None
+
+
+def publish_child_changed(child_id: int, using: str | None = None) -> None:
+    """Publish a change event for ``child_id`` once the current transaction commits.
+
+    A transaction that touches the same child many times (an activity and
+    its skills, say) publishes one event for it. The callback belongs to
+    the transaction (or savepoint), so a rollback discards its events.
+    """
+    changes = pending_on_commit(transaction.get_connection(using), _ChildChanges)
+    if changes is not None:
+        changes.child_ids.add(child_id)
+        return
+    changes = _ChildChanges()
+    changes.child_ids.add(child_id)
+    # Outside a transaction this publishes straight away.
+    transaction.on_commit(changes, using=using)
+
+
+def child_events(child_ids: list[int]) -> list[tuple[int, dict]]:
+    """``(user_id, event)`` for each child that still exists."""
+    from core.models import Child, WeeklyRollup
+
+    children = list(Child.objects.filter(pk__in=child_ids).values_list("pk", "user_id", "data_version"))
+    if not children:
+        return []
+    week_start = bucket_start(timezone.localdate(), "week")
+    totals = {child_id: {"activities": 0, "minutes": 0, "skills": {}} for child_id, _, _ in children}
+    rollups = WeeklyRollup.objects.filter(child_id__in=totals, week_start=week_start).values_list(
+        "child_id", "skill_id", "activity_count", "total_minutes"
+    )
+    for child_id, skill_id, activities, minutes in rollups:
+        week = totals[child_id]
+        if skill_id is None:
+            week["activities"], week["minutes"] = activities, minutes
+        else:
+            week["skills"][str(skill_id)] = activities
+    return [
+        (
+            user_id,
+            {
+                "type": "child_changed",
+                "child_id": child_id,
+                "data_version": data_version,
+                "week_start": week_start.isoformat(),
+                **totals[child_id],
+            },
+        )
+        for child_id, user_id, data_version in children
+    ]
+
+
+def hello_event(user_id: int) -> dict:
+    from core.models import Child, User
+    from core.sharding import use_shard
+
+    # Streams outlive the request, so the user's shard is looked up here.
+    shard = User.objects.filter(pk=user_id).values_list("shard", flat=True).first() or "default"
+    with use_shard(shard):
+        versions = list(Child.objects.filter(user_id=user_id).order_by("pk").values_list("pk", "data_version"))
+    return {"type": "hello", "children": {str(child_id): version for child_id, version in versions}}
+
+
+# ------------------------------------------------------------------
+# Streaming
+# ------------------------------------------------------------------
+
+def format_event(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+
+async def event_stream(user_id: int):
+    """Server-sent events for ``user_id``: ``hello``, then changes as they come."""
+    config = events_config()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + config["MAX_STREAM_SECONDS"]
+    async with get_broker().subscribe(user_channel(user_id)) as subscription:
+        # Versions are read after subscribing, so no change falls in between.
+        hello = await sync_to_async(hello_event)(user_id)
+        yield f"retry: {config['RETRY_MS']}\n" + format_event(hello)
+        while (remaining := deadline - loop.time()) > 0:
+            event = await subscription.get(min(config["KEEPALIVE"], remaining))
+            yield ": keepalive\n\n" if event is None else format_event(event)
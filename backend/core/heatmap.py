@@ -0,0 +1,124 @@
+"""
+Per-day activity counts and minutes for calendar heatmaps.
+
+The payload packs each series as base64 little-endian ``uint16`` (values
+saturate at 65535), one entry per day from ``start``; a multi-year heatmap
+is a few kilobytes instead of the full activity history.
+
+Days are assembled from month blocks. Blocks for past months are cached
+(``heatmap:c<child>:<YYYY-MM>``) and dropped by the activity signals when a
+write touches that month; the current month, and any months missing from
+the cache, are loaded together in one grouped query.
+"""
+
+from __future__ import annotations
+
+import base64
+import calendar
+from datetime import date, timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+
+MAX_HEATMAP_DAYS = 5 * 366
+MONTH_BLOCK_TTL = 30 * 24 * 3600
+ENCODING = "base64-uint16le"
+
+
+def month_key(child_id: int, month_start: date) -> str:
+    return f"heatmap:c{child_id}:{month_start:%Y-%m}"
+
+
+def invalidate_months(child_id: int, *days: date) -> None:
+    cache.delete_many([month_key(child_id, day.replace(day=1)) for day in days if day is not None])
+
+
+def month_end(month: date) -> date:
+    return month.replace(day=calendar.monthrange(month.year, month.month)[1])
+
+
+def _months(start: date, end: date) -> list[date]:
+    months = []
+    month = start.replace(day=1)
+    while month <= end:
+        months.append(month)
+        month = month_end(month) + timedelta(days=1)
+    return months
+
+
+def _encode(values: np.ndarray) -> str:
+    packed = np.minimum(values, np.iinfo(np.uint16).max).astype("<u2")
+    return base64.b64encode(packed.tobytes()).decode("ascii")
+
+
+def _load_blocks(child, months: list[date]) -> dict[date, np.ndarray]:
+    """(2, days-in-month) count/minute blocks for ``months``, from one query."""
+    from core.models import Activity
+
+    blocks = {month: np.zeros((2, month_end(month).day), dtype=np.int32) for month in months}
+    if not months:
+        return blocks
+
+    # Merge consecutive months into date ranges to keep the WHERE clause short.
+    ranges = []
+    for month in months:
+        last_day = month_end(month)
+        if ranges and ranges[-1][1] + timedelta(days=1) == month:
+            ranges[-1][1] = last_day
+        else:
+            ranges.append([month, last_day])
+    in_ranges = Q()
+    for range_start, range_end in ranges:
+        in_ranges |= Q(activity_date__range=[range_start, range_end])
+
+    rows = (
+        Activity.objects.filter(in_ranges, child=child)
+        .values("activity_date")
+        .annotate(count=Count("id"), minutes=Sum("duration_minutes"))
+        .order_by()
+    )
+    for row in rows:
+        day = row["activity_date"]
+        block = blocks[day.replace(day=1)]
+        block[0, day.day - 1] = row["count"]
+        block[1, day.day - 1] = row["minutes"] or 0
+    return blocks
+
+
+def build_heatmap(child, start: date, end: date, today: date | None = None) -> dict:
+    """Per-day counts and minutes for ``child`` between ``start`` and ``end``.
+
+    No days if ``start`` is after ``end``.
+    """
+    today = today or date.today()
+    months = _months(start, end)
+    current_month = today.replace(day=1)
+
+    past = [month for month in months if month < current_month]
+    cached = cache.get_many([month_key(child.pk, month) for month in past])
+    blocks = {
+        month: np.frombuffer(cached[month_key(child.pk, month)], dtype=np.int32).reshape(2, -1)
+        for month in past
+        if month_key(child.pk, month) in cached
+    }
+    loaded = _load_blocks(child, [month for month in months if month not in blocks])
+    cache.set_many(
+        {month_key(child.pk, month): block.tobytes() for month, block in loaded.items() if month < current_month},
+        MONTH_BLOCK_TTL,
+    )
+    blocks.update(loaded)
+
+    series = np.concatenate([blocks[month] for month in months], axis=1) if months else np.zeros((2, 0))
+    offset = (start - start.replace(day=1)).days
+    series = series[:, offset:offset + (end - start).days + 1]
+    return {
+        "start": start,
+        "end": end,
+        "days": series.shape[1],
+        "encoding": ENCODING,
+        "counts": _encode(series[0]),
+        "minutes": _encode(series[1]),
+        "max_count": int(series[0].max(initial=0)),
+        "active_days": int(np.count_nonzero(series[0])),
+    }
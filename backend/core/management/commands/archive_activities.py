@@ -0,0 +1,60 @@
+"""
+Management command to move activities outside every visibility window into
+compressed per-month archives (see core.archive).
+
+Usage:
+    python manage.py archive_activities
+    python manage.py archive_activities --user parent@example.com
+    python manage.py archive_activities --dry-run
+    python manage.py archive_activities --shard shard_1
+"""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.archive import archivable_children, archive_child
+from core.models import Activity, User
+from core.sharding import add_shard_argument, selected_shards, use_shard
+
+
+class Command(BaseCommand):
+    help = "Archive activities that the account's plan can no longer show"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", action="append", dest="emails", help="Only this user's children (repeatable)")
+        parser.add_argument("--dry-run", action="store_true", help="Count what would be archived, change nothing")
+        add_shard_argument(parser)
+
+    def handle(self, *args, **options):
+        users = None
+        if options["emails"]:
+            rows = User.objects.filter(email__in=options["emails"]).values_list("email", "pk", "shard")
+            users = {email: (pk, shard) for email, pk, shard in rows}
+            unknown = sorted(set(options["emails"]) - set(users))
+            if unknown:
+                raise CommandError(f"No user found with email: {', '.join(unknown)}")
+
+        total = eligible = 0
+        for alias in selected_shards(options):
+            user_ids = None
+            if users is not None:
+                user_ids = [pk for pk, shard in users.values() if shard == alias]
+                if not user_ids:
+                    continue
+            with use_shard(alias):
+                pending = archivable_children(date.today(), user_ids)
+                for child_id, before in pending:
+                    if options["dry_run"]:
+                        archived = Activity.objects.filter(child_id=child_id, activity_date__lt=before).count()
+                    else:
+                        archived = archive_child(child_id, before)
+                    if archived:
+                        self.stdout.write(f"  child #{child_id}: {archived} activities before {before}")
+                    total += archived
+            eligible += len(pending)
+
+        verb = "Would archive" if options["dry_run"] else "Archived"
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ {verb} {total} activities across {eligible} eligible child(ren).")
+        )
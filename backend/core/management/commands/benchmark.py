@@ -0,0 +1,34 @@
+"""
+Management command to run micro-benchmarks against the configured database.
+
+Fixtures are created inside a transaction that is rolled back.
+
+Usage:
+    python manage.py benchmark analytics --activities 100000 --repeat 5
+    python manage.py benchmark renderers --activities 20000
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import TARGETS
+
+
+class Command(BaseCommand):
+    help = "Run a micro-benchmark (fixtures are rolled back afterwards)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("target", help=f"One of: {', '.join(sorted(TARGETS))}")
+        parser.add_argument("--activities", type=int, default=100_000, help="Activities in the fixture child")
+        parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement (default 5)")
+
+    def handle(self, *args, **options):
+        run = TARGETS.get(options["target"])
+        if run is None:
+            raise CommandError(f"Unknown target {options['target']!r}; choose from {', '.join(sorted(TARGETS))}.")
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1.")
+
+        self.stdout.write(f"Running {options['target']} benchmark…")
+        for timing in run(activities=options["activities"], repeat=options["repeat"]):
+            self.stdout.write(str(timing))
+        self.stdout.write(self.style.SUCCESS("✅ Done."))
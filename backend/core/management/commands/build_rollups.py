@@ -0,0 +1,42 @@
+"""
+Management command to rebuild the weekly rollups behind the trends endpoint.
+
+Signals keep rollups current for normal writes; run this after deploying the
+rollup table and after bulk imports that bypass signals.
+
+Usage:
+    python manage.py build_rollups
+    python manage.py build_rollups --child 12 --child 13
+    python manage.py build_rollups --shard shard_1
+"""
+
+from django.core.management.base import BaseCommand
+
+from core.models import Child
+from core.sharding import add_shard_argument, selected_shards, use_shard
+from core.trends import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild weekly activity rollups from the activity tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--child", type=int, action="append", dest="child_ids", help="Only this child (repeatable)")
+        parser.add_argument("--batch-size", type=int, default=500, help="Children rebuilt per transaction (default 500)")
+        add_shard_argument(parser)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        rows = children = 0
+        for alias in selected_shards(options):
+            with use_shard(alias):
+                child_ids = Child.objects.order_by("pk").values_list("pk", flat=True)
+                if options["child_ids"]:
+                    child_ids = child_ids.filter(pk__in=options["child_ids"])
+                child_ids = list(child_ids)
+                for offset in range(0, len(child_ids), batch_size):
+                    batch = child_ids[offset:offset + batch_size]
+                    rows += rebuild_rollups(batch)
+                    self.stdout.write(f"  {alias}: {min(offset + batch_size, len(child_ids))}/{len(child_ids)} children")
+            children += len(child_ids)
+        self.stdout.write(self.style.SUCCESS(f"✅ Wrote {rows} rollup row(s) for {children} child(ren)."))
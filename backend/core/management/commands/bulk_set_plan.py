@@ -0,0 +1,90 @@
+"""
+Management command to set the subscription plan of many users at once.
+
+Reads one user email or id per line (blank lines and lines starting with
+``#`` are skipped) from a file, or from stdin with ``-``.
+
+Usage:
+    python manage.py bulk_set_plan plus --file promo_users.txt
+    cat ids.txt | python manage.py bulk_set_plan free --file -
+    python manage.py bulk_set_plan plus --file promo_users.txt --dry-run
+"""
+
+import sys
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.plan_service import BULK_PLAN_CHUNK_SIZE, bulk_set_user_plan
+from core.plans import PLAN_FREE, PLAN_PLUS
+
+
+def _identifiers(stream):
+    for line in stream:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line
+
+
+class Command(BaseCommand):
+    help = "Set the subscription plan (free or plus) for a list of users"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "plan",
+            type=str,
+            choices=[PLAN_FREE, PLAN_PLUS],
+            help="Plan to assign (free or plus)",
+        )
+        parser.add_argument(
+            "--file",
+            default="-",
+            help="File with one email or user id per line ('-' for stdin, the default)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=BULK_PLAN_CHUNK_SIZE,
+            help=f"Users resolved and written per batch (default {BULK_PLAN_CHUNK_SIZE})",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would change without writing anything",
+        )
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be at least 1.")
+
+        def progress(result):
+            self.stdout.write(
+                f"  {result.processed} processed: {result.changed} to change, "
+                f"{result.unchanged} already on plan, {len(result.missing)} not found"
+            )
+
+        path = options["file"]
+        try:
+            stream = nullcontext(sys.stdin) if path == "-" else open(path, encoding="utf-8")
+        except OSError as exc:
+            raise CommandError(f"Cannot read {path}: {exc}")
+        with stream as lines:
+            result = bulk_set_user_plan(
+                _identifiers(lines),
+                options["plan"],
+                chunk_size=options["chunk_size"],
+                dry_run=options["dry_run"],
+                on_chunk=progress,
+            )
+
+        for identifier in result.missing[:20]:
+            self.stderr.write(f"  not found: {identifier}")
+        if len(result.missing) > 20:
+            self.stderr.write(f"  … and {len(result.missing) - 20} more")
+        verb = "Would move" if options["dry_run"] else "Moved"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {verb} {result.changed} user(s) to the {options['plan']} plan "
+                f"({result.unchanged} already on it, {len(result.missing)} not found)."
+            )
+        )
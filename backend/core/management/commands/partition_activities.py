@@ -0,0 +1,84 @@
+"""
+Management command for range partitioning of core_activity by activity_date
+(PostgreSQL only; see core.partitioning).
+
+Usage:
+    python manage.py partition_activities status
+    python manage.py partition_activities convert --scheme quarter   # maintenance window
+    python manage.py partition_activities create-future --ahead 4    # daily cron
+    python manage.py partition_activities status --shard shard_1
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.partitioning import (
+    DEFAULT_AHEAD,
+    SCHEMES,
+    PartitioningError,
+    convert_activity_table,
+    create_future_partitions,
+    current_scheme,
+    is_supported,
+    list_partitions,
+)
+from core.sharding import add_shard_argument, selected_shards
+
+
+class Command(BaseCommand):
+    help = "Convert core_activity to a date-partitioned table, add future partitions, or show the layout"
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["status", "convert", "create-future"])
+        parser.add_argument("--scheme", choices=SCHEMES, default="year", help="Partition size for convert (default year)")
+        parser.add_argument(
+            "--ahead",
+            type=int,
+            default=DEFAULT_AHEAD,
+            help=f"Partitions to keep ready after the current one (default {DEFAULT_AHEAD})",
+        )
+        add_shard_argument(parser)
+
+    def handle(self, *args, **options):
+        if options["ahead"] < 0:
+            raise CommandError("--ahead must not be negative.")
+        # Each shard has its own core_activity.
+        for alias in selected_shards(options):
+            self._handle_database(alias, options)
+
+    def _handle_database(self, alias: str, options: dict):
+        if not is_supported(alias):
+            self.stdout.write(
+                f"{alias}: partitioning needs PostgreSQL; {connections[alias].vendor} keeps the regular activity table."
+            )
+            return
+
+        try:
+            if options["action"] == "convert":
+                created = convert_activity_table(options["scheme"], options["ahead"], using=alias)
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"✅ {alias}: core_activity is now partitioned by {options['scheme']} ({len(created)} partitions)."
+                    )
+                )
+            elif options["action"] == "create-future":
+                if current_scheme(alias) is None:
+                    raise CommandError(f"{alias}: core_activity is not partitioned; run 'partition_activities convert' first.")
+                created = create_future_partitions(options["ahead"], using=alias)
+                self.stdout.write(
+                    self.style.SUCCESS(f"✅ {alias}: created {len(created)} partition(s): {', '.join(created) or '-'}")
+                )
+            else:
+                self._status(alias)
+        except PartitioningError as exc:
+            raise CommandError(f"{alias}: {exc}")
+
+    def _status(self, alias: str):
+        scheme = current_scheme(alias)
+        if scheme is None:
+            self.stdout.write(f"{alias}: core_activity is a regular (unpartitioned) table.")
+            return
+        self.stdout.write(f"{alias}: core_activity is partitioned by {scheme}:")
+        for partition in list_partitions(alias):
+            bounds = f"{partition.start} .. {partition.end}" if partition.start else "default"
+            self.stdout.write(f"  {partition.name:<32} {bounds:<26} ~{partition.rows} rows")
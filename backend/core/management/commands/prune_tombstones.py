@@ -0,0 +1,30 @@
+"""
+Management command to delete sync tombstones past their retention window.
+
+Usage:
+    python manage.py prune_tombstones
+    python manage.py prune_tombstones --shard shard_1
+"""
+
+from django.core.management.base import BaseCommand
+
+from core.sharding import add_shard_argument, selected_shards, use_shard
+from core.sync import SYNC_TOMBSTONE_RETENTION, prune_tombstones
+
+
+class Command(BaseCommand):
+    help = "Delete sync tombstones older than the retention window"
+
+    def add_arguments(self, parser):
+        add_shard_argument(parser)
+
+    def handle(self, *args, **options):
+        deleted = 0
+        for alias in selected_shards(options):
+            with use_shard(alias):
+                deleted += prune_tombstones()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Pruned {deleted} tombstone(s) older than {SYNC_TOMBSTONE_RETENTION.days} days."
+            )
+        )
@@ -0,0 +1,70 @@
+"""
+Management command to rebuild (or verify) per-child streak counters.
+
+Usage:
+    python manage.py rebuild_streaks              # recompute every child
+    python manage.py rebuild_streaks --verify     # report drift, change nothing
+    python manage.py rebuild_streaks --child 12
+    python manage.py rebuild_streaks --shard shard_1
+"""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Activity, ActivityArchive, Child, ChildStreak
+from core.sharding import add_shard_argument, selected_shards, use_shard
+from core.streaks import StreakCounts, compute_streak, rebuild_streak
+
+
+class Command(BaseCommand):
+    help = "Recompute child streak counters from activity dates, or verify them with --verify"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--child", type=int, action="append", dest="child_ids", help="Only this child (repeatable)")
+        parser.add_argument("--verify", action="store_true", help="Compare stored counters with the raw data only")
+        add_shard_argument(parser)
+
+    def handle(self, *args, **options):
+        checked = mismatches = 0
+        for alias in selected_shards(options):
+            with use_shard(alias):
+                child_ids = Child.objects.order_by("pk").values_list("pk", flat=True)
+                if options["child_ids"]:
+                    child_ids = child_ids.filter(pk__in=options["child_ids"])
+                child_ids = list(child_ids)
+                if options["verify"]:
+                    mismatches += self._verify(child_ids)
+                else:
+                    for child_id in child_ids:
+                        rebuild_streak(child_id)
+            checked += len(child_ids)
+
+        if not options["verify"]:
+            self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt streaks for {checked} child(ren)."))
+        elif mismatches:
+            raise CommandError(f"{mismatches} of {checked} child streak(s) differ; rerun without --verify.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ All {checked} child streak(s) match the activity data."))
+
+    def _verify(self, child_ids: list[int]) -> int:
+        stored = {
+            streak.child_id: StreakCounts(streak.current_streak, streak.longest_streak, streak.last_active_date)
+            for streak in ChildStreak.objects.filter(child_id__in=child_ids)
+        }
+        days: dict[int, list] = {child_id: [] for child_id in child_ids}
+        for child_id, day in (
+            Activity.objects.filter(child_id__in=child_ids).values_list("child_id", "activity_date").order_by().distinct().iterator()
+        ):
+            days[child_id].append(day)
+        for child_id, archived in ActivityArchive.objects.filter(child_id__in=child_ids).values_list("child_id", "days"):
+            days[child_id] += [date.fromisoformat(day) for day in archived]
+
+        mismatches = 0
+        for child_id in child_ids:
+            expected = compute_streak(days[child_id])
+            actual = stored.get(child_id, StreakCounts(0, 0, None))
+            if actual != expected:
+                mismatches += 1
+                self.stderr.write(f"Child #{child_id}: stored {actual}, expected {expected}")
+        return mismatches
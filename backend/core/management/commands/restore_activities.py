@@ -0,0 +1,45 @@
+"""
+Management command to move archived activities back into the live tables.
+
+Usage:
+    python manage.py restore_activities --user parent@example.com
+    python manage.py restore_activities --child 12
+    python manage.py restore_activities --all
+    python manage.py restore_activities --all --shard shard_1
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.archive import restore_child
+from core.models import ActivityArchive
+from core.sharding import add_shard_argument, selected_shards, use_shard
+
+
+class Command(BaseCommand):
+    help = "Restore archived activities (also done automatically on upgrade to Plus)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", action="append", dest="emails", help="This user's children (repeatable)")
+        parser.add_argument("--child", type=int, action="append", dest="child_ids", help="This child (repeatable)")
+        parser.add_argument("--all", action="store_true", help="Every archived child")
+        add_shard_argument(parser)
+
+    def handle(self, *args, **options):
+        if not (options["emails"] or options["child_ids"] or options["all"]):
+            raise CommandError("Pass --user, --child or --all.")
+
+        total = children = 0
+        for alias in selected_shards(options):
+            with use_shard(alias):
+                archives = ActivityArchive.objects.all()
+                if not options["all"]:
+                    archives = archives.filter(child__user__email__in=options["emails"] or []) | archives.filter(
+                        child_id__in=options["child_ids"] or []
+                    )
+                child_ids = list(archives.order_by("child_id").values_list("child_id", flat=True).distinct())
+                for child_id in child_ids:
+                    restored = restore_child(child_id)
+                    self.stdout.write(f"  child #{child_id}: {restored} activities")
+                    total += restored
+            children += len(child_ids)
+        self.stdout.write(self.style.SUCCESS(f"✅ Restored {total} activities for {children} child(ren)."))
@@ -0,0 +1,95 @@
+"""
+Management command for user-id sharding (see core.sharding).
+
+Usage:
+    python manage.py migrate --database shard_1      # once per new shard, then:
+    python manage.py shards init                     # id ranges + reference data
+    python manage.py shards status
+    python manage.py shards sync                     # re-copy reference data and user rows
+    python manage.py shards move --user parent@example.com --to shard_2
+    python manage.py shards rebalance --max-moves 100 --dry-run
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import User
+from core.sharding import (
+    ShardingError,
+    init_id_range,
+    is_sharded,
+    move_user,
+    rebalance_plan,
+    shard_aliases,
+    shard_counts,
+    sync_shard,
+)
+
+
+class Command(BaseCommand):
+    help = "Prepare shards, show how users are spread over them, and move users between them"
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["status", "init", "sync", "move", "rebalance"])
+        parser.add_argument("--user", dest="email", help="User to move (move)")
+        parser.add_argument("--to", dest="target", help="Target shard alias (move)")
+        parser.add_argument("--max-moves", type=int, help="Move at most this many users (rebalance)")
+        parser.add_argument("--dry-run", action="store_true", help="Print the moves, change nothing (rebalance)")
+
+    def handle(self, *args, **options):
+        action = options["action"]
+        if action != "status" and not is_sharded():
+            raise CommandError("Only the default database is configured; set SHARD_DATABASE_URLS first.")
+        try:
+            if action == "init":
+                for alias in shard_aliases():
+                    first_id = init_id_range(alias)
+                    copied = sync_shard(alias)
+                    self.stdout.write(f"{alias}: new ids from {first_id}" + "".join(f", {n} {what}" for what, n in copied.items()))
+                self.stdout.write(self.style.SUCCESS(f"✅ {len(shard_aliases())} shard(s) ready."))
+            elif action == "sync":
+                for alias in shard_aliases()[1:]:
+                    copied = sync_shard(alias)
+                    self.stdout.write(f"{alias}: " + ", ".join(f"{n} {what}" for what, n in copied.items()))
+                self.stdout.write(self.style.SUCCESS("✅ Reference data and user rows copied."))
+            elif action == "move":
+                self._move(options["email"], options["target"])
+            elif action == "rebalance":
+                self._rebalance(options["max_moves"], options["dry_run"])
+            else:
+                self._status()
+        except ShardingError as exc:
+            raise CommandError(str(exc))
+
+    def _status(self):
+        for row in shard_counts():
+            self.stdout.write(
+                f"{row['shard']:<12} {row['users']:>8} users {row['children']:>8} children "
+                f"{row['activities']:>10} activities  ids from {row['first_id']}"
+            )
+
+    def _move(self, email, target):
+        if not email or not target:
+            raise CommandError("move needs --user and --to.")
+        user = User.objects.filter(email=email).first()
+        if user is None:
+            raise CommandError(f"No user found with email: {email}")
+        source = user.shard
+        moved = move_user(user, target)
+        self.stdout.write(self.style.SUCCESS(f"✅ {email}: {source} → {target} ({sum(moved.values())} rows)."))
+
+    def _rebalance(self, max_moves, dry_run):
+        if max_moves is not None and max_moves < 1:
+            raise CommandError("--max-moves must be at least 1.")
+        plan = rebalance_plan(max_moves)
+        if not plan:
+            self.stdout.write("Shards are balanced.")
+            return
+        users = User.objects.in_bulk([user_id for user_id, _, _ in plan])
+        for user_id, source, target in plan:
+            if dry_run:
+                self.stdout.write(f"would move {users[user_id].email}: {source} → {target}")
+            else:
+                rows = sum(move_user(users[user_id], target).values())
+                self.stdout.write(f"moved {users[user_id].email}: {source} → {target} ({rows} rows)")
+        verb = "Would move" if dry_run else "Moved"
+        self.stdout.write(self.style.SUCCESS(f"✅ {verb} {len(plan)} user(s)."))
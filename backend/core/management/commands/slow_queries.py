@@ -0,0 +1,47 @@
+"""
+Management command to report the slow-query log (see core.slow_queries).
+
+Usage:
+    python manage.py slow_queries
+    python manage.py slow_queries --sort avg --limit 10 --plans
+    python manage.py slow_queries --reset
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import SlowQuery
+from core.slow_queries import REPORT_SORTS, slow_query_report
+
+
+class Command(BaseCommand):
+    help = "Show the slowest recorded queries, aggregated by SQL fingerprint"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sort", choices=list(REPORT_SORTS), default="total", help="Order by (default total)")
+        parser.add_argument("--limit", type=int, default=20, help="Fingerprints to show (default 20)")
+        parser.add_argument("--plans", action="store_true", help="Include the latest sampled EXPLAIN")
+        parser.add_argument("--reset", action="store_true", help="Delete the log and start over")
+
+    def handle(self, *args, **options):
+        if options["reset"]:
+            deleted, _ = SlowQuery.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS(f"✅ Cleared {deleted} slow-query fingerprint(s)."))
+            return
+        if options["limit"] < 1:
+            raise CommandError("--limit must be at least 1.")
+
+        rows = slow_query_report(options["sort"], options["limit"], options["plans"])
+        if not rows:
+            self.stdout.write("No slow queries recorded.")
+            return
+        for row in rows:
+            self.stdout.write(
+                f"{row['calls']:>7}× total {row['total_ms']:>10.1f} ms  avg {row['avg_ms']:>8.1f} ms  "
+                f"max {row['max_ms']:>8.1f} ms  [{row['database']}]"
+            )
+            self.stdout.write(f"    {row['view'] or '-'}  {row['source'] or '-'}")
+            self.stdout.write(f"    {row['sql']}")
+            if options["plans"] and row["explain"]:
+                for line in row["explain"].splitlines():
+                    self.stdout.write(f"      | {line}")
+            self.stdout.write("")
@@ -0,0 +1,120 @@
+"""
+Management command to precompute cached payloads for recently active users.
+
+Run nightly (cron, or a scheduled Fly machine) so the morning's dashboards
+and reports are served from the response cache:
+
+    python manage.py warm_caches --days 7 --workers 2 --rate 20 \
+        --checkpoint /tmp/warm_caches.json
+
+An interrupted run resumes after the last fully warmed user when rerun with
+the same ``--checkpoint``; ``--restart`` ignores it. ``--shard`` limits the
+run to the users on that shard.
+"""
+
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date
+from pathlib import Path
+
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.cache_warming import Checkpoint, RateLimiter, active_user_ids, warm_user
+from core.sharding import add_shard_argument
+
+
+def _init_worker():
+    import django
+
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = "Precompute dashboard, skill analysis and report caches for active users"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=7, help="Users active in the last N days (default 7)")
+        parser.add_argument("--workers", type=int, default=1, help="Worker processes (default 1: in-process)")
+        parser.add_argument("--rate", type=float, default=None, help="Max users started per second")
+        parser.add_argument("--checkpoint", type=Path, default=None, help="File recording progress for resuming")
+        parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+        parser.add_argument("--progress-every", type=int, default=50, help="Report progress every N users")
+        add_shard_argument(parser)
+
+    def handle(self, *args, **options):
+        if options["workers"] < 1:
+            raise CommandError("--workers must be at least 1.")
+        if isinstance(caches["default"], LocMemCache):
+            self.stderr.write(
+                self.style.WARNING("⚠️  The cache is process-local; warmed entries won't reach the web workers.")
+            )
+
+        checkpoint_path = options["checkpoint"]
+        start_after = 0 if options["restart"] else Checkpoint.load(checkpoint_path)
+        user_ids = active_user_ids(options["days"], after_id=start_after, shards=options["shards"])
+        if start_after:
+            self.stdout.write(f"Resuming after user #{start_after}.")
+        self.stdout.write(f"Warming caches for {len(user_ids)} active user(s)…")
+
+        self.checkpoint = Checkpoint(checkpoint_path, user_ids, start_after)
+        self.limiter = RateLimiter(options["rate"])
+        self.progress_every = options["progress_every"]
+        self.total = len(user_ids)
+        self.users_done = self.children_done = self.failures = 0
+        self.started = time.monotonic()
+        self.today = date.today()
+
+        if options["workers"] == 1:
+            for user_id in user_ids:
+                self.limiter.wait()
+                self._record(user_id, lambda: warm_user(user_id, self.today))
+        else:
+            self._run_pool(user_ids, options["workers"])
+
+        self.checkpoint.save()
+        if self.failures == 0:
+            self.checkpoint.clear()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Warmed {self.children_done} child cache(s) for {self.users_done} user(s) "
+                f"in {time.monotonic() - self.started:.1f}s ({self.failures} failure(s))."
+            )
+        )
+
+    def _run_pool(self, user_ids, workers):
+        # Forked children must not share the parent's database sockets.
+        connections.close_all()
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+            in_flight = {}
+            pending = iter(user_ids)
+            while True:
+                while len(in_flight) < workers * 2:
+                    user_id = next(pending, None)
+                    if user_id is None:
+                        break
+                    self.limiter.wait()
+                    in_flight[pool.submit(warm_user, user_id, self.today)] = user_id
+                if not in_flight:
+                    break
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    self._record(in_flight.pop(future), future.result)
+
+    def _record(self, user_id, result):
+        try:
+            self.children_done += result()
+        except Exception as exc:
+            self.failures += 1
+            self.stderr.write(self.style.ERROR(f"Failed to warm user #{user_id}: {exc}"))
+            return
+        self.users_done += 1
+        self.checkpoint.mark_done(user_id)
+        if self.users_done % self.progress_every == 0:
+            self.checkpoint.save()
+            rate = self.users_done / max(time.monotonic() - self.started, 1e-6)
+            self.stdout.write(f"  {self.users_done}/{self.total} users warmed ({rate:.1f}/s)")
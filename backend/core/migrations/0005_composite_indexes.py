@@ -0,0 +1,29 @@
+# Generated by Django 6.0.2 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_add_subscription_model'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['child', '-activity_date', '-created_at'], include=('duration_minutes',), name='activity_child_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activityskill',
+            index=models.Index(fields=['skill', 'activity'], name='activityskill_skill_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='child',
+            index=models.Index(fields=['user', 'name'], name='child_user_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='suggestion',
+            index=models.Index(fields=['skill', 'min_age', 'max_age'], name='suggestion_skill_age_idx'),
+        ),
+    ]
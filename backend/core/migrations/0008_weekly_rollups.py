@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-19 12:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_sync_tracking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeeklyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField()),
+                ('activity_count', models.PositiveIntegerField(default=0)),
+                ('total_minutes', models.PositiveIntegerField(default=0)),
+                ('child', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weekly_rollups', to='core.child')),
+                ('skill', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.skillcategory')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('skill__isnull', False)), fields=('child', 'week_start', 'skill'), name='weeklyrollup_skill_uniq'), models.UniqueConstraint(condition=models.Q(('skill__isnull', True)), fields=('child', 'week_start'), name='weeklyrollup_volume_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.2 on 2026-10-19 13:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_weekly_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChildStreak',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('current_streak', models.PositiveIntegerField(default=0)),
+                ('longest_streak', models.PositiveIntegerField(default=0)),
+                ('last_active_date', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('child', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='streak', to='core.child')),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.2 on 2026-10-19 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_child_streaks'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='suggestion',
+            index=models.Index(fields=['min_age', 'max_age'], name='suggestion_age_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 6.0.2 on 2026-10-19 14:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_suggestion_age_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('activity_count', models.PositiveIntegerField(default=0)),
+                ('days', models.JSONField(default=dict)),
+                ('weeks', models.JSONField(default=dict)),
+                ('payload', models.BinaryField(default=b'')),
+                ('archived_at', models.DateTimeField(auto_now=True)),
+                ('child', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archives', to='core.child')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('child', 'month'), name='activityarchive_child_month_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0.2 on 2026-10-19 15:54
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_activity_archives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=40, unique=True)),
+                ('sql', models.TextField()),
+                ('database', models.CharField(default='default', max_length=64)),
+                ('view', models.CharField(blank=True, default='', max_length=200)),
+                ('source', models.CharField(blank=True, default='', max_length=300)),
+                ('calls', models.PositiveIntegerField(default=0)),
+                ('total_ms', models.FloatField(default=0)),
+                ('max_ms', models.FloatField(default=0)),
+                ('first_seen', models.DateTimeField(auto_now_add=True)),
+                ('last_seen', models.DateTimeField(default=django.utils.timezone.now)),
+                ('explain', models.TextField(blank=True, default='')),
+                ('explained_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
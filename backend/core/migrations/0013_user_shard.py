@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-19 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_slow_queries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='shard',
+            field=models.CharField(db_index=True, default='default', max_length=64),
+        ),
+    ]
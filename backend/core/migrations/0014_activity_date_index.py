@@ -0,0 +1,17 @@
+# Generated by Django 6.0.2 on 2026-10-19 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_user_shard'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['-activity_date', '-created_at', '-id'], name='activity_date_idx'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Coalesce, ExtractYear, NullIf
 from django.utils import timezone
 
 from core.plans import PLAN_CHOICES, PLAN_FREE
@@ -10,6 +11,10 @@ class User(AbstractUser):
 	username = None
 	email = models.EmailField(unique=True)
 	created_at = models.DateTimeField(auto_now_add=True)
+	# Bumped on every write to the user's data (see core.versioning).
+	data_version = models.PositiveBigIntegerField(default=0)
+	# Database alias holding the user's children, activities, ... (see core.sharding).
+	shard = models.CharField(max_length=64, default="default", db_index=True)
 
 	USERNAME_FIELD = "email"
 	REQUIRED_FIELDS = []
@@ -18,14 +23,38 @@ class User(AbstractUser):
 		return self.email
 
 
+class ChildQuerySet(models.QuerySet):
+	def with_age(self, on):
+		"""Annotate ``age``: whole years on the date ``on``, computed in SQL like ``Child.age``."""
+		birthday_ahead = models.Q(date_of_birth__month__gt=on.month) | models.Q(
+			date_of_birth__month=on.month, date_of_birth__day__gt=on.day
+		)
+		return self.annotate(
+			age=models.ExpressionWrapper(
+				models.Value(on.year)
+				- ExtractYear("date_of_birth")
+				- models.Case(models.When(birthday_ahead, then=models.Value(1)), default=models.Value(0)),
+				output_field=models.IntegerField(),
+			)
+		)
+
+
 class Child(models.Model):
 	user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="children")
 	name = models.CharField(max_length=120)
 	date_of_birth = models.DateField(null=True, blank=True)
 	created_at = models.DateTimeField(auto_now_add=True)
+	updated_at = models.DateTimeField(auto_now=True)
+	data_version = models.PositiveBigIntegerField(default=0)
+
+	objects = ChildQuerySet.as_manager()
 
 	class Meta:
 		ordering = ["name"]
+		indexes = [
+			models.Index(fields=["user", "name"], name="child_user_name_idx"),
+			models.Index(fields=["user", "updated_at"], name="child_user_updated_idx"),
+		]
 
 	@property
 	def age(self) -> int | None:
@@ -59,11 +88,26 @@ class Activity(models.Model):
 	notes = models.TextField(blank=True)
 	duration_minutes = models.PositiveIntegerField(null=True, blank=True)
 	created_at = models.DateTimeField(auto_now_add=True)
+	updated_at = models.DateTimeField(auto_now=True)
 	activity_date = models.DateField()
 	skills = models.ManyToManyField(SkillCategory, through="ActivitySkill", related_name="activities")
 
 	class Meta:
 		ordering = ["-activity_date", "-created_at"]
+		indexes = [
+			# Serves "activities for a child in a date range" in the default
+			# ordering without a sort; duration is carried along (PostgreSQL
+			# INCLUDE) so minute totals can be read from the index alone.
+			models.Index(
+				fields=["child", "-activity_date", "-created_at"],
+				name="activity_child_date_idx",
+				include=["duration_minutes"],
+			),
+			models.Index(fields=["child", "updated_at"], name="activity_child_updated_idx"),
+			# The admin changelist across all children: its date hierarchy
+			# and default ordering, with the pk tiebreak the admin appends.
+			models.Index(fields=["-activity_date", "-created_at", "-id"], name="activity_date_idx"),
+		]
 
 	def __str__(self) -> str:
 		return f"{self.title} - {self.child.name}"
@@ -75,6 +119,42 @@ class ActivitySkill(models.Model):
 
 	class Meta:
 		unique_together = ("activity", "skill")
+		indexes = [
+			# The unique (activity, skill) index covers activity → skills;
+			# this one covers skill → activities for per-skill aggregates.
+			models.Index(fields=["skill", "activity"], name="activityskill_skill_idx"),
+		]
+
+
+class SuggestionQuerySet(models.QuerySet):
+	def for_children(self, child_ids, on, default_range=None):
+		"""Suggestions whose age range contains the age on ``on`` of any of ``child_ids``.
+
+		One query however many children: each child is an ``EXISTS`` over
+		``Child.objects.with_age(on)``, also annotated as ``for_child_<id>``
+		so callers can split the result per child. With ``default_range``
+		(``(low, high)``), a child without a known age matches suggestions
+		overlapping that range instead of none.
+		"""
+		matches = {}
+		for child_id in child_ids:
+			child = Child.objects.with_age(on).filter(pk=child_id)
+			if default_range is None:
+				child = child.filter(age__gte=models.OuterRef("min_age"), age__lte=models.OuterRef("max_age"))
+			else:
+				low, high = default_range
+				# ``age or high`` / ``age or low``: no (or a zero) age falls back to the range.
+				known_age = NullIf("age", models.Value(0))
+				child = child.annotate(
+					upper=Coalesce(known_age, models.Value(high)), lower=Coalesce(known_age, models.Value(low))
+				).filter(upper__gte=models.OuterRef("min_age"), lower__lte=models.OuterRef("max_age"))
+			matches[f"for_child_{child_id}"] = models.Exists(child)
+		if not matches:
+			return self.none()
+		any_match = models.Q()
+		for name in matches:
+			any_match |= models.Q(**{name: True})
+		return self.annotate(**matches).filter(any_match)
 
 
 class Suggestion(models.Model):
@@ -84,8 +164,14 @@ class Suggestion(models.Model):
 	min_age = models.PositiveIntegerField()
 	max_age = models.PositiveIntegerField()
 
+	objects = SuggestionQuerySet.as_manager()
+
 	class Meta:
 		ordering = ["skill__name", "title"]
+		indexes = [
+			models.Index(fields=["skill", "min_age", "max_age"], name="suggestion_skill_age_idx"),
+			models.Index(fields=["min_age", "max_age"], name="suggestion_age_idx"),
+		]
 
 	def __str__(self) -> str:
 		return self.title
@@ -101,11 +187,114 @@ class Reflection(models.Model):
 	class Meta:
 		unique_together = ("child", "week_start_date")
 		ordering = ["-week_start_date"]
+		indexes = [
+			models.Index(fields=["child", "updated_at"], name="reflection_child_updated_idx"),
+		]
 
 	def __str__(self) -> str:
 		return f"Reflection for {self.child.name} - Week of {self.week_start_date}"
 
 
+class Tombstone(models.Model):
+	"""Marks a deleted row so delta sync can tell clients to drop it."""
+
+	KIND_CHILD = "child"
+	KIND_ACTIVITY = "activity"
+	KIND_REFLECTION = "reflection"
+	KIND_CHOICES = [
+		(KIND_CHILD, "Child"),
+		(KIND_ACTIVITY, "Activity"),
+		(KIND_REFLECTION, "Reflection"),
+	]
+
+	user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+	kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+	object_id = models.BigIntegerField()
+	deleted_at = models.DateTimeField(default=timezone.now)
+
+	class Meta:
+		indexes = [
+			models.Index(fields=["user", "deleted_at"], name="tombstone_user_deleted_idx"),
+		]
+
+	def __str__(self) -> str:
+		return f"Deleted {self.kind} #{self.object_id}"
+
+
+class WeeklyRollup(models.Model):
+	"""Per-week activity totals for a child, maintained by ``core.trends``.
+
+	One row per (child, week, skill) plus a row with ``skill=None`` holding
+	the week's overall volume (each activity counted once).
+	"""
+
+	child = models.ForeignKey(Child, on_delete=models.CASCADE, related_name="weekly_rollups")
+	week_start = models.DateField()  # Monday of the week
+	skill = models.ForeignKey(SkillCategory, on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+	activity_count = models.PositiveIntegerField(default=0)
+	total_minutes = models.PositiveIntegerField(default=0)
+
+	class Meta:
+		constraints = [
+			models.UniqueConstraint(
+				fields=["child", "week_start", "skill"],
+				condition=models.Q(skill__isnull=False),
+				name="weeklyrollup_skill_uniq",
+			),
+			models.UniqueConstraint(
+				fields=["child", "week_start"],
+				condition=models.Q(skill__isnull=True),
+				name="weeklyrollup_volume_uniq",
+			),
+		]
+
+	def __str__(self) -> str:
+		return f"{self.child.name} — week of {self.week_start}"
+
+
+class ChildStreak(models.Model):
+	"""Consecutive-day logging counters for a child, maintained by ``core.streaks``.
+
+	``current_streak`` is the run of active days ending on ``last_active_date``;
+	whether it is still running is decided at read time.
+	"""
+
+	child = models.OneToOneField(Child, on_delete=models.CASCADE, related_name="streak")
+	current_streak = models.PositiveIntegerField(default=0)
+	longest_streak = models.PositiveIntegerField(default=0)
+	last_active_date = models.DateField(null=True, blank=True)
+	updated_at = models.DateTimeField(auto_now=True)
+
+	def __str__(self) -> str:
+		return f"{self.child.name}: {self.current_streak} day(s), best {self.longest_streak}"
+
+
+class ActivityArchive(models.Model):
+	"""One child-month of activities moved out of the hot tables by ``core.archive``.
+
+	``payload`` is the zlib-compressed JSON of the activities and their skill
+	ids; ``days`` and ``weeks`` summarise them for streaks and weekly rollups.
+	"""
+
+	child = models.ForeignKey(Child, on_delete=models.CASCADE, related_name="archives")
+	month = models.DateField()  # first day of the month
+	activity_count = models.PositiveIntegerField(default=0)
+	# {"YYYY-MM-DD": [activities, minutes]}
+	days = models.JSONField(default=dict)
+	# {"<week start>": {"": [activities, minutes], "<skill id>": [activities, minutes]}}
+	weeks = models.JSONField(default=dict)
+	payload = models.BinaryField(default=b"")
+	archived_at = models.DateTimeField(auto_now=True)
+
+	class Meta:
+		constraints = [
+			models.UniqueConstraint(fields=["child", "month"], name="activityarchive_child_month_uniq"),
+		]
+
+	def __str__(self) -> str:
+		return f"{self.child.name} — {self.month:%Y-%m} ({self.activity_count} archived)"
+
+
 class Subscription(models.Model):
 	"""Tracks a user's subscription plan.
 
@@ -138,3 +327,28 @@ class Subscription(models.Model):
 	def is_plus(self) -> bool:
 		from core.plans import PLAN_PLUS
 		return self.plan == PLAN_PLUS
+
+
+class SlowQuery(models.Model):
+	"""Statements slower than the threshold, aggregated by ``core.slow_queries``.
+
+	One row per normalized SQL fingerprint (literals, ``IN`` lists and
+	multi-row ``VALUES`` collapsed). ``view`` and ``source`` name the most
+	recent caller; ``explain`` holds the latest sampled plan.
+	"""
+
+	fingerprint = models.CharField(max_length=40, unique=True)
+	sql = models.TextField()
+	database = models.CharField(max_length=64, default="default")
+	view = models.CharField(max_length=200, blank=True, default="")
+	source = models.CharField(max_length=300, blank=True, default="")
+	calls = models.PositiveIntegerField(default=0)
+	total_ms = models.FloatField(default=0)
+	max_ms = models.FloatField(default=0)
+	first_seen = models.DateTimeField(auto_now_add=True)
+	last_seen = models.DateTimeField(default=timezone.now)
+	explain = models.TextField(blank=True, default="")
+	explained_at = models.DateTimeField(null=True, blank=True)
+
+	def __str__(self) -> str:
+		return f"{self.calls}× avg {self.total_ms / max(self.calls, 1):.0f} ms — {self.sql[:80]}"
@@ -0,0 +1,264 @@
+"""
+Declarative range partitioning of ``core_activity`` by ``activity_date``
+(PostgreSQL only).
+
+``convert_activity_table`` swaps the regular table for one partitioned by
+year or quarter, copies the rows over and recreates the indexes (which
+PostgreSQL then keeps per partition). Queries that filter on
+``activity_date`` — every report, time series and analytics load — only
+touch the partitions of their range. ``create_future_partitions`` keeps
+partitions ready ahead of today and is meant to run from cron;
+``python manage.py partition_activities`` wraps all of it.
+
+What changes with the partitioned layout:
+
+* the primary key becomes ``(id, activity_date)``, since PostgreSQL wants
+  the partition key in every unique constraint. ``id`` keeps its own
+  sequence, so it stays unique in practice and Django keeps using it as pk;
+* ``core_activityskill.activity_id`` loses its database foreign key (it
+  would need a unique ``id``). Django still cascades deletes itself;
+* a default partition catches dates outside the prepared ranges, and
+  ``create_future_partitions`` moves such rows into a new partition when it
+  creates one.
+
+Other databases (SQLite in development and tests) keep the regular table;
+everything here reports that and does nothing. Every shard (``core.sharding``)
+has its own ``core_activity``, so each function works on the database
+``using`` names.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+TABLE = "core_activity"
+DEFAULT_PARTITION = f"{TABLE}_default"
+SCHEMES = ("year", "quarter")
+DEFAULT_AHEAD = 4  # partitions to keep ready after the current one
+# Stored as the table comment so later runs know the scheme.
+_COMMENT_PREFIX = "partitioned by activity_date: "
+
+
+class PartitioningError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class Partition:
+    name: str
+    start: date | None  # None for the default partition
+    end: date | None
+    rows: int
+
+
+def is_supported(using: str = DEFAULT_DB_ALIAS) -> bool:
+    return connections[using].vendor == "postgresql"
+
+
+def partition_start(day: date, scheme: str) -> date:
+    if scheme == "year":
+        return date(day.year, 1, 1)
+    if scheme == "quarter":
+        return date(day.year, (day.month - 1) // 3 * 3 + 1, 1)
+    raise PartitioningError(f"Unknown scheme {scheme!r}; use one of {', '.join(SCHEMES)}.")
+
+
+def next_partition_start(start: date, scheme: str) -> date:
+    if scheme == "year":
+        return date(start.year + 1, 1, 1)
+    month = start.month + 3
+    return date(start.year + (month - 1) // 12, (month - 1) % 12 + 1, 1)
+
+
+def partition_name(start: date, scheme: str) -> str:
+    if scheme == "year":
+        return f"{TABLE}_y{start.year}"
+    return f"{TABLE}_y{start.year}q{(start.month - 1) // 3 + 1}"
+
+
+def partition_ranges(first: date, last: date, scheme: str) -> list[tuple[date, date]]:
+    """``[start, end)`` ranges of ``scheme`` covering ``first`` .. ``last``."""
+    ranges = []
+    start = partition_start(first, scheme)
+    while start <= last:
+        end = next_partition_start(start, scheme)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def _ahead_until(today: date, scheme: str, ahead: int) -> date:
+    start = partition_start(today, scheme)
+    for _ in range(ahead):
+        start = next_partition_start(start, scheme)
+    return start
+
+
+# ------------------------------------------------------------------
+# Introspection
+# ------------------------------------------------------------------
+
+def current_scheme(using: str = DEFAULT_DB_ALIAS) -> str | None:
+    """The scheme ``core_activity`` is partitioned by, or ``None``."""
+    if not is_supported(using):
+        return None
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT obj_description(c.oid, 'pg_class') FROM pg_partitioned_table p "
+            "JOIN pg_class c ON c.oid = p.partrelid WHERE c.oid = %s::regclass",
+            [TABLE],
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    comment = row[0] or ""
+    return comment[len(_COMMENT_PREFIX):] if comment.startswith(_COMMENT_PREFIX) else "unknown"
+
+
+def list_partitions(using: str = DEFAULT_DB_ALIAS) -> list[Partition]:
+    """Partitions of ``core_activity`` in range order, default last."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass",
+            [TABLE],
+        )
+        rows = cursor.fetchall()
+    partitions = []
+    for name, bound, estimate in rows:
+        start = end = None
+        if bound != "DEFAULT":
+            # "FOR VALUES FROM ('2025-01-01') TO ('2026-01-01')"
+            quoted = bound.split("'")
+            start, end = date.fromisoformat(quoted[1]), date.fromisoformat(quoted[3])
+        partitions.append(Partition(name, start, end, max(estimate, 0)))
+    return sorted(partitions, key=lambda partition: (partition.start is None, partition.start or date.min))
+
+
+# ------------------------------------------------------------------
+# DDL
+# ------------------------------------------------------------------
+
+def _create_partition(cursor, start: date, end: date, scheme: str) -> str:
+    name = partition_name(start, scheme)
+    # DDL takes no bind parameters; the bounds are plain ISO dates.
+    cursor.execute(f"CREATE TABLE \"{name}\" PARTITION OF \"{TABLE}\" FOR VALUES FROM ('{start}') TO ('{end}')")
+    return name
+
+
+def convert_activity_table(
+    scheme: str, ahead: int = DEFAULT_AHEAD, today: date | None = None, using: str = DEFAULT_DB_ALIAS
+) -> list[str]:
+    """Replace ``core_activity`` with a partitioned table holding the same rows.
+
+    Runs in one transaction and holds an exclusive lock on the table while
+    the rows are copied; schedule it in a maintenance window. Returns the
+    names of the partitions created.
+    """
+    if not is_supported(using):
+        raise PartitioningError(f"Partitioning needs PostgreSQL; {connections[using].vendor} keeps the regular table.")
+    partition_start(date.today(), scheme)  # validates the scheme
+    if current_scheme(using) is not None:
+        raise PartitioningError(f"{TABLE} is already partitioned.")
+    today = today or date.today()
+
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        cursor.execute(f'LOCK TABLE "{TABLE}" IN ACCESS EXCLUSIVE MODE')
+        # Index definitions (other than the primary key) to rebuild on the new table.
+        cursor.execute(
+            "SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i "
+            "WHERE i.indrelid = %s::regclass AND NOT i.indisprimary",
+            [TABLE],
+        )
+        index_sql = [row[0] for row in cursor.fetchall()]
+        # LIKE doesn't copy foreign keys (core_activity.child_id).
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'",
+            [TABLE],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(
+            "SELECT pg_sequence_last_value(pg_get_serial_sequence(%s, 'id')::regclass), "
+            f'min(activity_date) FROM "{TABLE}"',
+            [TABLE],
+        )
+        last_id, first_day = cursor.fetchone()
+
+        legacy = f"{TABLE}_unpartitioned"
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{legacy}"')
+        cursor.execute(
+            f'CREATE TABLE "{TABLE}" (LIKE "{legacy}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            "PARTITION BY RANGE (activity_date)"
+        )
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD PRIMARY KEY (id, activity_date)')
+
+        created = [
+            _create_partition(cursor, start, end, scheme)
+            for start, end in partition_ranges(first_day or today, _ahead_until(today, scheme, ahead), scheme)
+        ]
+        cursor.execute(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{TABLE}" DEFAULT')
+        cursor.execute(f'INSERT INTO "{TABLE}" SELECT * FROM "{legacy}"')
+        # Drops core_activityskill's foreign key along with the old table.
+        cursor.execute(f'DROP TABLE "{legacy}" CASCADE')
+        # Identity columns can't be partitioned (before PostgreSQL 17); the id
+        # continues from the old identity sequence, which went with the table.
+        sequence = f"{TABLE}_id_seq"
+        cursor.execute(f'CREATE SEQUENCE "{sequence}" OWNED BY "{TABLE}".id')
+        cursor.execute(f"ALTER TABLE \"{TABLE}\" ALTER COLUMN id SET DEFAULT nextval('\"{sequence}\"')")
+        if last_id:
+            cursor.execute("SELECT setval(%s, %s)", [sequence, last_id])
+        for sql in index_sql:
+            cursor.execute(sql)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{name}" {definition}')
+        cursor.execute(f"COMMENT ON TABLE \"{TABLE}\" IS '{_COMMENT_PREFIX}{scheme}'")
+        cursor.execute(f'ANALYZE "{TABLE}"')
+    return created
+
+
+def create_future_partitions(
+    ahead: int = DEFAULT_AHEAD, today: date | None = None, using: str = DEFAULT_DB_ALIAS
+) -> list[str]:
+    """Create missing partitions up to ``ahead`` periods after today's; returns their names.
+
+    Rows that landed in the default partition for a new range are moved
+    into it.
+    """
+    scheme = current_scheme(using)
+    if scheme is None:
+        return []
+    if scheme not in SCHEMES:
+        raise PartitioningError(f"Cannot tell how {TABLE} is partitioned (table comment changed?).")
+    today = today or date.today()
+    existing = {partition.start for partition in list_partitions(using) if partition.start is not None}
+    first = min(existing, default=partition_start(today, scheme))
+    missing = [
+        (start, end)
+        for start, end in partition_ranges(first, _ahead_until(today, scheme, ahead), scheme)
+        if start not in existing
+    ]
+
+    created = []
+    for start, end in missing:
+        with transaction.atomic(using=using), connections[using].cursor() as cursor:
+            cursor.execute(
+                f'SELECT EXISTS (SELECT 1 FROM "{DEFAULT_PARTITION}" WHERE activity_date >= %s AND activity_date < %s)',
+                [start, end],
+            )
+            strays = cursor.fetchone()[0]
+            if strays:
+                cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{DEFAULT_PARTITION}"')
+            created.append(_create_partition(cursor, start, end, scheme))
+            if strays:
+                cursor.execute(
+                    f'WITH moved AS (DELETE FROM "{DEFAULT_PARTITION}" '
+                    "WHERE activity_date >= %s AND activity_date < %s RETURNING *) "
+                    f'INSERT INTO "{TABLE}" SELECT * FROM moved',
+                    [start, end],
+                )
+                cursor.execute(f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{DEFAULT_PARTITION}" DEFAULT')
+    return created
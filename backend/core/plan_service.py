@@ -7,25 +7,41 @@ rather than reaching into models or constants directly.
 
 from __future__ import annotations
 
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
 from datetime import date, timedelta
+from itertools import islice
 from typing import TYPE_CHECKING
 
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Q
 from django.utils import timezone
 
 from core.plans import PLAN_FREE, PLAN_LIMITS, PLAN_PLUS
+from core.sharding import use_shard, use_user_shard
 
 if TYPE_CHECKING:
     from core.models import Subscription, User
 
 
 def get_subscription(user: "User") -> "Subscription":
-    """Return the user's Subscription, creating a Free one if absent."""
+    """Return the user's Subscription, creating a Free one if absent.
+
+    The row is cached on the user instance, so every plan helper called for
+    the same request (or every sub-request of a batch) shares one lookup.
+    """
     from core.models import Subscription
 
-    subscription, _created = Subscription.objects.get_or_create(
-        user=user,
-        defaults={"plan": PLAN_FREE, "started_at": timezone.now()},
-    )
+    try:
+        return user.subscription
+    except Subscription.DoesNotExist:
+        pass
+    with use_user_shard(user):
+        subscription, _created = Subscription.objects.get_or_create(
+            user=user,
+            defaults={"plan": PLAN_FREE, "started_at": timezone.now()},
+        )
+    user.subscription = subscription
     return subscription
 
 
@@ -75,10 +91,116 @@ def set_user_plan(user: "User", plan: str) -> "Subscription":
     """Upgrade or downgrade a user's plan (admin / stub usage)."""
     if plan not in (PLAN_FREE, PLAN_PLUS):
         raise ValueError(f"Invalid plan: {plan}")
+    from core.archive import archive_before, restore_users
+
     sub = get_subscription(user)
     sub.plan = plan
     sub.started_at = timezone.now()
     sub.ends_at = None
     sub.canceled_at = None
     sub.save()
+    if archive_before(plan, date.today()) is None:
+        # The new plan shows all history: bring archived activities back.
+        with use_user_shard(user):
+            restore_users([user.pk])
     return sub
+
+
+BULK_PLAN_CHUNK_SIZE = 1000
+
+
+@dataclass
+class BulkPlanResult:
+    """Running totals of a ``bulk_set_user_plan`` call."""
+
+    processed: int = 0  # identifiers read
+    changed: int = 0  # subscriptions written (or that would be, on a dry run)
+    unchanged: int = 0  # users already on the plan
+    missing: list[str] = field(default_factory=list)  # identifiers with no user
+
+
+def _split_identifiers(chunk: list[str]) -> tuple[set[str], set[int]]:
+    emails, ids = set(), set()
+    for identifier in chunk:
+        if identifier.isdigit():
+            ids.add(int(identifier))
+        else:
+            emails.add(identifier)
+    return emails, ids
+
+
+def bulk_set_user_plan(
+    identifiers: Iterable[str | int],
+    plan: str,
+    chunk_size: int = BULK_PLAN_CHUNK_SIZE,
+    dry_run: bool = False,
+    on_chunk: Callable[[BulkPlanResult], None] | None = None,
+) -> BulkPlanResult:
+    """``set_user_plan`` for many users, given as emails or ids.
+
+    Identifiers are consumed lazily in chunks. Per chunk, one query resolves
+    the users with their current plan and, for users not already on
+    ``plan``, one upsert writes their subscriptions and one UPDATE bumps
+    their data versions (bulk writes skip the model signals). Moving to a
+    plan without a visibility window also restores archived activities.
+    With several shards, plans are read and written on each user's shard,
+    one group of users per shard.
+    ``on_chunk`` receives the running totals after every chunk.
+    """
+    from core.archive import archive_before, restore_users
+    from core.models import Subscription, User
+    from core.versioning import bump_user_versions
+
+    restores_archives = archive_before(plan, date.today()) is None
+    if plan not in (PLAN_FREE, PLAN_PLUS):
+        raise ValueError(f"Invalid plan: {plan}")
+    result = BulkPlanResult()
+    stream = (str(identifier).strip() for identifier in identifiers)
+    stream = (identifier for identifier in stream if identifier)
+    while chunk := list(islice(stream, chunk_size)):
+        emails, ids = _split_identifiers(chunk)
+        # The join only sees subscriptions on default; other shards are asked below.
+        rows = User.objects.filter(Q(email__in=emails) | Q(pk__in=ids)).values_list(
+            "pk", "email", "shard", "subscription__plan"
+        )
+        found_ids, found_emails, plans_by_shard = set(), set(), {}
+        for user_id, email, shard, current_plan in rows:
+            found_ids.add(user_id)
+            found_emails.add(email)
+            plans_by_shard.setdefault(shard, {})[user_id] = current_plan
+        to_change = {}
+        for shard, plans in plans_by_shard.items():
+            if shard != DEFAULT_DB_ALIAS:
+                with use_shard(shard):
+                    plans = {user_id: None for user_id in plans} | dict(
+                        Subscription.objects.filter(user_id__in=plans).values_list("user_id", "plan")
+                    )
+            changing = [user_id for user_id, current_plan in plans.items() if current_plan != plan]
+            if changing:
+                to_change[shard] = changing
+
+        changed = sum(len(user_ids) for user_ids in to_change.values())
+        result.processed += len(chunk)
+        result.changed += changed
+        result.unchanged += len(found_ids) - changed
+        result.missing += [
+            identifier
+            for identifier in chunk
+            if (int(identifier) not in found_ids if identifier.isdigit() else identifier not in found_emails)
+        ]
+        if to_change and not dry_run:
+            now = timezone.now()
+            for shard, user_ids in to_change.items():
+                with use_shard(shard), transaction.atomic(using=shard):
+                    Subscription.objects.bulk_create(
+                        [Subscription(user_id=user_id, plan=plan, started_at=now) for user_id in user_ids],
+                        update_conflicts=True,
+                        unique_fields=["user"],
+                        update_fields=["plan", "started_at", "ends_at", "canceled_at", "updated_at"],
+                    )
+                    bump_user_versions(user_ids)
+                    if restores_archives:
+                        restore_users(user_ids)
+        if on_chunk is not None:
+            on_chunk(result)
+    return result
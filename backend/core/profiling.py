@@ -0,0 +1,187 @@
+"""
+Keep cProfile captures of slow requests.
+
+``SlowRequestProfilerMiddleware`` is opt-in (``settings.PROFILER["ENABLED"]``).
+It runs a sampled share of requests under ``cProfile`` with a
+``QueryRecorder`` attached. When a request takes at least ``THRESHOLD_MS``,
+the profile is written to ``DIR`` together with a JSON record: URL, user
+id, status, timings and query log. Faster requests throw theirs away.
+``DIR`` is a ring holding the newest ``MAX_PROFILES`` captures.
+
+Only one request per process is profiled at a time; requests that arrive
+meanwhile run unprofiled. This keeps the overhead bounded, and from Python
+3.12 on ``cProfile`` can't run twice in one process anyway. It also
+observes every thread there, so a kept profile can include frames from
+requests that overlapped with it.
+
+Admins list captures at ``/api/admin/profiles/``, read one's summary at
+``/api/admin/profiles/<id>/`` and download the ``.prof`` file (for
+``pstats``, snakeviz, ...) at ``/api/admin/profiles/<id>/download/``.
+Each machine keeps its own ring.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import io
+import json
+import logging
+import pstats
+import random
+import re
+import secrets
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+
+from core.querylog import MAX_RECORDED_QUERIES, QueryRecorder
+
+logger = logging.getLogger(__name__)
+
+_DEFAULTS = {
+    "ENABLED": False,
+    "THRESHOLD_MS": 1000,
+    "SAMPLE_RATE": 1.0,  # share of requests run under the profiler
+    "DIR": None,  # default: <tmp>/slow-request-profiles
+    "MAX_PROFILES": 50,
+    "MAX_QUERIES": MAX_RECORDED_QUERIES,
+    # Path prefixes never profiled; reading the ring mustn't push captures out.
+    "EXCLUDE_PATHS": ("/api/admin/profiles/", "/static/"),
+}
+SUMMARY_FUNCTIONS = 40
+_PROFILE_ID = re.compile(r"^\d{13}-[0-9a-f]{8}$")
+_profiling = threading.Lock()
+
+
+def profiler_config() -> dict:
+    return {**_DEFAULTS, **getattr(settings, "PROFILER", {})}
+
+
+def profile_dir() -> Path:
+    configured = profiler_config()["DIR"]
+    return Path(configured) if configured else Path(tempfile.gettempdir()) / "slow-request-profiles"
+
+
+class SlowRequestProfilerMiddleware:
+    def __init__(self, get_response):
+        config = profiler_config()
+        if not config["ENABLED"]:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.config = config
+
+    def __call__(self, request):
+        if (
+            request.path.startswith(tuple(self.config["EXCLUDE_PATHS"]))
+            or random.random() >= self.config["SAMPLE_RATE"]
+            or not _profiling.acquire(blocking=False)
+        ):
+            return self.get_response(request)
+        try:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:  # another profiling tool is active in this process
+                return self.get_response(request)
+            recorder = QueryRecorder(self.config["MAX_QUERIES"])
+            start = time.perf_counter()
+            try:
+                with recorder.record():
+                    response = self.get_response(request)
+            finally:
+                profiler.disable()
+            duration_ms = (time.perf_counter() - start) * 1000
+        finally:
+            _profiling.release()
+
+        # A streaming response has barely started when get_response returns.
+        if duration_ms >= self.config["THRESHOLD_MS"] and not response.streaming:
+            try:
+                save_profile(profiler, _record(request, response, duration_ms, recorder, self.config))
+            except OSError:
+                logger.warning("Could not save the profile of a slow request", exc_info=True)
+        return response
+
+
+def _record(request, response, duration_ms: float, recorder: QueryRecorder, config: dict) -> dict:
+    user = getattr(request, "user", None)
+    return {
+        "method": request.method,
+        "path": request.get_full_path(),
+        "status": response.status_code,
+        "user_id": user.pk if user is not None and user.is_authenticated else None,
+        "threshold_ms": config["THRESHOLD_MS"],
+        "timings": {
+            "total_ms": round(duration_ms, 1),
+            "db_ms": round(recorder.total_ms, 1),
+            "python_ms": round(duration_ms - recorder.total_ms, 1),
+        },
+        "query_count": recorder.count,
+        "queries_truncated": recorder.truncated,
+        "queries": recorder.as_list(),
+    }
+
+
+# ------------------------------------------------------------------
+# Ring on disk
+# ------------------------------------------------------------------
+
+def save_profile(profiler: cProfile.Profile, record: dict) -> str:
+    """Write ``profiler``'s stats and ``record``; drop captures beyond ``MAX_PROFILES``."""
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    # Millisecond timestamp first, so names sort oldest to newest.
+    profile_id = f"{int(time.time() * 1000):013d}-{secrets.token_hex(4)}"
+    profiler.dump_stats(directory / f"{profile_id}.prof")
+    record = {"id": profile_id, "created_at": timezone.now().isoformat(), **record}
+    (directory / f"{profile_id}.json").write_text(json.dumps(record))
+
+    records = sorted(directory.glob("*.json"))
+    for stale in records[:-profiler_config()["MAX_PROFILES"]]:
+        stale.unlink(missing_ok=True)
+        stale.with_suffix(".prof").unlink(missing_ok=True)
+    return profile_id
+
+
+def _read(path: Path) -> dict | None:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):  # pruned or half-written meanwhile
+        return None
+
+
+def list_profiles() -> list[dict]:
+    """Kept captures, newest first, without their query logs."""
+    directory = profile_dir()
+    if not directory.is_dir():
+        return []
+    records = (_read(path) for path in sorted(directory.glob("*.json"), reverse=True))
+    return [
+        {key: value for key, value in record.items() if key != "queries"}
+        for record in records
+        if record is not None
+    ]
+
+
+def profile_path(profile_id: str) -> Path | None:
+    """The ``.prof`` file of ``profile_id``, or ``None`` if it isn't kept."""
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    path = profile_dir() / f"{profile_id}.prof"
+    return path if path.is_file() else None
+
+
+def load_profile(profile_id: str) -> dict | None:
+    """The capture's record plus the top functions by cumulative time."""
+    path = profile_path(profile_id)
+    record = _read(path.with_suffix(".json")) if path is not None else None
+    if record is None:
+        return None
+    out = io.StringIO()
+    pstats.Stats(str(path), stream=out).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(SUMMARY_FUNCTIONS)
+    return {**record, "summary": out.getvalue()}
@@ -0,0 +1,139 @@
+"""
+EXPLAIN helpers for the hot queries behind the API.
+
+``HOT_QUERIES`` names the filters every request path leans on. The tests
+seed a realistic amount of data, capture the plan for each one and fail if
+it falls back to a full table scan or an explicit sort, so a dropped or
+reordered index shows up in CI instead of in production latency.
+"""
+
+from __future__ import annotations
+
+import inspect
+import re
+from collections.abc import Callable
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from django.db import connection
+from django.db.models import QuerySet
+
+
+_SQLITE_ROW_PREFIX = re.compile(r"^\d+ \d+ \d+ ")
+
+
+@dataclass(frozen=True)
+class PlanProblem:
+    query: str
+    reason: str
+    plan: str
+
+
+def _activity_range(child_id: int, today: date) -> QuerySet:
+    from core.models import Activity
+
+    return Activity.objects.filter(
+        child_id=child_id,
+        activity_date__range=[today - timedelta(days=90), today],
+    )
+
+
+def _activity_changelist(today: date) -> QuerySet:
+    from core.models import Activity
+
+    # The admin's date hierarchy narrowed to a month, in the changelist order.
+    return Activity.objects.filter(activity_date__range=[today.replace(day=1), today]).order_by(
+        "-activity_date", "-created_at", "-pk"
+    )
+
+
+def _children_for_user(user_id: int) -> QuerySet:
+    from core.models import Child
+
+    return Child.objects.filter(user_id=user_id)
+
+
+def _reflections_for_child(child_id: int) -> QuerySet:
+    from core.models import Reflection
+
+    return Reflection.objects.filter(child_id=child_id)
+
+
+def _suggestions_for_skill_and_age(skill_id: int, age: int) -> QuerySet:
+    from core.models import Suggestion
+
+    # The views randomise or re-sort suggestions, so only the filter matters.
+    return Suggestion.objects.filter(skill_id=skill_id, min_age__lte=age, max_age__gte=age).order_by()
+
+
+HOT_QUERIES: dict[str, Callable[..., QuerySet]] = {
+    "activity_by_child_and_date": _activity_range,
+    "activity_changelist_by_date": _activity_changelist,
+    "child_by_user": _children_for_user,
+    "reflection_by_child": _reflections_for_child,
+    "suggestion_by_skill_and_age": _suggestions_for_skill_and_age,
+}
+
+
+@contextmanager
+def _prefer_indexes():
+    """On PostgreSQL, make sequential scans a last resort for this session.
+
+    A seeded test database is far smaller than production, so the planner
+    would happily seq-scan it. With ``enable_seqscan`` off it only does so
+    when no usable index exists — which is exactly the regression we want
+    to catch.
+    """
+    if connection.vendor != "postgresql":
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SET enable_seqscan = off")
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("RESET enable_seqscan")
+
+
+def explain(queryset: QuerySet) -> str:
+    """Return the backend's EXPLAIN output for ``queryset`` as text."""
+    with _prefer_indexes():
+        return queryset.explain()
+
+
+def find_plan_problems(name: str, plan: str) -> list[PlanProblem]:
+    """Return the scan/sort regressions found in an EXPLAIN ``plan``."""
+    problems: list[PlanProblem] = []
+    for line in plan.splitlines():
+        text = line.strip().lstrip("-> ").strip()
+        if connection.vendor == "postgresql":
+            if text.startswith("Seq Scan"):
+                problems.append(PlanProblem(name, "sequential scan", plan))
+            elif text.startswith(("Sort ", "Incremental Sort")):
+                problems.append(PlanProblem(name, "explicit sort", plan))
+        elif connection.vendor == "sqlite":
+            # Rows look like "<id> <parent> <notused> <detail>"; the detail
+            # reads "SCAN <table>" for a full scan and
+            # "SCAN <table> USING [COVERING] INDEX ..." for an index walk.
+            text = _SQLITE_ROW_PREFIX.sub("", text)
+            if text.startswith("SCAN ") and " USING " not in text:
+                problems.append(PlanProblem(name, "sequential scan", plan))
+            elif "USE TEMP B-TREE FOR" in text and "ORDER BY" in text:
+                problems.append(PlanProblem(name, "explicit sort", plan))
+    return problems
+
+
+def check_hot_queries(**params) -> list[PlanProblem]:
+    """EXPLAIN every entry in ``HOT_QUERIES`` and collect the regressions.
+
+    ``params`` supplies the arguments each query builder needs (``child_id``,
+    ``user_id``, ``skill_id``, ``age``, ``today``).
+    """
+    problems: list[PlanProblem] = []
+    for name, build in HOT_QUERIES.items():
+        argnames = inspect.signature(build).parameters
+        queryset = build(**{arg: params[arg] for arg in argnames})
+        problems.extend(find_plan_problems(name, explain(queryset)))
+    return problems
@@ -0,0 +1,69 @@
+"""
+Per-request SQL capture through ``connection.execute_wrapper``.
+
+``QueryRecorder`` times every query run on the database connections while
+it is active, which works with ``DEBUG`` off (unlike
+``connection.queries``). ``core.profiling`` attaches one to each profiled
+request so a kept profile carries its query log; ``core.slow_queries``
+installs its own wrapper with ``wrap_connections``.
+"""
+
+from __future__ import annotations
+
+import time
+from contextlib import ExitStack, contextmanager
+from dataclasses import asdict, dataclass
+
+from django.db import connections
+
+MAX_RECORDED_QUERIES = 200
+
+
+@contextmanager
+def wrap_connections(wrapper):
+    """Install ``wrapper`` on every configured database until the block exits."""
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(wrapper))
+        yield
+
+
+@dataclass(frozen=True)
+class RecordedQuery:
+    sql: str
+    duration_ms: float
+    many: bool = False
+
+
+class QueryRecorder:
+    """Counts and times queries; keeps the first ``limit`` statements."""
+
+    def __init__(self, limit: int = MAX_RECORDED_QUERIES):
+        self.limit = limit
+        self.queries: list[RecordedQuery] = []
+        self.count = 0
+        self.total_ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            self.count += 1
+            self.total_ms += duration_ms
+            if len(self.queries) < self.limit:
+                self.queries.append(RecordedQuery(sql, round(duration_ms, 3), many))
+
+    @property
+    def truncated(self) -> bool:
+        return self.count > len(self.queries)
+
+    @contextmanager
+    def record(self):
+        """Record on every configured database until the block exits."""
+        with wrap_connections(self):
+            yield self
+
+    def as_list(self) -> list[dict]:
+        return [asdict(query) for query in self.queries]
@@ -0,0 +1,68 @@
+"""
+JSON renderer and parser backed by orjson, with a stdlib fallback.
+
+``FastJSONRenderer`` and ``FastJSONParser`` are drop-in replacements for
+DRF's ``JSONRenderer`` / ``JSONParser`` (and the defaults in
+``REST_FRAMEWORK``). orjson serializes dicts, lists, strings, numbers,
+dates, datetimes, UUIDs and NumPy values natively; anything else (Decimal,
+lazy translation strings, querysets, generators, ...) goes through DRF's
+own encoder, so payloads look the same as before. Output stays compact
+UTF-8, as with DRF's defaults. The differences: datetimes keep their
+microseconds, and UTC is written as ``Z``.
+
+Without orjson installed both classes behave exactly like their DRF
+parents. ``python manage.py benchmark renderers`` compares the two on the
+largest payloads.
+"""
+
+from __future__ import annotations
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised by the fallback test
+    orjson = None
+
+_fallback_encoder = JSONEncoder()
+
+
+def _default(obj):
+    return _fallback_encoder.default(obj)
+
+
+def dumps(data, indent: bool = False) -> bytes:
+    """``data`` as compact UTF-8 JSON, with orjson when it is installed."""
+    if orjson is None:
+        return JSONRenderer().render(data, renderer_context={"indent": 2 if indent else None})
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_UTC_Z
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    return orjson.dumps(data, default=_default, option=option)
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b""
+        renderer_context = renderer_context or {}
+        # Any requested indent (``Accept: application/json; indent=4``) gets orjson's two spaces.
+        indent = self.get_indent(accepted_media_type or self.media_type, renderer_context)
+        return dumps(data, indent=bool(indent))
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
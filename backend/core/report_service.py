@@ -0,0 +1,388 @@
+"""
+Payload builders for the dashboard, skill analysis, reports and PDF views.
+
+The views handle HTTP concerns (params, ownership, plan gating) and call
+these functions with a child and a resolved visibility window. Keeping the
+computation here lets it be coalesced, cached and precomputed without a
+request object.
+"""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+from weasyprint import HTML
+
+from core.analytics import load_cooccurrence, load_incidence, load_incidences, skill_count_entries
+from core.models import Activity, Child, Suggestion
+from core.response_cache import CachedPayload, get_or_compute
+from core.timeseries import build_timeseries
+
+REPORT_TIME_RANGES = ("last30days", "last3months", "thisyear")
+DEFAULT_REPORT_TIME_RANGE = "last3months"
+
+
+def clamp_to_visibility(start: date, vis_start: date | None) -> date:
+    """Apply a plan visibility window to the start of a date range."""
+    if vis_start and start < vis_start:
+        return vis_start
+    return start
+
+
+def report_start_date(time_range: str, today: date) -> date:
+    if time_range == "last30days":
+        return today - timedelta(days=30)
+    if time_range == "last3months":
+        return today - timedelta(days=90)
+    if time_range == "thisyear":
+        return date(today.year, 1, 1)
+    return today - timedelta(days=90)  # default
+
+
+RECENT_ACTIVITY_LIMIT = 10
+
+
+def _recent_activity_entry(activity: Activity) -> dict:
+    return {
+        "id": activity.id,
+        "title": activity.title,
+        "activity_date": activity.activity_date,
+        "duration_minutes": activity.duration_minutes,
+        "skills": [skill.name for skill in activity.skills.all()],
+    }
+
+
+def _dashboard_entry(incidence, recent: list[Activity]) -> dict:
+    skill_counts = skill_count_entries(incidence)
+    return {
+        "activity_count": incidence.total_activities(),
+        "skill_counts": skill_counts,
+        "missing_skills": [entry["skill"] for entry in skill_counts if entry["count"] == 0],
+        "recent_activities": [_recent_activity_entry(activity) for activity in recent],
+    }
+
+
+def build_weekly_dashboard(child: Child, vis_start: date | None, today: date) -> dict:
+    date_from = clamp_to_visibility(today - timedelta(days=6), vis_start)
+
+    recent = (
+        child.activities.filter(activity_date__range=[date_from, today])
+        .prefetch_related("skills")
+        .order_by("-activity_date", "-created_at")[:RECENT_ACTIVITY_LIMIT]
+    )
+    return _dashboard_entry(load_incidence(child, date_from, today), list(recent))
+
+
+def build_household_dashboard(children: list[Child], vis_start: date | None, today: date) -> dict:
+    """Weekly dashboards for several children with a fixed number of queries."""
+    date_from = clamp_to_visibility(today - timedelta(days=6), vis_start)
+    child_ids = [child.pk for child in children]
+
+    incidences = load_incidences(child_ids, date_from, today)
+    # The newest activities per child in one query: number each child's rows.
+    recent_by_child = {child_id: [] for child_id in child_ids}
+    recent = (
+        Activity.objects.filter(child_id__in=child_ids, activity_date__range=[date_from, today])
+        .annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=[F("child_id")],
+                order_by=[F("activity_date").desc(), F("created_at").desc()],
+            )
+        )
+        .filter(position__lte=RECENT_ACTIVITY_LIMIT)
+        .order_by("child_id", "position")
+        .prefetch_related("skills")
+    ) if child_ids else []
+    for activity in recent:
+        recent_by_child[activity.child_id].append(activity)
+
+    return {
+        "children": [
+            {
+                "child_id": child.pk,
+                "name": child.name,
+                **_dashboard_entry(incidences[child.pk], recent_by_child[child.pk]),
+            }
+            for child in children
+        ],
+        "date_from": date_from,
+        "date_to": today,
+        "visibility_limited": vis_start is not None,
+        "visibility_start": str(vis_start) if vis_start else None,
+    }
+
+
+def _suggestion_entry(suggestion: Suggestion) -> dict:
+    return {
+        "id": suggestion.id,
+        "title": suggestion.title,
+        "description": suggestion.description,
+        "skill_name": suggestion.skill.name,
+        "duration_range": f"{suggestion.min_age}-{suggestion.max_age} years",
+    }
+
+
+def build_skill_analysis(child: Child, vis_start: date | None, today: date) -> dict:
+    # Analyze last 14 days of activities (clamped by plan visibility window)
+    two_weeks_ago = clamp_to_visibility(today - timedelta(days=14), vis_start)
+
+    # Skill usage in the last 2 weeks
+    incidence = load_incidence(child, two_weeks_ago, today)
+    skill_counts = incidence.count_map()
+    total_activities = incidence.total_activities()
+    balance = {"week_over_week": incidence.week_over_week(), "time_share": incidence.time_share()}
+    if total_activities == 0:
+        return {
+            "rich_skills": [],
+            "missing_skills": list(skill_counts.keys()),
+            "personalized_suggestions": [],
+            "analysis_text": "No activities logged in the past two weeks. Start by adding some activities!",
+            **balance,
+        }
+
+    # Rich skills (top 3 with multiple activities); missing skills are the
+    # unused ones first, then those with a single activity.
+    rich_skills, missing_skills = incidence.classify()
+
+    # Get suggestions for all skills (both rich and missing)
+    all_available_skills = list(skill_counts.keys())  # Include ALL skills, not just rich + missing
+    suggestions_queryset = (
+        Suggestion.objects.filter(skill__name__in=all_available_skills)
+        .for_children([child.pk], today, default_range=(4, 8))
+        .select_related("skill")
+    )
+
+    # First missing skills (prioritized), then rich skills (secondary priority),
+    # then any other skills so all skills appear in filters.
+    other_skills = [name for name in skill_counts.keys() if name not in rich_skills and name not in missing_skills]
+    personalized_suggestions = []
+    for skill_names in (missing_skills, rich_skills, other_skills):
+        for suggestion in suggestions_queryset.filter(skill__name__in=skill_names):
+            personalized_suggestions.append(_suggestion_entry(suggestion))
+
+    # Ensure ALL skills appear in the response (add placeholders for skills without age-appropriate suggestions)
+    skills_with_suggestions = set(s["skill_name"] for s in personalized_suggestions)
+    for skill_name in skill_counts.keys():
+        if skill_name not in skills_with_suggestions:
+            # Add a generic placeholder so the skill appears in filters
+            personalized_suggestions.append({
+                "id": f"placeholder_{skill_name.lower().replace(' ', '_').replace('/', '_')}",
+                "title": f"Explore {skill_name}",
+                "description": f"Great {skill_name.lower()} activities are perfect for developing important skills. Check back for more suggestions!",
+                "skill_name": skill_name,
+                "duration_range": "All ages",
+            })
+
+    # Generate analysis text
+    if rich_skills and missing_skills:
+        rich_text = " and ".join(rich_skills[:2]) if len(rich_skills) > 1 else rich_skills[0]
+        missing_text = " or ".join(missing_skills[:2])
+        analysis_text = f"This week has been rich in {rich_text} activities. You might enjoy adding some {missing_text} activities."
+    elif rich_skills:
+        rich_text = " and ".join(rich_skills[:2]) if len(rich_skills) > 1 else rich_skills[0]
+        analysis_text = f"Great focus on {rich_text} activities recently! Consider exploring some other skill areas."
+    else:
+        analysis_text = "You've been exploring various skills. Keep up the great work!"
+
+    return {
+        "rich_skills": rich_skills,
+        "missing_skills": missing_skills,
+        "personalized_suggestions": personalized_suggestions,
+        "analysis_text": analysis_text,
+        "total_recent_activities": total_activities,
+        **balance,
+    }
+
+
+def build_report(child: Child, time_range: str, vis_start: date | None, today: date) -> dict:
+    # Apply plan visibility window — clamp start_date for Free users
+    start_date = clamp_to_visibility(report_start_date(time_range, today), vis_start)
+
+    incidence = load_incidence(child, start_date, today)
+
+    # Calculate total stats
+    total_activities = incidence.total_activities()
+    total_minutes = incidence.total_minutes()
+    total_hours = total_minutes // 60
+    remaining_minutes = total_minutes % 60
+
+    # Calculate activities per week
+    days_in_range = (today - start_date).days
+    weeks_in_range = max(days_in_range / 7, 1)
+    activities_per_week = round(total_activities / weeks_in_range, 1)
+
+    # Skill distribution, most used first
+    sorted_skills = [(name, count) for name, count in incidence.ranked() if count]
+
+    # Generate growth highlights
+    growth_highlights = []
+    if sorted_skills:
+        top_skill = sorted_skills[0][0]
+        growth_highlights.append(f"{top_skill} activities have been thriving recently")
+
+    if len(sorted_skills) >= 3:
+        growth_highlights.append(f"Balanced exploration across {len(sorted_skills)} skill areas")
+    elif len(sorted_skills) == 0:
+        growth_highlights.append("Ready to start exploring new activities together!")
+
+    # Monthly breakdown for chart (one grouped query, zero-filled by month)
+    monthly = build_timeseries(child, start_date, today, granularity="month")
+    monthly_data = [
+        {
+            "month": month.strftime("%B %Y"),
+            **{name: counts[index] for name, counts in monthly["series"].items() if counts[index]},
+        }
+        for index, month in enumerate(monthly["buckets"])
+    ]
+
+    return {
+        "total_activities": total_activities,
+        "total_hours": total_hours,
+        "total_minutes": remaining_minutes,
+        "activities_per_week": activities_per_week,
+        "skill_distribution": sorted_skills,
+        "skill_time_share": incidence.time_share(),
+        "growth_highlights": growth_highlights,
+        "monthly_data": monthly_data,
+        "time_range": time_range,
+        "visibility_limited": vis_start is not None,
+        "visibility_start": str(vis_start) if vis_start else None,
+    }
+
+
+def build_skill_cooccurrence(child: Child, start: date, end: date, vis_start: date | None) -> dict:
+    start = clamp_to_visibility(start, vis_start)
+    cooccurrence = load_cooccurrence(child, start, end)
+    return {
+        "start": start,
+        "end": end,
+        "skills": cooccurrence.skill_names,
+        "matrix": cooccurrence.matrix.tolist(),
+        "top_pairs": cooccurrence.top_pairs(),
+        "activities": cooccurrence.activities,
+        "visibility_limited": vis_start is not None,
+        "visibility_start": str(vis_start) if vis_start else None,
+    }
+
+
+# ------------------------------------------------------------------
+# Cached entry points (shared by the views and the cache warmer)
+# ------------------------------------------------------------------
+
+def _data_version(child: Child, today: date) -> tuple:
+    return (child.data_version, today.isoformat())
+
+
+def cached_weekly_dashboard(child: Child, plan: str, vis_start: date | None, today: date, prime: bool = False) -> CachedPayload:
+    return get_or_compute(
+        "weekly-dashboard",
+        plan,
+        child,
+        {"vis_start": vis_start},
+        version=_data_version(child, today),
+        compute=lambda: build_weekly_dashboard(child, vis_start, today),
+        prime=prime,
+    )
+
+
+def cached_skill_analysis(child: Child, plan: str, vis_start: date | None, today: date, prime: bool = False) -> CachedPayload:
+    return get_or_compute(
+        "skill-analysis",
+        plan,
+        child,
+        {"vis_start": vis_start},
+        version=_data_version(child, today),
+        compute=lambda: build_skill_analysis(child, vis_start, today),
+        prime=prime,
+    )
+
+
+def cached_report(
+    child: Child, plan: str, time_range: str, vis_start: date | None, today: date, prime: bool = False
+) -> CachedPayload:
+    return get_or_compute(
+        "reports",
+        plan,
+        child,
+        {"time_range": time_range, "vis_start": vis_start},
+        version=_data_version(child, today),
+        compute=lambda: build_report(child, time_range, vis_start, today),
+        variant=time_range,
+        prime=prime,
+    )
+
+
+def cached_skill_cooccurrence(
+    child: Child, plan: str, start: date, end: date, vis_start: date | None, prime: bool = False
+) -> CachedPayload:
+    return get_or_compute(
+        "skill-cooccurrence",
+        plan,
+        child,
+        {"start": start, "end": end, "vis_start": vis_start},
+        version=(child.data_version,),
+        compute=lambda: build_skill_cooccurrence(child, start, end, vis_start),
+        prime=prime,
+    )
+
+
+def month_bounds(month_start: date) -> tuple[date, date]:
+    if month_start.month == 12:
+        month_end = month_start.replace(year=month_start.year + 1, month=1, day=1) - timedelta(days=1)
+    else:
+        month_end = month_start.replace(month=month_start.month + 1, day=1) - timedelta(days=1)
+    return month_start, month_end
+
+
+def render_monthly_snapshot_pdf(child: Child, month_start: date) -> bytes:
+    month_start, month_end = month_bounds(month_start)
+
+    activities = child.activities.filter(activity_date__range=[month_start, month_end]).prefetch_related("skills")
+    total_activities = activities.count()
+
+    skill_distribution = (
+        activities.values("skills__name")
+        .annotate(count=Count("id"))
+        .order_by("skills__name")
+    )
+
+    activities_html = "".join(
+        [
+            f"<li><strong>{activity.activity_date}</strong> — {activity.title}"
+            f" ({', '.join([s.name for s in activity.skills.all()])})</li>"
+            for activity in activities
+        ]
+    )
+    skills_html = "".join(
+        [f"<li>{row['skills__name'] or 'Unmapped'}: {row['count']}</li>" for row in skill_distribution]
+    )
+
+    html = f"""
+    <html>
+      <head>
+        <style>
+          body {{ font-family: Arial, sans-serif; color: #2f3b2f; padding: 24px; }}
+          h1 {{ color: #3f5f4a; margin-bottom: 4px; }}
+          h2 {{ color: #516a5a; margin-top: 20px; }}
+          .meta {{ color: #67766d; margin-bottom: 16px; }}
+          ul {{ padding-left: 20px; }}
+        </style>
+      </head>
+      <body>
+        <h1>EarlyLedge Monthly Snapshot</h1>
+        <div class="meta">{child.name} • {month_start.strftime('%B %Y')}</div>
+        <p>Total activities: <strong>{total_activities}</strong></p>
+
+        <h2>Skill distribution</h2>
+        <ul>{skills_html or '<li>No activities logged.</li>'}</ul>
+
+        <h2>Activities</h2>
+        <ul>{activities_html or '<li>No activities logged.</li>'}</ul>
+      </body>
+    </html>
+    """
+
+    return HTML(string=html).write_pdf()
@@ -0,0 +1,153 @@
+"""
+Stale-while-revalidate caching of computed response payloads.
+
+An entry is *fresh* while it was computed from the current data (same
+version token) and is younger than the endpoint's ``fresh`` window. Past
+that — older, or the child's data has changed since — it is *stale*: while
+it is younger than ``max_stale`` it is still served immediately, and a
+background refresh recomputes it and stores the result. Otherwise (or with
+no entry at all) the caller computes synchronously. ``max_stale: 0`` gives
+plain caching: up-to-date entries are reused, outdated ones never served.
+
+Windows are configured per endpoint and plan in ``settings.RESPONSE_CACHE``::
+
+    RESPONSE_CACHE = {
+        "reports:thisyear": {"plus": {"fresh": 300, "max_stale": 3600}},
+        "skill-analysis": {"free": {...}, "plus": {...}},
+    }
+
+A ``"<endpoint>:<variant>"`` entry (e.g. one report time range) wins over
+the bare endpoint. Endpoints without a window are computed every time
+(still through single-flight, so concurrent duplicates are shared).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from collections.abc import Callable
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from core.sharding import current_shard, use_shard
+from core.singleflight import reports_flight
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    fresh: int
+    max_stale: int
+
+
+@dataclass(frozen=True)
+class CachedPayload:
+    payload: Any
+    age: int
+    stale: bool
+
+    def apply_to(self, response):
+        """Mark a DRF ``Response`` with the ``stale`` flag and an ``Age`` header."""
+        response.data = {**response.data, "stale": self.stale}
+        response["Age"] = str(self.age)
+        return response
+
+
+def get_policy(endpoint: str, plan: str, variant: str | None = None) -> CachePolicy | None:
+    config = getattr(settings, "RESPONSE_CACHE", {})
+    endpoint_config = (variant and config.get(f"{endpoint}:{variant}")) or config.get(endpoint) or {}
+    windows = endpoint_config.get(plan)
+    if not windows:
+        return None
+    return CachePolicy(fresh=windows["fresh"], max_stale=windows.get("max_stale", windows["fresh"]))
+
+
+def entry_key(endpoint: str, child_id: int, params: dict) -> str:
+    encoded = "&".join(f"{name}={params[name]}" for name in sorted(params))
+    return f"swr:{endpoint}:c{child_id}:{hashlib.sha1(encoded.encode(), usedforsecurity=False).hexdigest()}"
+
+
+def _flight_key(key: str, version) -> str:
+    # Cache keys must stay free of spaces and quotes (memcached rejects them).
+    parts = version if isinstance(version, (tuple, list)) else (version,)
+    return f"{key}:" + "-".join(str(part) for part in parts)
+
+
+def store(key: str, payload, version, policy: CachePolicy, computed_at: float | None = None) -> None:
+    entry = {"payload": payload, "version": version, "computed_at": computed_at or time.time()}
+    cache.set(key, entry, max(policy.fresh, policy.max_stale))
+
+
+def _refresh(key: str, version, policy: CachePolicy, compute: Callable[[], Any]) -> None:
+    try:
+        payload = reports_flight.do(_flight_key(key, version), compute)
+        store(key, payload, version, policy)
+    except Exception:
+        logger.exception("Background refresh of %s failed", key)
+    finally:
+        cache.delete(f"{key}:refreshing")
+
+
+def _schedule_refresh(key: str, version, policy: CachePolicy, compute: Callable[[], Any]) -> None:
+    # One refresh per entry at a time, across processes.
+    if not cache.add(f"{key}:refreshing", 1, policy.fresh or 60):
+        return
+    if getattr(settings, "RESPONSE_CACHE_REFRESH", "thread") == "inline":
+        _refresh(key, version, policy, compute)
+        return
+
+    # A new thread starts with an empty context: carry the request's shard over.
+    shard = current_shard()
+
+    def run():
+        try:
+            with use_shard(shard) if shard else nullcontext():
+                _refresh(key, version, policy, compute)
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=run, name=f"refresh {key}", daemon=True).start()
+
+
+def get_or_compute(
+    endpoint: str,
+    plan: str,
+    child,
+    params: dict,
+    version,
+    compute: Callable[[], Any],
+    variant: str | None = None,
+    prime: bool = False,
+) -> CachedPayload:
+    """Return the payload for ``params``, serving stale entries per policy.
+
+    ``version`` is whatever identifies the data the payload was computed
+    from (typically the child's data version and the request date); an
+    entry with a different version is stale rather than missing. ``prime``
+    skips the lookup and (re)computes the entry, for cache warming.
+    """
+    policy = get_policy(endpoint, plan, variant)
+    key = entry_key(endpoint, child.pk, params)
+    if policy is None:
+        return CachedPayload(reports_flight.do(_flight_key(key, version), compute), age=0, stale=False)
+
+    entry = None if prime else cache.get(key)
+    if entry is not None:
+        age = max(int(time.time() - entry["computed_at"]), 0)
+        if entry["version"] == version and age <= policy.fresh:
+            return CachedPayload(entry["payload"], age=age, stale=False)
+        if age < policy.max_stale:
+            _schedule_refresh(key, version, policy, compute)
+            return CachedPayload(entry["payload"], age=age, stale=True)
+
+    payload = reports_flight.do(_flight_key(key, version), compute)
+    store(key, payload, version, policy)
+    return CachedPayload(payload, age=0, stale=False)
@@ -1,9 +1,9 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
-from django.db.models import Count
 from django.utils import timezone
 from rest_framework import serializers
 
+from core.analytics import load_incidence, skill_count_entries
 from core.models import Activity, Child, Reflection, SkillCategory, Suggestion
 from core.services import auto_map_skills
 
@@ -41,8 +41,8 @@ class ChildSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Child
-        fields = ["id", "name", "date_of_birth", "age", "created_at"]
-        read_only_fields = ["id", "age", "created_at"]
+        fields = ["id", "name", "date_of_birth", "age", "created_at", "updated_at"]
+        read_only_fields = ["id", "age", "created_at", "updated_at"]
 
     def get_age(self, obj: Child):
         return obj.age
@@ -74,10 +74,11 @@ class ActivitySerializer(serializers.ModelSerializer):
             "duration_minutes",
             "activity_date",
             "created_at",
+            "updated_at",
             "skills",
             "skill_ids",
         ]
-        read_only_fields = ["id", "created_at", "skills"]
+        read_only_fields = ["id", "created_at", "updated_at", "skills"]
 
     def validate_child(self, value: Child) -> Child:
         request = self.context["request"]
@@ -144,19 +145,4 @@ class WeeklyDashboardSerializer(serializers.Serializer):
 
 
 def build_skill_counts_for_child(child: Child, date_from, date_to):
-    all_skills = SkillCategory.objects.all()
-    counts = (
-        child.activities.filter(activity_date__range=[date_from, date_to])
-        .values("skills__id", "skills__name")
-        .annotate(count=Count("id"))
-    )
-    count_map = {row["skills__name"]: row["count"] for row in counts if row["skills__name"]}
-
-    return [
-        {
-            "skill_id": skill.id,
-            "skill": skill.name,
-            "count": count_map.get(skill.name, 0),
-        }
-        for skill in all_skills
-    ]
+    return skill_count_entries(load_incidence(child, date_from, date_to))
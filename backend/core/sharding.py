@@ -0,0 +1,416 @@
+"""
+User-id sharding: each account's rows live on one of several databases.
+
+Every user-owned row hangs off ``User`` (through ``Child`` for most of
+them), so an account's data can sit on one database, its shard, and no
+query ever needs to join across shards. ``settings.SHARDS`` lists the
+database aliases that hold accounts, ``"default"`` first. With only
+``"default"`` listed (the normal setup) ``ShardRouter`` steps aside and
+nothing here changes behaviour.
+
+With several shards:
+
+* ``User.shard`` on the default database is the directory. New accounts go
+  to the shard with the fewest users; ``move_user`` and
+  ``python manage.py shards rebalance`` move them later;
+* the models in ``SHARDED_MODELS`` are read and written on the shard of
+  the user the current request authenticated (``ShardMiddleware``), or of
+  the instance they are reached from. Code outside a request picks one
+  with ``use_shard`` / ``use_user_shard``;
+* ``User`` rows, sessions, auth tables and the slow-query log stay on the
+  default database. Each shard keeps a copy of its users' ``User`` rows
+  only so foreign keys hold there;
+* reference data (``REPLICATED_MODELS``: skills and suggestions) is written
+  to the default database and copied to every shard on save, so joins
+  against it stay local. ``python manage.py shards sync`` copies it in
+  full after adding a shard;
+* ``python manage.py shards init`` gives each shard its own id range
+  (``SHARD_ID_SPAN``), so ids stay unique and a moved user keeps them;
+* ``cross_shard`` and ``shard_counts`` run admin queries on every shard
+  and merge the results (also ``GET /api/admin/shards/``).
+
+Maintenance commands that walk all children (rollups, streaks, archives,
+tombstones, cache warming) run on every shard in turn, or on those named
+with ``--shard``. ``bulk_set_user_plan`` groups users by shard itself.
+Admin changelists of user-owned models show one shard at a time, picked
+in the "shard" filter.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Iterable
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.db.models import Count
+
+# Ids on the shard at position i of SHARDS start at i * SHARD_ID_SPAN.
+SHARD_ID_SPAN = 10**12
+MOVE_BATCH_SIZE = 1000
+
+SHARDED_MODELS = frozenset({
+    "subscription", "child", "activity", "activityskill", "reflection",
+    "tombstone", "weeklyrollup", "childstreak", "activityarchive",
+})
+REPLICATED_MODELS = frozenset({"skillcategory", "suggestion"})
+
+# Rows that belong to a user, parents first, with the lookup to the owner.
+_OWNED_ROWS = (
+    ("subscription", "user_id"),
+    ("child", "user_id"),
+    ("activity", "child__user_id"),
+    ("activityskill", "activity__child__user_id"),
+    ("reflection", "child__user_id"),
+    ("tombstone", "user_id"),
+    ("weeklyrollup", "child__user_id"),
+    ("childstreak", "child__user_id"),
+    ("activityarchive", "child__user_id"),
+)
+
+_current = ContextVar("current_shard", default=None)
+
+
+class ShardingError(Exception):
+    pass
+
+
+def shard_aliases() -> list[str]:
+    return list(getattr(settings, "SHARDS", [DEFAULT_DB_ALIAS]))
+
+
+def is_sharded() -> bool:
+    return len(shard_aliases()) > 1
+
+
+def _model(name: str):
+    return apps.get_model("core", name)
+
+
+def _users_per_shard() -> dict[str, int]:
+    return dict(_model("user").objects.values_list("shard").annotate(users=Count("pk")).order_by())
+
+
+# ------------------------------------------------------------------
+# Shard selection
+# ------------------------------------------------------------------
+
+@contextmanager
+def use_shard(alias: str):
+    """Route user-owned models to ``alias`` inside the block."""
+    if alias not in shard_aliases():
+        raise ShardingError(f"Unknown shard {alias!r}; SHARDS is {shard_aliases()}.")
+    token = _current.set(alias)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def use_user_shard(user):
+    return use_shard(user.shard)
+
+
+def atomic_for(model):
+    """``transaction.atomic`` on the database ``model`` is written to (the current shard, if sharded)."""
+    return transaction.atomic(using=router.db_for_write(model))
+
+
+def add_shard_argument(parser) -> None:
+    """``--shard`` for management commands that walk user-owned rows."""
+    parser.add_argument(
+        "--shard",
+        action="append",
+        dest="shards",
+        choices=shard_aliases(),
+        help="Only this shard (repeatable; default: every shard in SHARDS)",
+    )
+
+
+def selected_shards(options: dict) -> list[str]:
+    return options.get("shards") or shard_aliases()
+
+
+def current_shard() -> str | None:
+    value = _current.get()
+    if value is None or isinstance(value, str):
+        return value
+    # A request: its user is only known once DRF has authenticated it.
+    user = getattr(value, "user", None)
+    if user is not None and user.is_authenticated:
+        return user.shard
+    return None
+
+
+class ShardMiddleware:
+    """Routes a request's queries to the shard of the user it authenticates."""
+
+    def __init__(self, get_response):
+        if not is_sharded():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _current.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _current.reset(token)
+
+
+class ShardRouter:
+    def _from_instance(self, instance) -> str | None:
+        if instance is None:
+            return None
+        name = instance._meta.model_name
+        if name == "user":
+            return instance.shard
+        if name in SHARDED_MODELS or name in REPLICATED_MODELS:
+            if instance._state.db:
+                return instance._state.db
+            # Unsaved: follow a related object it was built with (Child(user=...)).
+            for parent in instance._state.fields_cache.values():
+                alias = self._from_instance(parent)
+                if alias is not None:
+                    return alias
+        return None
+
+    def _route(self, model, hints, write: bool) -> str | None:
+        if not is_sharded() or model._meta.app_label != "core":
+            return None
+        name = model._meta.model_name
+        if name in REPLICATED_MODELS and write:
+            return DEFAULT_DB_ALIAS  # copied to the shards by core.signals
+        if name in SHARDED_MODELS or name in REPLICATED_MODELS:
+            return self._from_instance(hints.get("instance")) or current_shard() or DEFAULT_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_read(self, model, **hints):
+        return self._route(model, hints, write=False)
+
+    def db_for_write(self, model, **hints):
+        return self._route(model, hints, write=True)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Users live on default and are copied to their shard; reference data everywhere.
+        return True if is_sharded() else None
+
+
+# ------------------------------------------------------------------
+# Copies: users and reference data
+# ------------------------------------------------------------------
+
+def _clone(instance):
+    model = type(instance)
+    return model(**{field.attname: getattr(instance, field.attname) for field in model._meta.concrete_fields})
+
+
+def copy_rows(model, rows: list, alias: str) -> None:
+    """Upsert ``rows`` (keeping their ids and timestamps) into database ``alias``."""
+    if not rows:
+        return
+    fields = model._meta.concrete_fields
+    # bulk_create stamps auto_now/auto_now_add fields; they are put back afterwards.
+    stamped = [field for field in fields if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)]
+    originals = [[getattr(row, field.attname) for field in stamped] for row in rows]
+    model._base_manager.using(alias).bulk_create(
+        rows,
+        batch_size=MOVE_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=[model._meta.pk.name],
+        update_fields=[field.name for field in fields if not field.primary_key],
+    )
+    if stamped:
+        for row, values in zip(rows, originals):
+            for field, value in zip(stamped, values):
+                setattr(row, field.attname, value)
+        model._base_manager.using(alias).bulk_update(rows, [field.name for field in stamped], batch_size=MOVE_BATCH_SIZE)
+
+
+def assign_shard(user) -> None:
+    """Place a new user on the shard with the fewest users (unless one was chosen)."""
+    if not is_sharded() or user.shard != DEFAULT_DB_ALIAS:
+        return
+    counts = _users_per_shard()
+    user.shard = min(shard_aliases(), key=lambda alias: (counts.get(alias, 0), shard_aliases().index(alias)))
+
+
+def copy_user(user) -> None:
+    """Keep the shard's copy of ``user`` (the target of its foreign keys) current."""
+    if is_sharded() and user._state.db == DEFAULT_DB_ALIAS and user.shard != DEFAULT_DB_ALIAS:
+        copy_rows(type(user), [_clone(user)], user.shard)
+
+
+def delete_user_copy(user) -> None:
+    """Drop a deleted user's shard copy; the shard cascades to the user's rows."""
+    if is_sharded() and user._state.db == DEFAULT_DB_ALIAS and user.shard != DEFAULT_DB_ALIAS:
+        type(user)._base_manager.using(user.shard).filter(pk=user.pk).delete()
+
+
+def replicate(instance) -> None:
+    if is_sharded() and instance._state.db == DEFAULT_DB_ALIAS:
+        for alias in shard_aliases()[1:]:
+            copy_rows(type(instance), [_clone(instance)], alias)
+
+
+def unreplicate(instance) -> None:
+    if is_sharded() and instance._state.db == DEFAULT_DB_ALIAS:
+        for alias in shard_aliases()[1:]:
+            type(instance)._base_manager.using(alias).filter(pk=instance.pk).delete()
+
+
+def sync_shard(alias: str) -> dict[str, int]:
+    """Bring reference data and user copies on ``alias`` in line with default."""
+    if alias == DEFAULT_DB_ALIAS:
+        return {}
+    copied = {}
+    with transaction.atomic(using=alias):
+        for name in ("skillcategory", "suggestion"):
+            model = _model(name)
+            rows = list(model._base_manager.using(DEFAULT_DB_ALIAS).all())
+            model._base_manager.using(alias).exclude(pk__in=[row.pk for row in rows]).delete()
+            copy_rows(model, rows, alias)
+            copied[model._meta.verbose_name_plural] = len(rows)
+        User = _model("user")
+        users = list(User._base_manager.using(DEFAULT_DB_ALIAS).filter(shard=alias))
+        copy_rows(User, users, alias)
+        copied["users"] = len(users)
+    return copied
+
+
+def init_id_range(alias: str) -> int:
+    """Start ``alias``'s id sequences at its range; returns the first id."""
+    start = shard_aliases().index(alias) * SHARD_ID_SPAN
+    if start == 0:
+        return 1
+    connection = connections[alias]
+    with transaction.atomic(using=alias), connection.cursor() as cursor:
+        for name in SHARDED_MODELS:
+            table = _model(name)._meta.db_table
+            if connection.vendor == "postgresql":
+                cursor.execute(
+                    f'SELECT setval(pg_get_serial_sequence(%s, \'id\'), GREATEST(%s, (SELECT COALESCE(MAX(id), 0) FROM "{table}")))',
+                    [table, start],
+                )
+            elif connection.vendor == "sqlite":
+                cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = %s", [table])
+                row = cursor.fetchone()
+                if row is None:
+                    cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)", [table, start])
+                elif row[0] < start:
+                    cursor.execute("UPDATE sqlite_sequence SET seq = %s WHERE name = %s", [start, table])
+            else:
+                raise ShardingError(f"Don't know how to set id ranges on {connection.vendor}.")
+    return start + 1
+
+
+# ------------------------------------------------------------------
+# Moving users
+# ------------------------------------------------------------------
+
+def move_user(user, target: str) -> dict[str, int]:
+    """Copy ``user``'s rows to ``target``, point the directory at it, delete the originals.
+
+    Ids are kept. Writes for the user that land on the old shard while the
+    copy runs are lost, so move accounts while they are idle.
+    """
+    from core.versioning import bump_user_version
+
+    source = user.shard
+    if target not in shard_aliases():
+        raise ShardingError(f"Unknown shard {target!r}; SHARDS is {shard_aliases()}.")
+    if target == source:
+        return {}
+
+    User = type(user)
+    moved = {}
+    with transaction.atomic(using=DEFAULT_DB_ALIAS), transaction.atomic(using=source), transaction.atomic(using=target):
+        if target != DEFAULT_DB_ALIAS:
+            copy_rows(User, [_clone(user)], target)
+        for name, owner in _OWNED_ROWS:
+            model = _model(name)
+            rows = list(model._base_manager.using(source).filter(**{owner: user.pk}).order_by("pk"))
+            copy_rows(model, rows, target)
+            moved[name] = len(rows)
+        # Children first; a plain delete would fire the signals and cascades meant for real deletions.
+        for name, owner in reversed(_OWNED_ROWS):
+            model = _model(name)
+            model._base_manager.using(source).filter(**{owner: user.pk})._raw_delete(source)
+        if source != DEFAULT_DB_ALIAS:
+            User._base_manager.using(source).filter(pk=user.pk)._raw_delete(source)
+        User._base_manager.using(DEFAULT_DB_ALIAS).filter(pk=user.pk).update(shard=target)
+        user.shard = target
+        # Cached responses were computed against the old shard.
+        bump_user_version(user.pk)
+    return moved
+
+
+def rebalance_plan(max_moves: int | None = None) -> list[tuple[int, str, str]]:
+    """``(user_id, from, to)`` moves that even out the number of users per shard."""
+    aliases = shard_aliases()
+    counts = {alias: 0 for alias in aliases}
+    counts.update((alias, users) for alias, users in _users_per_shard().items() if alias in counts)
+    moves = []
+    while max_moves is None or len(moves) < max_moves:
+        fullest = max(aliases, key=lambda alias: counts[alias])
+        emptiest = min(aliases, key=lambda alias: counts[alias])
+        if counts[fullest] - counts[emptiest] <= 1:
+            break
+        counts[fullest] -= 1
+        counts[emptiest] += 1
+        moves.append((fullest, emptiest))
+
+    # The newest accounts move first: they have the least data.
+    User = _model("user")
+    candidates = {
+        source: iter(User.objects.filter(shard=source).order_by("-pk").values_list("pk", flat=True)[:needed])
+        for source, needed in Counter(source for source, _ in moves).items()
+    }
+    return [(next(candidates[source]), source, target) for source, target in moves]
+
+
+# ------------------------------------------------------------------
+# Cross-shard queries
+# ------------------------------------------------------------------
+
+def cross_shard(queryset, aliases: Iterable[str] | None = None) -> list:
+    """Evaluate ``queryset`` on every shard and concatenate the results."""
+    return [row for alias in (aliases or shard_aliases()) for row in queryset.using(alias)]
+
+
+def shard_counts() -> list[dict]:
+    """Users, children and activities per shard."""
+    Child, Activity = _model("child"), _model("activity")
+    users = _users_per_shard()
+    return [
+        {
+            "shard": alias,
+            "users": users.get(alias, 0),
+            "children": Child._base_manager.using(alias).count(),
+            "activities": Activity._base_manager.using(alias).count(),
+            "first_id": max(shard_aliases().index(alias) * SHARD_ID_SPAN, 1),
+        }
+        for alias in shard_aliases()
+    ]
+
+
+def locate_user(identifier: str) -> dict | None:
+    """Where a user (email or id) lives and how much data they have there."""
+    User, Child, Activity = _model("user"), _model("child"), _model("activity")
+    lookup = {"pk": int(identifier)} if str(identifier).isdigit() else {"email": identifier}
+    row = User.objects.filter(**lookup).values("pk", "email", "shard").first()
+    if row is None:
+        return None
+    alias = row["shard"]
+    return {
+        "user_id": row["pk"],
+        "email": row["email"],
+        "shard": alias,
+        "children": Child._base_manager.using(alias).filter(user_id=row["pk"]).count(),
+        "activities": Activity._base_manager.using(alias).filter(child__user_id=row["pk"]).count(),
+    }
+
@@ -0,0 +1,221 @@
+"""
+Model signal receivers for derived state.
+
+Connected in ``CoreConfig.ready``. Each receiver is small and delegates to
+the module that owns the derived data.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.events import publish_child_changed
+from core.heatmap import invalidate_months
+from core.models import Activity, Child, Reflection, SkillCategory, Subscription, Suggestion, Tombstone, User
+from core.sharding import assign_shard, copy_user, delete_user_copy, replicate, unreplicate
+from core.streaks import rebuild_streak, record_active_day, record_day_removed
+from core.sync import record_tombstone
+from core.trends import schedule_week_refresh
+from core.versioning import bump_all_user_versions, bump_child_version, bump_user_version
+
+_activity_signals_suppressed = ContextVar("activity_signals_suppressed", default=False)
+
+
+@contextmanager
+def suppress_activity_signals():
+    """Skip the per-row Activity receivers for bulk moves (see ``core.archive``).
+
+    The caller is responsible for the derived state those receivers maintain.
+    """
+    token = _activity_signals_suppressed.set(True)
+    try:
+        yield
+    finally:
+        _activity_signals_suppressed.reset(token)
+
+
+def _unless_suppressed(receiver_func):
+    @wraps(receiver_func)
+    def wrapper(sender, **kwargs):
+        if sender is Activity and _activity_signals_suppressed.get():
+            return
+        return receiver_func(sender, **kwargs)
+
+    return wrapper
+
+
+@receiver([post_save, post_delete], sender=Child)
+def child_changed(sender, instance: Child, **kwargs):
+    bump_child_version(instance.pk, instance.user_id)
+
+
+def _activity_date(value):
+    return Activity._meta.get_field("activity_date").to_python(value)
+
+
+@receiver(pre_save, sender=Activity)
+@_unless_suppressed
+def remember_activity_date(sender, instance: Activity, raw=False, **kwargs):
+    # Lets post_save receivers see where a re-dated activity moved from.
+    instance._previous_activity_date = None
+    if instance.pk and not raw:
+        instance._previous_activity_date = (
+            Activity.objects.filter(pk=instance.pk).values_list("activity_date", flat=True).first()
+        )
+
+
+# The rollup receivers are connected before child_data_changed, so the weeks
+# are refreshed on commit before the change event reads them.
+@receiver(post_save, sender=Activity)
+@_unless_suppressed
+def activity_saved_rollups(sender, instance: Activity, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    schedule_week_refresh(instance.child_id, _activity_date(instance.activity_date), using)
+    previous = getattr(instance, "_previous_activity_date", None)
+    if previous is not None:
+        schedule_week_refresh(instance.child_id, previous, using)
+
+
+@receiver(post_delete, sender=Activity)
+@_unless_suppressed
+def activity_deleted_rollups(sender, instance: Activity, origin=None, using=None, **kwargs):
+    if _deleted_with_child(origin):
+        return
+    schedule_week_refresh(instance.child_id, _activity_date(instance.activity_date), using)
+
+
+@receiver([post_save, post_delete], sender=Activity)
+@receiver([post_save, post_delete], sender=Reflection)
+@_unless_suppressed
+def child_data_changed(sender, instance, using=None, origin=None, **kwargs):
+    if _deleted_with_child(origin):
+        return  # child_changed bumps the owner once for the whole cascade
+    bump_child_version(instance.child_id)
+    publish_child_changed(instance.child_id, using)
+
+
+@receiver(m2m_changed, sender=Activity.skills.through)
+def activity_skills_changed(sender, instance, action, reverse, using=None, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear") or reverse:
+        return
+    # Skills are part of the synced activity row.
+    Activity.objects.filter(pk=instance.pk).update(updated_at=timezone.now())
+    bump_child_version(instance.child_id)
+    schedule_week_refresh(instance.child_id, _activity_date(instance.activity_date), using)
+    publish_child_changed(instance.child_id, using)
+
+
+def _origin_model(origin):
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+
+def _deleted_with_child(origin) -> bool:
+    # Cascades from deleting a child or user take its derived rows with them.
+    return origin is not None and _origin_model(origin) in (Child, User)
+
+
+def _deleted_with_user(origin) -> bool:
+    # Nobody is left to sync the deletion to, and the tombstone would point
+    # at the user being deleted.
+    return origin is not None and _origin_model(origin) is User
+
+
+@receiver(post_save, sender=Activity)
+@_unless_suppressed
+def activity_saved_streak(sender, instance: Activity, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    new_date = _activity_date(instance.activity_date)
+    previous = getattr(instance, "_previous_activity_date", None)
+    if created:
+        record_active_day(instance.child_id, new_date, instance.pk)
+    elif previous is not None and previous != new_date:
+        rebuild_streak(instance.child_id)
+
+
+@receiver(post_delete, sender=Activity)
+@_unless_suppressed
+def activity_deleted_streak(sender, instance: Activity, origin=None, **kwargs):
+    if _deleted_with_child(origin):
+        return
+    record_day_removed(instance.child_id, _activity_date(instance.activity_date))
+
+
+@receiver([post_save, post_delete], sender=Activity)
+@_unless_suppressed
+def activity_changed_heatmap(sender, instance: Activity, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_previous_activity_date", None)
+    invalidate_months(instance.child_id, _activity_date(instance.activity_date), previous)
+
+
+@receiver(post_delete, sender=Child)
+def child_deleted(sender, instance: Child, origin=None, **kwargs):
+    if _deleted_with_user(origin):
+        return
+    record_tombstone(Tombstone.KIND_CHILD, instance.pk, user_id=instance.user_id)
+
+
+@receiver(post_delete, sender=Activity)
+@_unless_suppressed
+def activity_deleted(sender, instance: Activity, origin=None, **kwargs):
+    # The child's (or no) tombstone covers rows deleted with it.
+    if _deleted_with_child(origin):
+        return
+    record_tombstone(Tombstone.KIND_ACTIVITY, instance.pk, child_id=instance.child_id)
+
+
+@receiver(post_delete, sender=Reflection)
+def reflection_deleted(sender, instance: Reflection, origin=None, **kwargs):
+    # The child's (or no) tombstone covers rows deleted with it.
+    if _deleted_with_child(origin):
+        return
+    record_tombstone(Tombstone.KIND_REFLECTION, instance.pk, child_id=instance.child_id)
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_changed(sender, instance: Subscription, **kwargs):
+    # The plan decides the visibility window, so it is part of the user's data.
+    bump_user_version(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=SkillCategory)
+def skills_changed(sender, **kwargs):
+    bump_all_user_versions()
+
+
+@receiver(pre_save, sender=User)
+def place_new_user(sender, instance: User, raw=False, **kwargs):
+    if instance._state.adding and not raw:
+        assign_shard(instance)
+
+
+@receiver(post_save, sender=User)
+def user_saved_copy(sender, instance: User, raw=False, **kwargs):
+    if not raw:
+        copy_user(instance)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted_copy(sender, instance: User, **kwargs):
+    delete_user_copy(instance)
+
+
+@receiver(post_save, sender=SkillCategory)
+@receiver(post_save, sender=Suggestion)
+def reference_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        replicate(instance)
+
+
+@receiver(post_delete, sender=SkillCategory)
+@receiver(post_delete, sender=Suggestion)
+def reference_deleted(sender, instance, **kwargs):
+    unreplicate(instance)
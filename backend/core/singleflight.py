@@ -0,0 +1,129 @@
+"""
+Single-flight coalescing for expensive, deterministic computations.
+
+When several requests ask for the same result at once (a parent refreshing,
+several tabs, two caregivers), only one of them computes it; the others wait
+and share the result.
+
+Within a process the first caller becomes the leader and the rest wait on a
+``threading.Event``. Across processes the leader also takes a lock in the
+Django cache (``cache.add`` is atomic on every shared backend) and publishes
+its result there, so a leader in another gunicorn worker can be waited on by
+polling. Waiting is bounded: if the other process is too slow or dies, the
+waiter computes the result itself.
+
+Keys must capture everything the result depends on — callers build them
+with ``flight_key`` from the endpoint, the child, the request parameters and
+the child's data version, so a write simply starts a new flight.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any, TypeVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+T = TypeVar("T")
+
+_DEFAULTS = {
+    "LOCK_TIMEOUT": 60,  # seconds a cross-process lock may be held
+    "WAIT_TIMEOUT": 30,  # seconds a follower waits before computing itself
+    "RESULT_TTL": 30,  # seconds a finished result stays available to followers
+    "POLL_INTERVAL": 0.05,
+}
+
+
+def _setting(name: str):
+    return getattr(settings, "SINGLE_FLIGHT", {}).get(name, _DEFAULTS[name])
+
+
+def flight_key(endpoint: str, child, params: dict, data_version: int | None = None) -> str:
+    """Build a key from (endpoint, child, params, data version)."""
+    version = child.data_version if data_version is None else data_version
+    encoded = "&".join(f"{name}={params[name]}" for name in sorted(params))
+    digest = hashlib.sha1(encoded.encode(), usedforsecurity=False).hexdigest()
+    return f"{endpoint}:c{child.pk}:v{version}:{digest}"
+
+
+@dataclass
+class _Call:
+    done: threading.Event = field(default_factory=threading.Event)
+    value: Any = None
+    failed: bool = False
+
+
+class SingleFlight:
+    def __init__(self, namespace: str = "singleflight"):
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+
+    # -- public API ---------------------------------------------------
+
+    def do(self, key: str, compute: Callable[[], T]) -> T:
+        """Return ``compute()``, sharing one evaluation among concurrent callers."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if call.done.wait(_setting("WAIT_TIMEOUT")) and not call.failed:
+                return call.value
+            return compute()
+
+        try:
+            call.value = self._do_shared(key, compute)
+        except BaseException:
+            call.failed = True
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.value
+
+    # -- cross-process ------------------------------------------------
+
+    def _cache_key(self, kind: str, key: str) -> str:
+        return f"{self.namespace}:{kind}:{key}"
+
+    def _do_shared(self, key: str, compute: Callable[[], T]) -> T:
+        result_key = self._cache_key("result", key)
+        lock_key = self._cache_key("lock", key)
+
+        cached = cache.get(result_key)
+        if cached is not None:
+            return cached[0]
+
+        token = uuid.uuid4().hex
+        if cache.add(lock_key, token, _setting("LOCK_TIMEOUT")):
+            try:
+                value = compute()
+                # Wrapped so a legitimately ``None`` result is still a hit.
+                cache.set(result_key, (value,), _setting("RESULT_TTL"))
+                return value
+            finally:
+                if cache.get(lock_key) == token:
+                    cache.delete(lock_key)
+
+        deadline = time.monotonic() + _setting("WAIT_TIMEOUT")
+        while time.monotonic() < deadline:
+            time.sleep(_setting("POLL_INTERVAL"))
+            cached = cache.get(result_key)
+            if cached is not None:
+                return cached[0]
+            if cache.get(lock_key) is None:
+                break  # the other leader gave up without a result
+        return compute()
+
+
+reports_flight = SingleFlight("reports")
@@ -0,0 +1,264 @@
+"""
+Slow-query log: statements over a threshold, aggregated by SQL fingerprint.
+
+``SlowQueryMiddleware`` is opt-in (``settings.SLOW_QUERY_LOG["ENABLED"]``).
+It wraps every database connection for the duration of a request
+(``connection.execute_wrapper``) and notes each statement that takes at
+least ``THRESHOLD_MS``. It records the view that served the request and
+the first project source line on the stack, for example
+``core/views.py:412 (get)``.
+
+Once the response is ready, the notes go into ``SlowQuery``. There is one
+row per fingerprint: the SQL with literals, ``IN (...)`` lists and
+multi-row ``VALUES`` collapsed, so the same ORM call with different
+arguments lands on the same row. A sampled share of slow ``SELECT``s
+(``EXPLAIN_SAMPLE_RATE``, at most once per fingerprint per
+``EXPLAIN_INTERVAL``) is run again under ``EXPLAIN``, with ``ANALYZE`` on
+PostgreSQL if ``EXPLAIN_ANALYZE`` is set, and the plan is stored.
+``EXPLAIN ANALYZE`` executes the query a second time.
+
+Fast requests pay for a timer around each statement and nothing else.
+Report: ``python manage.py slow_queries`` or ``/api/admin/slow-queries/``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import random
+import re
+import sys
+from dataclasses import dataclass, field
+from datetime import timedelta
+from pathlib import Path
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, IntegrityError, connections, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from core.querylog import wrap_connections
+
+logger = logging.getLogger(__name__)
+
+_DEFAULTS = {
+    "ENABLED": False,
+    "THRESHOLD_MS": 200,
+    "EXPLAIN_SAMPLE_RATE": 0.1,
+    "EXPLAIN_ANALYZE": False,
+    "EXPLAIN_INTERVAL": 3600,  # seconds before a fingerprint's plan is refreshed
+}
+REPORT_SORTS = {
+    "total": F("total_ms").desc(),
+    "max": F("max_ms").desc(),
+    "calls": F("calls").desc(),
+    "avg": (F("total_ms") / F("calls")).desc(),
+    "recent": F("last_seen").desc(),
+}
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.\"])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)", re.IGNORECASE)
+_VALUES = re.compile(r"(\bVALUES\s*\([^()]*\))(?:\s*,\s*\([^()]*\))+", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+_OWN_FILES = (__file__, wrap_connections.__code__.co_filename)
+
+
+def slow_query_config() -> dict:
+    return {**_DEFAULTS, **getattr(settings, "SLOW_QUERY_LOG", {})}
+
+
+def normalize_sql(sql: str) -> str:
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    sql = _VALUES.sub(r"\1, ...", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+def fingerprint(normalized_sql: str) -> str:
+    return hashlib.sha1(normalized_sql.encode()).hexdigest()
+
+
+def view_name(view_func) -> str:
+    # DRF's as_view() sets .cls, Django's .view_class.
+    view = getattr(view_func, "cls", None) or getattr(view_func, "view_class", None) or view_func
+    return f"{view.__module__}.{view.__qualname__}"
+
+
+def _call_site() -> str:
+    """The innermost frame in project code (outside site-packages and this module)."""
+    root = str(settings.BASE_DIR)
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(root) and "site-packages" not in filename and filename not in _OWN_FILES:
+            return f"{Path(filename).relative_to(root)}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return ""
+
+
+@dataclass
+class _Slow:
+    sql: str
+    database: str
+    source: str
+    calls: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    # The slowest occurrence, kept in memory only for EXPLAIN.
+    sample: tuple = field(default=(None, None, False), repr=False)
+
+
+class SlowQueryCollector:
+    """``execute_wrapper`` noting statements of at least ``threshold_ms``."""
+
+    def __init__(self, threshold_ms: float):
+        self.threshold_ms = threshold_ms
+        self.view = ""
+        self.slow: dict[str, _Slow] = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (perf_counter() - start) * 1000
+            if duration_ms >= self.threshold_ms:
+                self._note(sql, params, many, duration_ms, context["connection"].alias)
+
+    def _note(self, sql, params, many, duration_ms: float, alias: str) -> None:
+        normalized = normalize_sql(sql)
+        key = fingerprint(normalized)
+        slow = self.slow.get(key)
+        if slow is None:
+            slow = self.slow[key] = _Slow(normalized, alias, _call_site())
+        slow.calls += 1
+        slow.total_ms += duration_ms
+        if duration_ms >= slow.max_ms:
+            slow.max_ms = duration_ms
+            slow.sample = (sql, params, many)
+
+    def flush(self, config: dict) -> None:
+        """Add the notes to ``SlowQuery``, explaining a sampled share."""
+        for key, slow in self.slow.items():
+            record_slow_query(key, slow, self.view)
+            sql, params, many = slow.sample
+            if not many and random.random() < config["EXPLAIN_SAMPLE_RATE"]:
+                _maybe_explain(key, sql, params, slow.database, config)
+        self.slow = {}
+
+
+def record_slow_query(key: str, slow: _Slow, view: str) -> None:
+    from core.models import SlowQuery
+
+    now = timezone.now()
+    changes = {
+        "calls": F("calls") + slow.calls,
+        "total_ms": F("total_ms") + slow.total_ms,
+        "max_ms": Greatest("max_ms", Value(slow.max_ms)),
+        "last_seen": now,
+        "view": view[:200],
+        "source": slow.source[:300],
+    }
+    if SlowQuery.objects.filter(fingerprint=key).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            SlowQuery.objects.create(
+                fingerprint=key,
+                sql=slow.sql,
+                database=slow.database,
+                view=view[:200],
+                source=slow.source[:300],
+                calls=slow.calls,
+                total_ms=slow.total_ms,
+                max_ms=slow.max_ms,
+                last_seen=now,
+            )
+    except IntegrityError:  # another request created it first
+        SlowQuery.objects.filter(fingerprint=key).update(**changes)
+
+
+def explain(sql: str, params, alias: str = "default", analyze: bool = False) -> str:
+    """The plan of ``sql`` on database ``alias`` as text."""
+    connection = connections[alias]
+    if connection.vendor == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    elif connection.vendor == "postgresql" and analyze:
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) "
+    else:
+        prefix = "EXPLAIN "
+    # A savepoint, so a failing EXPLAIN can't break an enclosing transaction.
+    with transaction.atomic(using=alias), connection.cursor() as cursor:
+        cursor.execute(prefix + sql, params)
+        rows = cursor.fetchall()
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+def _maybe_explain(key: str, sql: str, params, alias: str, config: dict) -> None:
+    from core.models import SlowQuery
+
+    if not sql.lstrip().upper().startswith("SELECT"):
+        return
+    now = timezone.now()
+    due = Q(explained_at__isnull=True) | Q(explained_at__lt=now - timedelta(seconds=config["EXPLAIN_INTERVAL"]))
+    if not SlowQuery.objects.filter(due, fingerprint=key).exists():
+        return
+    try:
+        plan = explain(sql, params, alias, analyze=config["EXPLAIN_ANALYZE"])
+    except DatabaseError as exc:
+        plan = f"EXPLAIN failed: {exc}"
+    SlowQuery.objects.filter(fingerprint=key).update(explain=plan, explained_at=now)
+
+
+class SlowQueryMiddleware:
+    def __init__(self, get_response):
+        config = slow_query_config()
+        if not config["ENABLED"]:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.config = config
+
+    def __call__(self, request):
+        collector = SlowQueryCollector(self.config["THRESHOLD_MS"])
+        request._slow_queries = collector
+        with wrap_connections(collector):
+            response = self.get_response(request)
+        if collector.slow:
+            try:
+                collector.flush(self.config)
+            except DatabaseError:
+                logger.warning("Could not record slow queries", exc_info=True)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        collector = getattr(request, "_slow_queries", None)
+        if collector is not None:
+            collector.view = view_name(view_func)
+
+
+# ------------------------------------------------------------------
+# Report
+# ------------------------------------------------------------------
+
+def slow_query_report(sort: str = "total", limit: int = 20, with_plans: bool = False) -> list[dict]:
+    from core.models import SlowQuery
+
+    fields = ["fingerprint", "sql", "database", "view", "source", "calls", "total_ms", "max_ms",
+              "first_seen", "last_seen", "explained_at"]
+    if with_plans:
+        fields.append("explain")
+    rows = SlowQuery.objects.order_by(REPORT_SORTS[sort], "fingerprint").values(*fields)[:limit]
+    return [
+        {
+            **row,
+            "total_ms": round(row["total_ms"], 1),
+            "max_ms": round(row["max_ms"], 1),
+            "avg_ms": round(row["total_ms"] / max(row["calls"], 1), 1),
+        }
+        for row in rows
+    ]
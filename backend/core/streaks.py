@@ -0,0 +1,145 @@
+"""
+Per-child logging streaks and weekly consistency.
+
+``ChildStreak`` stores the current run of consecutive active days (ending
+on ``last_active_date``) and the longest run ever. Activity signals keep it
+up to date without scanning history:
+
+* an activity on ``last_active_date`` or the day after extends or keeps the
+  current run; one further in the future starts a new run;
+* anything that can change an earlier run — a backdated activity on a
+  previously empty day, a re-dated activity, or deleting the last activity
+  of a day — goes through ``rebuild_streak``, which recomputes the counters
+  from the child's distinct activity dates, archived ones included.
+
+``python manage.py rebuild_streaks --verify`` compares the stored counters
+with the raw data.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+
+from core.archive import archived_days
+from core.sharding import atomic_for
+from core.timeseries import bucket_start
+
+BALANCED_MIN_SKILLS = 3  # distinct skills in a week for it to count as balanced
+CONSISTENCY_WEEKS = 5
+
+
+@dataclass(frozen=True)
+class StreakCounts:
+    current_streak: int
+    longest_streak: int
+    last_active_date: date | None
+
+
+def compute_streak(days: list[date]) -> StreakCounts:
+    """Counters for a set of active days (any order, duplicates allowed)."""
+    if not days:
+        return StreakCounts(0, 0, None)
+    ordinals = np.unique(np.fromiter((day.toordinal() for day in days), dtype=np.int64, count=len(days)))
+    # A run starts wherever the gap to the previous active day isn't one day.
+    starts = np.flatnonzero(np.diff(ordinals, prepend=ordinals[0] - 2) != 1)
+    lengths = np.diff(np.append(starts, len(ordinals)))
+    return StreakCounts(int(lengths[-1]), int(lengths.max()), date.fromordinal(int(ordinals[-1])))
+
+
+def _locked_streak(child_id: int):
+    """The child's streak row, locked; ``created`` if it did not exist yet."""
+    from core.models import ChildStreak
+
+    _, created = ChildStreak.objects.get_or_create(child_id=child_id)
+    return ChildStreak.objects.select_for_update().get(child_id=child_id), created
+
+
+def _store(streak, counts: StreakCounts) -> None:
+    streak.current_streak = counts.current_streak
+    streak.longest_streak = counts.longest_streak
+    streak.last_active_date = counts.last_active_date
+    streak.save()
+
+
+def rebuild_streak(child_id: int):
+    """Recompute a child's counters from its activity dates (the repair path)."""
+    from core.models import Activity
+
+    with atomic_for(Activity):
+        streak, _ = _locked_streak(child_id)
+        days = list(Activity.objects.filter(child_id=child_id).values_list("activity_date", flat=True).order_by().distinct())
+        _store(streak, compute_streak(days + archived_days(child_id)))
+    return streak
+
+
+def record_active_day(child_id: int, day: date, activity_id: int | None = None) -> None:
+    """Account for a new activity on ``day``."""
+    from core.models import Activity
+
+    with atomic_for(Activity):
+        streak, created = _locked_streak(child_id)
+        if created:
+            # First write since streaks were introduced: start from the history.
+            rebuild_streak(child_id)
+            return
+        last = streak.last_active_date
+        if last is None or day > last + timedelta(days=1):
+            streak.current_streak = 1
+        elif day == last + timedelta(days=1):
+            streak.current_streak += 1
+        elif day == last:
+            return
+        else:
+            # Backdated: only a day that was empty before can change a run.
+            already_active = (
+                Activity.objects.filter(child_id=child_id, activity_date=day).exclude(pk=activity_id).exists()
+            )
+            if not already_active:
+                rebuild_streak(child_id)
+            return
+        streak.last_active_date = day
+        streak.longest_streak = max(streak.longest_streak, streak.current_streak)
+        streak.save()
+
+
+def record_day_removed(child_id: int, day: date) -> None:
+    """Account for an activity leaving ``day`` (deleted or re-dated)."""
+    from core.models import Activity
+
+    if not Activity.objects.filter(child_id=child_id, activity_date=day).exists():
+        rebuild_streak(child_id)
+
+
+def balanced_weeks(child, today: date, weeks: int = CONSISTENCY_WEEKS) -> list[bool]:
+    """Whether each of the last ``weeks`` weeks (oldest first) touched enough skills."""
+    from core.models import WeeklyRollup
+
+    this_week = bucket_start(today, "week")
+    first_week = this_week - timedelta(weeks=weeks - 1)
+    skill_rows = WeeklyRollup.objects.filter(
+        child=child, week_start__range=[first_week, this_week], skill__isnull=False, activity_count__gt=0
+    ).values_list("week_start", flat=True)
+    per_week = np.zeros(weeks, dtype=int)
+    for week_start in skill_rows:
+        per_week[(week_start - first_week).days // 7] += 1
+    return (per_week >= BALANCED_MIN_SKILLS).tolist()
+
+
+def streak_summary(child, today: date | None = None) -> dict:
+    from core.models import ChildStreak
+
+    today = today or date.today()
+    streak = ChildStreak.objects.filter(child=child).first() or ChildStreak(child=child)
+    running = streak.last_active_date is not None and streak.last_active_date >= today - timedelta(days=1)
+    balanced = balanced_weeks(child, today)
+    return {
+        "current_streak": streak.current_streak if running else 0,
+        "longest_streak": streak.longest_streak,
+        "last_active_date": streak.last_active_date,
+        "balanced_weeks": balanced,
+        "balanced_week_count": sum(balanced),
+        "balanced_min_skills": BALANCED_MIN_SKILLS,
+    }
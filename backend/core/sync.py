@@ -0,0 +1,111 @@
+"""
+Delta sync for offline-capable clients.
+
+``GET /api/sync/`` without a cursor returns everything the user owns plus a
+cursor; passing that cursor back as ``?since=`` returns only the children,
+activities and reflections whose ``updated_at`` moved past it, and the ids
+of rows deleted since (from ``Tombstone``). A deleted child's id stands for
+its activities and reflections too; clients drop them along with it.
+
+Cursors are opaque to clients. They hold the server time at which the
+previous response was built; queries reach back ``SYNC_CURSOR_OVERLAP`` past
+it so rows committed by a slower concurrent request are not missed. Clients
+upsert by id, so the occasional duplicate is harmless.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+from datetime import datetime, timedelta
+
+from django.db.models import Subquery
+from django.utils import timezone
+
+SYNC_CURSOR_OVERLAP = timedelta(seconds=5)
+# Tombstones older than this are pruned; older cursors get a full resync.
+SYNC_TOMBSTONE_RETENTION = timedelta(days=30)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(moment: datetime) -> str:
+    return base64.urlsafe_b64encode(f"v1:{moment.isoformat()}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> datetime:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        version, _, value = raw.partition(":")
+        if version != "v1":
+            raise InvalidCursor(cursor)
+        moment = datetime.fromisoformat(value)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise InvalidCursor(cursor) from exc
+    if timezone.is_naive(moment):
+        raise InvalidCursor(cursor)
+    return moment
+
+
+def record_tombstone(kind: str, object_id: int, *, user_id: int | None = None, child_id: int | None = None) -> None:
+    """Record a deletion for the owning user.
+
+    Activities and reflections only know their child; the owner is resolved
+    inside the INSERT so a cascade delete doesn't load every parent row.
+    """
+    from core.models import Child, Tombstone
+
+    if user_id is None:
+        # Cascades delete dependents before their child, so the row is there.
+        owner = Subquery(Child.objects.filter(pk=child_id).values("user_id")[:1])
+        Tombstone.objects.create(user_id=owner, kind=kind, object_id=object_id)
+    else:
+        Tombstone.objects.create(user_id=user_id, kind=kind, object_id=object_id)
+
+
+def prune_tombstones(now: datetime | None = None) -> int:
+    from core.models import Tombstone
+
+    cutoff = (now or timezone.now()) - SYNC_TOMBSTONE_RETENTION
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
+
+
+def build_sync_payload(user, since: datetime | None, context: dict) -> dict:
+    """Return the changes for ``user`` since ``since`` (everything if ``None``)."""
+    from core.models import Activity, Child, Reflection, Tombstone
+    from core.serializers import ActivitySerializer, ChildSerializer, ReflectionSerializer
+
+    now = timezone.now()
+    full = since is None or since < now - SYNC_TOMBSTONE_RETENTION
+
+    children = Child.objects.filter(user=user)
+    activities = Activity.objects.filter(child__user=user).prefetch_related("skills")
+    reflections = Reflection.objects.filter(child__user=user)
+    deleted = {"children": [], "activities": [], "reflections": []}
+
+    if not full:
+        floor = since - SYNC_CURSOR_OVERLAP
+        children = children.filter(updated_at__gt=floor)
+        activities = activities.filter(updated_at__gt=floor)
+        reflections = reflections.filter(updated_at__gt=floor)
+
+        keys = {
+            Tombstone.KIND_CHILD: "children",
+            Tombstone.KIND_ACTIVITY: "activities",
+            Tombstone.KIND_REFLECTION: "reflections",
+        }
+        tombstones = Tombstone.objects.filter(user=user, deleted_at__gt=floor).values_list("kind", "object_id")
+        for kind, object_id in tombstones:
+            deleted[keys[kind]].append(object_id)
+
+    return {
+        "cursor": encode_cursor(now),
+        "full": full,
+        "children": ChildSerializer(children, many=True, context=context).data,
+        "activities": ActivitySerializer(activities, many=True, context=context).data,
+        "reflections": ReflectionSerializer(reflections, many=True, context=context).data,
+        "deleted": deleted,
+    }
@@ -9,9 +9,11 @@ Covers:
   - PDF report gating
 """
 
+import time
 from datetime import date, timedelta
 
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
 
@@ -44,6 +46,8 @@ def _make_admin(email="admin@example.com", password="adminpass123"):
 class PlanServiceTests(TestCase):
     """Unit tests for core.plan_service helpers."""
 
+    databases = "__all__"
+
     def setUp(self):
         self.user = _make_user()
 
@@ -115,6 +119,8 @@ class PlanServiceTests(TestCase):
 class PlanEndpointTests(TestCase):
     """API tests for plan endpoints."""
 
+    databases = "__all__"
+
     def setUp(self):
         self.client = APIClient()
         self.user = _make_user()
@@ -155,6 +161,8 @@ class PlanEndpointTests(TestCase):
 class ChildLimitTests(TestCase):
     """API tests for child creation limits."""
 
+    databases = "__all__"
+
     def setUp(self):
         self.client = APIClient()
         self.user = _make_user()
@@ -189,7 +197,12 @@ class ChildLimitTests(TestCase):
 class VisibilityFilterTests(TestCase):
     """Test that reports/dashboard respect the plan visibility window."""
 
+    databases = "__all__"
+
     def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
         self.client = APIClient()
         self.user = _make_user()
         self.client.force_authenticate(user=self.user)
@@ -226,3 +239,2039 @@ class VisibilityFilterTests(TestCase):
         # The old activity (120 days ago) may cross a year boundary;
         # use a generous assertion: at least 2 if both are this year, otherwise 1.
         self.assertGreaterEqual(resp.data["total_activities"], 1)
+
+
+class QueryPlanTests(TestCase):
+    """EXPLAIN the hot queries at a seeded size and reject scans / sorts."""
+
+    databases = "__all__"
+
+    @classmethod
+    def setUpTestData(cls):
+        from core.models import ActivitySkill, Reflection, Suggestion
+
+        today = date.today()
+        skills = [SkillCategory.objects.create(name=f"Skill {i}") for i in range(7)]
+        users = User.objects.bulk_create([User(email=f"plan{i}@example.com") for i in range(20)])
+        children = Child.objects.bulk_create(
+            [Child(user=user, name=f"Kid {i}", date_of_birth="2020-01-01") for i, user in enumerate(users)]
+        )
+        activities = Activity.objects.bulk_create(
+            [
+                Activity(child=child, title="Play", activity_date=today - timedelta(days=day))
+                for child in children
+                for day in range(150)
+            ]
+        )
+        ActivitySkill.objects.bulk_create(
+            [ActivitySkill(activity=activity, skill=skills[activity.id % 7]) for activity in activities]
+        )
+        Reflection.objects.bulk_create(
+            [
+                Reflection(child=child, week_start_date=today - timedelta(weeks=week), content="…")
+                for child in children
+                for week in range(20)
+            ]
+        )
+        Suggestion.objects.bulk_create(
+            [
+                Suggestion(skill=skill, title=f"Idea {i}", description="…", min_age=i % 5 + 3, max_age=i % 5 + 6)
+                for skill in skills
+                for i in range(30)
+            ]
+        )
+        cls.user, cls.child, cls.skill = users[3], children[3], skills[2]
+
+    def test_hot_queries_use_indexes_without_sorting(self):
+        from core.query_plans import check_hot_queries
+
+        problems = check_hot_queries(
+            child_id=self.child.id,
+            user_id=self.user.id,
+            skill_id=self.skill.id,
+            age=6,
+            today=date.today(),
+        )
+        self.assertEqual(problems, [], "\n\n".join(f"{p.query}: {p.reason}\n{p.plan}" for p in problems))
+
+    def test_detects_sequential_scan(self):
+        from core.query_plans import explain, find_plan_problems
+
+        plan = explain(Activity.objects.filter(title="Play").order_by())
+        self.assertEqual([p.reason for p in find_plan_problems("title", plan)], ["sequential scan"])
+
+    def test_detects_explicit_sort(self):
+        from core.query_plans import explain, find_plan_problems
+
+        plan = explain(Activity.objects.filter(child_id=self.child.id).order_by("title"))
+        self.assertIn("explicit sort", [p.reason for p in find_plan_problems("title", plan)])
+
+
+class ConditionalGetTests(TestCase):
+    """ETag / If-None-Match on list and detail endpoints."""
+
+    databases = "__all__"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = _make_user()
+        set_user_plan(self.user, PLAN_PLUS)
+        self.client.force_authenticate(user=self.user)
+        self.child = Child.objects.create(user=self.user, name="Alice", date_of_birth="2020-01-01")
+        self.sibling = Child.objects.create(user=self.user, name="Bob", date_of_birth="2021-01-01")
+
+    def test_list_returns_etag_and_304_when_unchanged(self):
+        resp = self.client.get("/api/children/")
+        self.assertEqual(resp.status_code, 200)
+        etag = resp["ETag"]
+
+        resp = self.client.get("/api/children/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp["ETag"], etag)
+        self.assertEqual(resp.content, b"")
+
+    def test_304_skips_queryset(self):
+        etag = self.client.get("/api/activities/").headers["ETag"]
+        # One query for the version lookup and nothing else.
+        with self.assertNumQueries(1):
+            resp = self.client.get("/api/activities/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+
+    def test_write_changes_etag(self):
+        etag = self.client.get("/api/activities/").headers["ETag"]
+        self.client.post("/api/activities/", {"child": self.child.id, "title": "Read a book", "activity_date": str(date.today())})
+        resp = self.client.get("/api/activities/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.data), 1)
+
+    def test_child_scoped_etag_ignores_sibling_writes(self):
+        url = f"/api/activities/?child_id={self.child.id}"
+        etag = self.client.get(url).headers["ETag"]
+        Activity.objects.create(child=self.sibling, title="Bike ride", activity_date=date.today())
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Activity.objects.create(child=self.child, title="Puzzle", activity_date=date.today())
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_skill_changes_invalidate_activity_etag(self):
+        activity = Activity.objects.create(child=self.child, title="Puzzle", activity_date=date.today())
+        url = f"/api/activities/{activity.id}/"
+        etag = self.client.get(url).headers["ETag"]
+        activity.skills.add(SkillCategory.objects.create(name="Critical Thinking"))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_changes_with_the_date(self):
+        from unittest import mock
+
+        etag = self.client.get("/api/children/").headers["ETag"]
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        with mock.patch("django.utils.timezone.localdate", return_value=tomorrow):
+            self.assertEqual(self.client.get("/api/children/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etags_are_per_user(self):
+        etag = self.client.get("/api/skills/").headers["ETag"]
+        other = _make_user(email="other@example.com")
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get("/api/skills/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class DeltaSyncTests(TestCase):
+    """GET /api/sync/ cursors, changes and tombstones."""
+
+    databases = "__all__"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = _make_user()
+        self.client.force_authenticate(user=self.user)
+        self.child = Child.objects.create(user=self.user, name="Alice", date_of_birth="2020-01-01")
+        self.activity = Activity.objects.create(child=self.child, title="Read", activity_date=date.today())
+
+    def _age_everything(self, delta=timedelta(minutes=10)):
+        """Push existing rows' timestamps into the past, clear of the cursor overlap."""
+        from core.models import Tombstone
+
+        past = timezone.now() - delta
+        Child.objects.update(updated_at=past)
+        Activity.objects.update(updated_at=past)
+        Tombstone.objects.update(deleted_at=past)
+
+    def test_full_sync_without_cursor(self):
+        resp = self.client.get("/api/sync/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.data["full"])
+        self.assertEqual([c["id"] for c in resp.data["children"]], [self.child.id])
+        self.assertEqual([a["id"] for a in resp.data["activities"]], [self.activity.id])
+        self.assertTrue(resp.data["cursor"])
+
+    def test_delta_returns_only_changes_and_deletions(self):
+        self._age_everything()
+        cursor = self.client.get("/api/sync/").data["cursor"]
+        self._age_everything(timedelta(minutes=5))
+
+        new = Activity.objects.create(child=self.child, title="Paint", activity_date=date.today())
+        deleted_id = self.activity.id
+        self.activity.delete()
+
+        resp = self.client.get("/api/sync/", {"since": cursor})
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(resp.data["full"])
+        self.assertEqual(resp.data["children"], [])
+        self.assertEqual([a["id"] for a in resp.data["activities"]], [new.id])
+        self.assertEqual(resp.data["deleted"]["activities"], [deleted_id])
+
+    def test_skill_change_marks_activity_updated(self):
+        self._age_everything()
+        cursor = self.client.get("/api/sync/").data["cursor"]
+        self._age_everything(timedelta(minutes=5))
+        self.activity.skills.add(SkillCategory.objects.create(name="Literacy"))
+
+        resp = self.client.get("/api/sync/", {"since": cursor})
+        self.assertEqual(resp.data["activities"][0]["skills"], [{"id": self.activity.skills.get().id, "name": "Literacy"}])
+
+    def test_child_delete_tombstones_cascade(self):
+        self._age_everything()
+        cursor = self.client.get("/api/sync/").data["cursor"]
+        child_id = self.child.id
+        self.child.delete()
+
+        resp = self.client.get("/api/sync/", {"since": cursor})
+        self.assertEqual(resp.data["deleted"]["children"], [child_id])
+        # The child's tombstone covers its activities.
+        self.assertEqual(resp.data["deleted"]["activities"], [])
+
+    def test_child_delete_writes_one_tombstone(self):
+        from core.models import Reflection, Tombstone
+
+        for index in range(5):
+            Activity.objects.create(child=self.child, title=f"Play {index}", activity_date=date.today())
+        Reflection.objects.create(child=self.child, week_start_date="2026-10-12", content="Busy week")
+        child_id = self.child.pk
+        self.child.delete()
+        self.assertEqual(list(Tombstone.objects.values_list("kind", "object_id")), [(Tombstone.KIND_CHILD, child_id)])
+
+    def test_other_users_deletions_are_not_visible(self):
+        other = _make_user(email="other@example.com")
+        other_child = Child.objects.create(user=other, name="Bob", date_of_birth="2020-01-01")
+        self._age_everything()
+        cursor = self.client.get("/api/sync/").data["cursor"]
+        other_child.delete()
+
+        resp = self.client.get("/api/sync/", {"since": cursor})
+        self.assertEqual(resp.data["deleted"]["children"], [])
+
+    def test_invalid_cursor(self):
+        resp = self.client.get("/api/sync/", {"since": "not-a-cursor"})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_deleting_user_leaves_no_tombstones(self):
+        from core.models import Reflection, Tombstone
+
+        Reflection.objects.create(child=self.child, week_start_date="2026-10-12", content="Lots of reading")
+        other = _make_user(email="other@example.com")
+        Child.objects.create(user=other, name="Bob", date_of_birth="2020-01-01").delete()
+
+        User.objects.get(pk=self.user.pk).delete()
+        self.assertFalse(Child.objects.filter(pk=self.child.pk).exists())
+        self.assertEqual(list(Tombstone.objects.values_list("user_id", flat=True)), [other.pk])
+
+
+class BatchEndpointTests(TestCase):
+    """POST /api/batch/ runs sub-requests in-process with shared auth/plan."""
+
+    databases = "__all__"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = _make_user()
+        self.client.force_authenticate(user=self.user)
+        self.child = Child.objects.create(user=self.user, name="Alice", date_of_birth="2020-01-01")
+        SkillCategory.objects.create(name="Literacy")
+
+    def _batch(self, *paths, **extra):
+        return self.client.post(
+            "/api/batch/", {"requests": [{"path": path, **extra} for path in paths]}, format="json"
+        )
+
+    def test_dashboard_page_load_in_one_round_trip(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        Subscription.objects.create(user=self.user, plan=PLAN_FREE)
+        # A fresh instance, as JWT authentication would load per request.
+        self.client.force_authenticate(user=User.objects.get(pk=self.user.pk))
+        with CaptureQueriesContext(connection) as queries:
+            resp = self._batch(
+                "/api/me/plan/",
+                "/api/children/",
+                f"/api/dashboard/weekly/?child_id={self.child.id}",
+                f"/api/skill-analysis/?child_id={self.child.id}",
+                f"/api/suggestions/?child_id={self.child.id}",
+            )
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([r["status"] for r in resp.data["responses"]], [200] * 5)
+        self.assertEqual(resp.data["responses"][0]["body"]["plan"], "free")
+        self.assertEqual(resp.data["responses"][1]["body"][0]["name"], "Alice")
+        # The plan is resolved once for the whole batch.
+        subscription_queries = [q for q in queries if 'FROM "core_subscription"' in q["sql"]]
+        self.assertEqual(len(subscription_queries), 1)
+
+    def test_per_subrequest_status_codes(self):
+        resp = self._batch("/api/dashboard/weekly/", "/api/children/999999/", "/api/nope/")
+        self.assertEqual([r["status"] for r in resp.data["responses"]], [400, 404, 404])
+
+    def test_subrequest_headers_support_conditional_get(self):
+        etag = self._batch("/api/children/").data["responses"][0]["headers"]["ETag"]
+        resp = self._batch("/api/children/", headers={"If-None-Match": etag})
+        self.assertEqual(resp.data["responses"][0]["status"], 304)
+
+    def test_rejects_writes_and_nested_batches(self):
+        resp = self.client.post(
+            "/api/batch/", {"requests": [{"path": "/api/children/", "method": "POST"}]}, format="json"
+        )
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(self._batch("/api/batch/").data["responses"][0]["status"], 400)
+
+    def test_rejects_non_json_endpoints(self):
+        from unittest import mock
+
+        from core import views
+
+        with mock.patch.object(views, "render_monthly_snapshot_pdf") as render:
+            resp = self._batch("/api/me/plan/", f"/api/reports/monthly/?child_id={self.child.id}&month=2026-01")
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("/api/reports/monthly/", resp.data["detail"])
+        render.assert_not_called()
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self._batch("/api/me/plan/").status_code, 401)
+
+
+class SingleFlightTests(TestCase):
+    """Coalescing of concurrent identical computations."""
+
+    databases = "__all__"
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+
+    def test_concurrent_callers_share_one_computation(self):
+        import threading
+
+        from core.singleflight import SingleFlight
+
+        flight = SingleFlight("test")
+        calls = []
+        results = []
+        started = threading.Barrier(5)
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"answer": 42}
+
+        def worker():
+            started.wait()
+            results.append(flight.do("k", compute))
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"answer": 42}] * 5)
+
+    def test_waits_for_leader_in_another_process(self):
+        import threading
+
+        from django.core.cache import cache
+
+        from core.singleflight import SingleFlight
+
+        flight = SingleFlight("test")
+        # Another worker holds the lock and publishes its result shortly.
+        cache.add("test:lock:k", "other-process", 60)
+        publisher = threading.Timer(0.1, lambda: cache.set("test:result:k", ("shared",), 30))
+        publisher.start()
+
+        self.assertEqual(flight.do("k", lambda: "computed here"), "shared")
+        publisher.join()
+
+    def test_falls_back_when_other_leader_is_too_slow(self):
+        from django.core.cache import cache
+        from django.test import override_settings
+
+        from core.singleflight import SingleFlight
+
+        cache.add("test:lock:k", "stuck-process", 60)
+        with override_settings(SINGLE_FLIGHT={"WAIT_TIMEOUT": 0.2}):
+            self.assertEqual(SingleFlight("test").do("k", lambda: "computed here"), "computed here")
+
+    def test_reports_reuse_result_until_data_changes(self):
+        from unittest import mock
+
+        from core import report_service
+
+        user = _make_user()
+        child = Child.objects.create(user=user, name="Alice", date_of_birth="2020-01-01")
+        client = APIClient()
+        client.force_authenticate(user=user)
+        url = f"/api/reports/?child_id={child.id}"
+
+        with mock.patch.object(report_service, "build_report", wraps=report_service.build_report) as build:
+            client.get(url)
+            client.get(url)
+            self.assertEqual(build.call_count, 1)
+
+            Activity.objects.create(child=child, title="Read", activity_date=date.today())
+            resp = client.get(url)
+            self.assertEqual(build.call_count, 2)
+            self.assertEqual(resp.data["total_activities"], 1)
+
+
+@override_settings(RESPONSE_CACHE_REFRESH="inline")
+class StaleWhileRevalidateTests(TestCase):
+    """Long-range reports are served stale and refreshed behind the response."""
+
+    databases = "__all__"
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.client = APIClient()
+        self.user = _make_user()
+        set_user_plan(self.user, PLAN_PLUS)
+        self.client.force_authenticate(user=self.user)
+        self.child = Child.objects.create(user=self.user, name="Alice", date_of_birth="2020-01-01")
+        self.url = f"/api/reports/?child_id={self.child.id}&time_range=thisyear"
+
+    def test_fresh_entry_is_reused(self):
+        from unittest import mock
+
+        from core import report_service
+
+        with mock.patch.object(report_service, "build_report", wraps=report_service.build_report) as build:
+            first = self.client.get(self.url)
+            second = self.client.get(self.url)
+        self.assertEqual(build.call_count, 1)
+        self.assertFalse(second.data["stale"])
+        self.assertIn("Age", second)
+        self.assertEqual(first.data["total_activities"], second.data["total_activities"])
+
+    def test_changed_data_serves_stale_then_refreshes(self):
+        self.client.get(self.url)
+        Activity.objects.create(child=self.child, title="Read", activity_date=date.today())
+
+        stale = self.client.get(self.url)
+        self.assertTrue(stale.data["stale"])
+        self.assertEqual(stale.data["total_activities"], 0)
+
+        refreshed = self.client.get(self.url)
+        self.assertFalse(refreshed.data["stale"])
+        self.assertEqual(refreshed.data["total_activities"], 1)
+
+    def test_entry_past_max_stale_is_recomputed(self):
+        from core.response_cache import entry_key, get_policy, store
+
+        policy = get_policy("reports", PLAN_PLUS, "thisyear")
+        key = entry_key("reports", self.child.id, {"time_range": "thisyear", "vis_start": None})
+        store(key, {"total_activities": -1}, version=None, policy=policy, computed_at=time.time() - policy.max_stale - 5)
+
+        resp = self.client.get(self.url)
+        self.assertFalse(resp.data["stale"])
+        self.assertEqual(resp.data["total_activities"], 0)
+
+    def test_plain_cached_range_is_never_served_outdated(self):
+        from core.response_cache import get_policy
+
+        self.assertEqual(get_policy("reports", PLAN_PLUS, "last30days").max_stale, 0)
+        url = f"/api/reports/?child_id={self.child.id}&time_range=last30days"
+        self.client.get(url)
+        Activity.objects.create(child=self.child, title="Read", activity_date=date.today())
+        resp = self.client.get(url)
+        self.assertFalse(resp.data["stale"])
+        self.assertEqual(resp.data["total_activities"], 1)
+
+
+
+@override_settings(RESPONSE_CACHE_REFRESH="thread")
+class ShardedRefreshTests(TransactionTestCase):
+    """Background refreshes read the requesting user's shard."""
+
+    databases = "__all__"
+
+    def test_thread_refresh_uses_the_request_shard(self):
+        import threading
+
+        from django.core.cache import cache
+
+        from core.sharding import shard_aliases
+
+        if len(shard_aliases()) < 3:
+            self.skipTest("Sharding needs two SHARD_DATABASE_URLS (see config.test_settings)")
+        cache.clear()
+        SkillCategory.objects.create(name="Art")
+        user = _make_user()
+        User.objects.filter(pk=user.pk).update(shard="shard_1")
+        user.refresh_from_db()
+        user.save()  # copies the user row to shard_1
+        set_user_plan(user, PLAN_PLUS)
+        client = APIClient()
+        client.force_authenticate(user=User.objects.get(pk=user.pk))
+        child_id = client.post("/api/children/", {"name": "Alice", "date_of_birth": "2019-01-01"}, format="json").json()["id"]
+        url = f"/api/reports/?child_id={child_id}&time_range=thisyear"
+        client.get(url)
+        client.post("/api/activities/", {"child": child_id, "title": "Read", "activity_date": date.today().isoformat()}, format="json")
+
+        self.assertTrue(client.get(url).data["stale"])
+        for thread in threading.enumerate():
+            if thread.name.startswith("refresh "):
+                thread.join(10)
+
+        resp = client.get(url)
+        self.assertFalse(resp.data["stale"])
+        self.assertEqual(resp.data["total_activities"], 1)
+
+class CacheWarmingTests(TestCase):
+    """warm_caches precomputes the payloads the views look up."""
+
+    databases = "__all__"
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.user = _make_user()
+        self.child = Child.objects.create(user=self.user, name="Alice", date_of_birth="2020-01-01")
+        Activity.objects.create(child=self.child, title="Read", activity_date=date.today())
+        idle = _make_user(email="idle@example.com")
+        idle_child = Child.objects.create(user=idle, name="Bob", date_of_birth="2020-01-01")
+        Child.objects.filter(pk=idle_child.pk).update(updated_at=timezone.now() - timedelta(days=30))
+
+    def test_active_users_only(self):
+        from core.cache_warming import active_user_ids
+
+        self.assertEqual(active_user_ids(days=7), [self.user.id])
+
+    def test_warmed_entries_serve_requests_without_recomputing(self):
+        from unittest import mock
+
+        from core import report_service
+        from core.cache_warming import warm_user
+
+        self.assertEqual(warm_user(self.user.id), 1)
+
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        with mock.patch.object(report_service, "build_weekly_dashboard") as dashboard, \
+                mock.patch.object(report_service, "build_skill_analysis") as analysis, \
+                mock.patch.object(report_service, "build_report") as report:
+            self.assertEqual(client.get(f"/api/dashboard/weekly/?child_id={self.child.id}").data["activity_count"], 1)
+            client.get(f"/api/skill-analysis/?child_id={self.child.id}")
+            self.assertEqual(client.get(f"/api/reports/?child_id={self.child.id}").data["total_activities"], 1)
+        dashboard.assert_not_called()
+        analysis.assert_not_called()
+        report.assert_not_called()
+
+    def test_command_resumes_from_checkpoint(self):
+        import tempfile
+        from io import StringIO
+        from pathlib import Path
+
+        from django.core.management import call_command
+
+        from core.sharding import use_user_shard
+
+        later = _make_user(email="later@example.com")
+        with use_user_shard(later):
+            Child.objects.create(user=later, name="Cara", date_of_birth="2020-01-01")
+        with tempfile.TemporaryDirectory() as tmp:
+            checkpoint = Path(tmp) / "warm.json"
+            checkpoint.write_text(f'{{"last_user_id": {self.user.id}}}')
+            out = StringIO()
+            call_command("warm_caches", "--checkpoint", str(checkpoint), stdout=out, stderr=StringIO())
+            self.assertIn("Warmed 1 child cache(s) for 1 user(s)", out.getvalue())
+            self.assertFalse(checkpoint.exists())
+
+    def test_checkpoint_advances_over_contiguous_prefix(self):
+        from core.cache_warming import Checkpoint
+
+        checkpoint = Checkpoint(None, [3, 5, 8])
+        checkpoint.mark_done(5)
+        self.assertEqual(checkpoint.last_id, 0)
+        checkpoint.mark_done(3)
+        self.assertEqual(checkpoint.last_id, 5)
+
+
+class TimeSeriesTests(TestCase):
+    """Per-skill series come from one grouped query and are zero-filled."""
+
+    databases = "__all__"
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.client = APIClient()
+        self.user = _make_user()
+        self.client.force_authenticate(user=self.user)
+        set_user_plan(self.user, PLAN_PLUS)
+        self.child = Child.objects.create(user=self.user, name="Alice", date_of_birth="2020-01-01")
+        self.literacy = SkillCategory.objects.create(name="Literacy")
+        self.motor = SkillCategory.objects.create(name="Motor")
+
+    def _log(self, on, *skills, minutes=None):
+        activity = Activity.objects.create(child=self.child, title="Play", activity_date=on, duration_minutes=minutes)
+        activity.skills.add(*skills)
+        return activity
+
+    def test_weekly_buckets_are_zero_filled(self):
+        from core.timeseries import build_timeseries
+
+        self._log(date(2026, 3, 2), self.literacy, minutes=20)  # Monday
+        self._log(date(2026, 3, 8), self.literacy, self.motor, minutes=10)  # Sunday, same week
+        self._log(date(2026, 3, 17), self.motor)
+
+        series = build_timeseries(self.child, date(2026, 3, 1), date(2026, 3, 20), "week", include_duration=True)
+        self.assertEqual(
+            series["buckets"], [date(2026, 2, 23), date(2026, 3, 2), date(2026, 3, 9), date(2026, 3, 16)]
+        )
+        self.assertEqual(series["series"], {"Literacy": [0, 2, 0, 0], "Motor": [0, 1, 0, 1]})
+        self.assertEqual(series["duration_minutes"], {"Literacy": [0, 30, 0, 0], "Motor": [0, 10, 0, 0]})
+
+    def test_two_year_daily_series_is_one_fast_query(self):
+        from core.models import ActivitySkill
+        from core.timeseries import build_timeseries
+
+        end = date(2026, 6, 30)
+        activities = Activity.objects.bulk_create(
+            Activity(child=self.child, title="Play", activity_date=end - timedelta(days=offset))
+            for offset in range(0, 730, 2)
+        )
+        ActivitySkill.objects.bulk_create(ActivitySkill(activity=a, skill=self.literacy) for a in activities)
+
+        started = time.perf_counter()
+        with self.assertNumQueries(1):
+            series = build_timeseries(self.child, end - timedelta(days=729), end, "day")
+        self.assertLess(time.perf_counter() - started, 0.25)
+        self.assertEqual(len(series["buckets"]), 730)
+        self.assertEqual(sum(series["series"]["Literacy"]), 365)
+
+    def test_endpoint_clamps_to_visibility_and_validates(self):
+        set_user_plan(self.user, PLAN_FREE)
+        self._log(date.today() - timedelta(days=200), self.literacy)
+        self._log(date.today() - timedelta(days=3), self.literacy)
+
+        resp = self.client.get(
+            f"/api/reports/timeseries/?child_id={self.child.id}&start={date.today() - timedelta(days=365)}"
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.data["visibility_limited"])
+        self.assertEqual(sum(resp.data["series"]["Literacy"]), 1)
+
+        resp = self.client.get(f"/api/reports/timeseries/?child_id={self.child.id}&granularity=hour")
+        self.assertEqual(resp.status_code, 400)
+        # The bucket limit applies to the clamped range.
+        resp = self.client.get(f"/api/reports/timeseries/?child_id={self.child.id}&start=2000-01-01&granularity=day")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.data["buckets"]), 91)
+        set_user_plan(self.user, PLAN_PLUS)
+        resp = self.client.get(f"/api/reports/timeseries/?child_id={self.child.id}&start=2000-01-01&granularity=day")
+        self.assertEqual(resp.status_code, 400)
+
+    def test_report_monthly_data_uses_series(self):
+        self._log(date.today(), self.literacy, self.motor)
+        resp = self.client.get(f"/api/reports/?child_id={self.child.id}&time_range=last30days")
+        self.assertEqual(resp.data["monthly_data"][-1], {"month": date.today().strftime("%B %Y"), "Literacy": 1, "Motor": 1})
+
+
+class TrendsTests(TestCase):
+    """Weekly rollups stay current and feed the Plus trends endpoint."""
+
+    databases = "__all__"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = _make_user()
+        self.client.force_authenticate(user=self.user)
+        set_user_plan(self.user, PLAN_PLUS)
+        self.child = Child.objects.create(user=self.user, name="Alice", date_of_birth="2020-01-01")
+        self.literacy = SkillCategory.objects.create(name="Literacy")
+
+    def _rollups(self):
+        from core.models import WeeklyRollup
+
+        return sorted(
+            WeeklyRollup.objects.filter(child=self.child).values_list("week_start", "skill_id", "activity_count", "total_minutes"),
+            key=lambda row: (row[0], row[1] or 0),
+        )
+
+    def test_signals_maintain_rollups(self):
+        from django.db import transaction
+
+        # Rollups are refreshed when each step's transaction commits.
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            activity = Activity.objects.create(
+                child=self.child, title="Read", activity_date=date(2026, 3, 4), duration_minutes=15
+            )
+            activity.skills.add(self.literacy)
+        self.assertEqual(
+            self._rollups(), [(date(2026, 3, 2), None, 1, 15), (date(2026, 3, 2), self.literacy.id, 1, 15)]
+        )
+
+        activity.activity_date = date(2026, 2, 25)  # backdated into the previous week
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            activity.save()
+        self.assertEqual(
+            self._rollups(), [(date(2026, 2, 23), None, 1, 15), (date(2026, 2, 23), self.literacy.id, 1, 15)]
+        )
+
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            activity.delete()
+        self.assertEqual(self._rollups(), [])
+
+    def test_week_is_refreshed_once_per_transaction(self):
+        from unittest import mock
+
+        from core import trends
+
+        with mock.patch.object(trends, "refresh_week", wraps=trends.refresh_week) as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                for day in (2, 3):
+                    activity = Activity.objects.create(child=self.child, title="Read", activity_date=date(2026, 3, day))
+                    activity.skills.add(self.literacy)
+                self.assertEqual(refresh.call_count, 0)
+        refresh.assert_called_once_with(self.child.id, date(2026, 3, 2))
+        self.assertEqual(self._rollups(), [(date(2026, 3, 2), None, 2, 0), (date(2026, 3, 2), self.literacy.id, 2, 0)])
+
+    def test_rebuild_matches_incremental(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for offset in range(0, 60, 3):
+                activity = Activity.objects.create(
+                    child=self.child, title="Read", activity_date=date(2026, 1, 1) + timedelta(days=offset), duration_minutes=10
+                )
+                activity.skills.add(self.literacy)
+        incremental = self._rollups()
+        call_command("build_rollups", stdout=StringIO())
+        self.assertEqual(self._rollups(), incremental)
+
+    def test_trends_are_downsampled_with_rolling_average(self):
+        from core.models import WeeklyRollup
+
+        first = date(2022, 1, 3)
+        WeeklyRollup.objects.bulk_create(
+            WeeklyRollup(child=self.child, week_start=first + timedelta(weeks=week), activity_count=week % 4, total_minutes=0)
+            for week in range(200)
+        )
+        end = first + timedelta(weeks=199)
+
+        resp = self.client.get(f"/api/trends/?child_id={self.child.id}&end={end}&max_points=50&window=2")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["weeks_per_point"], 4)
+        self.assertEqual(len(resp.data["points"]), 50)
+        # Every 4-week bucket holds counts 0..3: a per-week mean of 1.5.
+        self.assertEqual(set(resp.data["volume"]["activities"]), {1.5})
+        self.assertEqual(resp.data["volume"]["activities_rolling"][-1], 1.5)
+
+    def test_rolling_mean_is_trailing(self):
+        import numpy as np
+
+        from core.trends import rolling_mean
+
+        self.assertEqual(rolling_mean(np.array([2.0, 4.0, 6.0, 8.0]), 2).tolist(), [2.0, 3.0, 5.0, 7.0])
+
+    def test_free_plan_is_gated(self):
+        set_user_plan(self.user, PLAN_FREE)
+        resp = self.client.get(f"/api/trends/?child_id={self.child.id}")
+        self.assertEqual(resp.status_code, 403)
+
+
+class SkillAnalyticsTests(TestCase):
+    """Incidence arrays reproduce the old counting logic from one query."""
+
+    databases = "__all__"
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.user = _make_user()
+        self.child = Child.objects.create(user=self.user, name="Alice", date_of_birth="2020-01-01")
+        self.art = SkillCategory.objects.create(name="Art")
+        self.literacy = SkillCategory.objects.create(name="Literacy")
+        self.motor = SkillCategory.objects.create(name="Motor")
+        self.today = date(2026, 3, 20)
+
+    def _log(self, days_ago, *skills, minutes=None):
+        activity = Activity.objects.create(
+            child=self.child, title="Play", activity_date=self.today - timedelta(days=days_ago), duration_minutes=minutes
+        )
+        activity.skills.add(*skills)
+
+    def test_counts_totals_and_classification(self):
+        from core.analytics import load_incidence
+
+        self._log(1, self.literacy, self.motor, minutes=30)
+        self._log(2, self.literacy, minutes=10)
+        self._log(3, minutes=5)  # no skills
+        self._log(9, self.motor)
+
+        skills = list(SkillCategory.objects.values_list("id", "name"))
+        with self.assertNumQueries(1):
+            incidence = load_incidence(self.child, self.today - timedelta(days=13), self.today, skills=skills)
+        self.assertEqual(incidence.count_map(), {"Art": 0, "Literacy": 2, "Motor": 2})
+        self.assertEqual(incidence.total_activities(), 4)
+        self.assertEqual(incidence.total_minutes(), 45)
+        self.assertEqual(incidence.classify(), (["Literacy", "Motor"], ["Art"]))
+        self.assertEqual(incidence.time_share(), {"Art": 0.0, "Literacy": 0.571, "Motor": 0.429})
+        self.assertEqual(
+            incidence.week_over_week()["Motor"], {"this_week": 1, "last_week": 1, "change": 0}
+        )
+        self.assertEqual(incidence.window(self.today - timedelta(days=2), self.today).count_map()["Motor"], 1)
+
+    def test_reports_use_incidence_totals(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        self.today = date.today()
+        self._log(0, self.literacy, self.motor, minutes=70)
+        self._log(1, self.literacy, minutes=20)
+
+        resp = client.get(f"/api/reports/?child_id={self.child.id}&time_range=last30days")
+        self.assertEqual(resp.data["total_activities"], 2)
+        self.assertEqual((resp.data["total_hours"], resp.data["total_minutes"]), (1, 30))
+        self.assertEqual([tuple(item) for item in resp.data["skill_distribution"]], [("Literacy", 2), ("Motor", 1)])
+
+        resp = client.get(f"/api/skill-analysis/?child_id={self.child.id}")
+        self.assertEqual(resp.data["rich_skills"], ["Literacy"])
+        self.assertEqual(resp.data["missing_skills"], ["Art", "Motor"])
+        self.assertEqual(resp.data["week_over_week"]["Literacy"]["this_week"], 2)
+
+
+class SkillCooccurrenceTests(TestCase):
+    """The co-occurrence matrix is B.T @ B, cached per child data version."""
+
+    databases = "__all__"
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.client = APIClient()
+        self.user = _make_user()
+        self.client.force_authenticate(user=self.user)
+        self.child = Child.objects.create(user=self.user, name="Alice", date_of_birth="2020-01-01")
+        self.art, self.maths, self.music = (
+            SkillCategory.objects.create(name=name) for name in ("Creativity", "Numeracy", "Music")
+        )
+
+    def _log(self, *skills):
+        activity = Activity.objects.create(child=self.child, title="Play", activity_date=date.today())
+        activity.skills.add(*skills)
+
+    def test_matrix_and_top_pairs(self):
+        from core.analytics import load_cooccurrence
+
+        self._log(self.art, self.maths)
+        self._log(self.art, self.maths, self.music)
+        self._log(self.music)
+
+        result = load_cooccurrence(self.child, date.today(), date.today())
+        # Skills come back in name order: Creativity, Music, Numeracy.
+        self.assertEqual(result.matrix.tolist(), [[2, 1, 2], [1, 2, 1], [2, 1, 2]])
+        self.assertEqual(result.activities, 3)
+        self.assertEqual(result.top_pairs()[0], {"skills": ["Creativity", "Numeracy"], "count": 2, "jaccard": 1.0})
+
+    def test_endpoint_is_cached_until_the_child_changes(self):
+        from unittest import mock
+
+        from core import report_service
+
+        self._log(self.art, self.maths)
+        url = f"/api/skill-cooccurrence/?child_id={self.child.id}"
+        self.assertEqual(self.client.get(url).data["top_pairs"][0]["count"], 1)
+
+        with mock.patch.object(report_service, "load_cooccurrence") as load:
+            self.client.get(url)
+        load.assert_not_called()
+
+        self._log(self.art, self.maths)
+        self.assertEqual(self.client.get(url).data["top_pairs"][0]["count"], 2)
+
+
+class HeatmapTests(TestCase):
+    """Heatmap days are packed uint16 arrays built from cached month blocks."""
+
+    databases = "__all__"
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.client = APIClient()
+        self.user = _make_user()
+        self.client.force_authenticate(user=self.user)
+        set_user_plan(self.user, PLAN_PLUS)
+        self.child = Child.objects.create(user=self.user, name="Alice", date_of_birth="2020-01-01")
+        self.today = date(2026, 3, 20)
+
+    @staticmethod
+    def _decode(encoded):
+        import base64
+
+        import numpy as np
+
+        return np.frombuffer(base64.b64decode(encoded), dtype="<u2").tolist()
+
+    def _log(self, on, minutes=None):
+        return Activity.objects.create(child=self.child, title="Play", activity_date=on, duration_minutes=minutes)
+
+    def test_counts_and_minutes_are_packed_per_day(self):
+        from core.heatmap import build_heatmap
+
+        self._log(date(2026, 1, 30), minutes=20)
+        self._log(date(2026, 1, 30), minutes=5)
+        self._log(date(2026, 2, 1))
+
+        with self.assertNumQueries(1):
+            heatmap = build_heatmap(self.child, date(2026, 1, 29), date(2026, 2, 2), self.today)
+        self.assertEqual(heatmap["days"], 5)
+        self.assertEqual(self._decode(heatmap["counts"]), [0, 2, 0, 1, 0])
+        self.assertEqual(self._decode(heatmap["minutes"]), [0, 25, 0, 0, 0])
+        self.assertEqual((heatmap["max_count"], heatmap["active_days"]), (2, 2))
+
+    def test_past_months_are_cached_and_invalidated_by_writes(self):
+        from core.heatmap import build_heatmap
+
+        activity = self._log(date(2026, 1, 10))
+        build_heatmap(self.child, date(2026, 1, 1), self.today, self.today)
+        with self.assertNumQueries(1):  # only the current month is reloaded
+            build_heatmap(self.child, date(2026, 1, 1), self.today, self.today)
+
+        activity.activity_date = date(2026, 2, 10)  # moves between two cached months
+        activity.save()
+        heatmap = build_heatmap(self.child, date(2026, 1, 1), self.today, self.today)
+        counts = self._decode(heatmap["counts"])
+        self.assertEqual((counts[9], counts[40]), (0, 1))
+
+    def test_endpoint_clamps_free_plan_history(self):
+        set_user_plan(self.user, PLAN_FREE)
+        resp = self.client.get(f"/api/heatmap/?child_id={self.child.id}")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["days"], 91)
+        self.assertTrue(resp.data["visibility_limited"])
+
+        resp = self.client.get(f"/api/heatmap/?child_id={self.child.id}&start=2010-01-01")
+        self.assertEqual(resp.status_code, 400)
+
+    def test_endpoint_hides_ranges_before_free_plan_window(self):
+        set_user_plan(self.user, PLAN_FREE)
+        end = get_visibility_start(self.user) - timedelta(days=1)
+        self._log(end)
+        resp = self.client.get(f"/api/heatmap/?child_id={self.child.id}&end={end}")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual((resp.data["days"], resp.data["active_days"], resp.data["counts"]), (0, 0, ""))
+
+
+class StreakTests(TestCase):
+    """Streak counters are maintained incrementally and repaired on edits."""
+
+    databases = "__all__"
+
+    def setUp(self):
+        self.user = _make_user()
+        self.child = Child.objects.create(user=self.user, name="Alice", date_of_birth="2020-01-01")
+        self.today = date.today()
+
+    def _log(self, days_ago):
+        return Activity.objects.create(child=self.child, title="Play", activity_date=self.today - timedelta(days=days_ago))
+
+    def _counts(self):
+        from core.models import ChildStreak
+
+        streak = ChildStreak.objects.get(child=self.child)
+        return streak.current_streak, streak.longest_streak, streak.last_active_date
+
+    def test_compute_streak(self):
+        from core.streaks import StreakCounts, compute_streak
+
+        days = [date(2026, 1, day) for day in (1, 2, 3, 3, 7, 9, 10)]
+        self.assertEqual(compute_streak(days), StreakCounts(2, 3, date(2026, 1, 10)))
+        self.assertEqual(compute_streak([]), StreakCounts(0, 0, None))
+
+    def test_incremental_updates_and_repairs(self):
+        self._log(3)
+        self._log(2)
+        self._log(2)
+        self._log(0)
+        self.assertEqual(self._counts(), (1, 2, self.today))
+
+        gap_filler = self._log(1)  # backdated into the gap joins both runs
+        self.assertEqual(self._counts(), (4, 4, self.today))
+
+        gap_filler.activity_date = self.today - timedelta(days=10)  # re-dated out again
+        gap_filler.save()
+        self.assertEqual(self._counts(), (1, 2, self.today))
+
+        Activity.objects.filter(activity_date=self.today).get().delete()
+        self.assertEqual(self._counts(), (2, 2, self.today - timedelta(days=2)))
+
+    def test_deleting_child_leaves_no_derived_rows(self):
+        from core.models import ChildStreak, WeeklyRollup
+
+        self._log(0)
+        self.child.delete()
+        self.assertFalse(ChildStreak.objects.exists())
+        self.assertFalse(WeeklyRollup.objects.exists())
+
+    def test_verify_command_detects_drift(self):
+        from io import StringIO
+
+        from django.core.management import CommandError, call_command
+
+        from core.models import ChildStreak
+
+        self._log(1)
+        self._log(0)
+        call_command("rebuild_streaks", "--verify", stdout=StringIO())
+        ChildStreak.objects.filter(child=self.child).update(longest_streak=9)
+        with self.assertRaises(CommandError):
+            call_command("rebuild_streaks", "--verify", stdout=StringIO(), stderr=StringIO())
+        call_command("rebuild_streaks", stdout=StringIO())
+        self.assertEqual(self._counts(), (2, 2, self.today))
+
+    def test_rebuild_selects_distinct_days_only(self):
+        from django.db import connections
+        from django.test.utils import CaptureQueriesContext
+
+        from core.streaks import rebuild_streak
+
+        self._log(0)
+        self._log(0)
+        with CaptureQueriesContext(connections[Activity.objects.db]) as queries:
+            rebuild_streak(self.child.id)
+        distinct = [q["sql"] for q in queries.captured_queries if "DISTINCT" in q["sql"]]
+        self.assertEqual(len(distinct), 1)
+        self.assertNotIn("created_at", distinct[0])
+        self.assertNotIn("ORDER BY", distinct[0])
+
+    def test_endpoint_reports_running_streak_and_balanced_weeks(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        skills = [SkillCategory.objects.create(name=name) for name in ("Art", "Literacy", "Motor")]
+        with self.captureOnCommitCallbacks(execute=True):
+            self._log(1).skills.add(*skills)
+
+        resp = client.get(f"/api/children/{self.child.id}/streak/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["current_streak"], 1)
+        self.assertEqual(resp.data["balanced_week_count"], 1)
+        self.assertEqual(len(resp.data["balanced_weeks"]), 5)
+
+
+class HouseholdDashboardTests(TestCase):
+    """All children's weekly summaries in a query count independent of family size."""
+
+    databases = "__all__"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = _make_user()
+        Subscription.objects.create(user=self.user, plan=PLAN_PLUS)
+        self.skills = [SkillCategory.objects.create(name=name) for name in ("Art", "Literacy")]
+
+    def _add_child(self, name, activities):
+        child = Child.objects.create(user=self.user, name=name, date_of_birth="2020-01-01")
+        for offset in range(activities):
+            activity = Activity.objects.create(
+                child=child, title=f"{name} {offset}", activity_date=date.today() - timedelta(days=offset % 7)
+            )
+            activity.skills.add(self.skills[offset % 2])
+        return child
+
+    def _get(self):
+        return self.client.get("/api/dashboard/household/")
+
+    def _authenticate(self):
+        # A fresh user instance per request, as authentication would load.
+        self.client.force_authenticate(user=User.objects.get(pk=self.user.pk))
+
+    def test_query_count_does_not_grow_with_children(self):
+        self._add_child("Alice", 12)
+        self._authenticate()
+        with self.assertNumQueries(6):
+            resp = self._get()
+        self.assertEqual(resp.status_code, 200)
+
+        for name in ("Bob", "Cara", "Dan", "Eve"):
+            self._add_child(name, 3)
+        self._authenticate()
+        with self.assertNumQueries(6):
+            resp = self._get()
+        self.assertEqual([entry["name"] for entry in resp.data["children"]], ["Alice", "Bob", "Cara", "Dan", "Eve"])
+
+    def test_entries_match_the_per_child_dashboard(self):
+        alice = self._add_child("Alice", 12)
+        self._add_child("Bob", 1)
+        self._authenticate()
+        household = {entry["child_id"]: entry for entry in self._get().data["children"]}
+        single = self.client.get(f"/api/dashboard/weekly/?child_id={alice.id}").data
+
+        entry = household[alice.id]
+        self.assertEqual(entry["activity_count"], 12)
+        self.assertEqual(len(entry["recent_activities"]), 10)
+        for key in ("activity_count", "skill_counts", "missing_skills", "recent_activities"):
+            self.assertEqual(entry[key], single[key])
+
+
+class SuggestionAgeTests(TestCase):
+    """Age matching for suggestions is computed in SQL from ``date_of_birth``."""
+
+    databases = "__all__"
+
+    def setUp(self):
+        from core.models import Suggestion
+
+        self.client = APIClient()
+        self.user = _make_user()
+        self.client.force_authenticate(user=self.user)
+        skill = SkillCategory.objects.create(name="Art")
+        self.toddler = Suggestion.objects.create(skill=skill, title="Toddler", description="…", min_age=2, max_age=3)
+        self.preschool = Suggestion.objects.create(skill=skill, title="Preschool", description="…", min_age=4, max_age=5)
+        self.school = Suggestion.objects.create(skill=skill, title="School", description="…", min_age=6, max_age=9)
+
+    def test_with_age_matches_child_age_around_birthdays(self):
+        today = date(2026, 6, 15)
+        births = [date(2022, 6, 14), date(2022, 6, 15), date(2022, 6, 16), date(2020, 2, 29), date(2024, 12, 31)]
+        for index, born in enumerate(births):
+            Child.objects.create(user=self.user, name=f"C{index}", date_of_birth=born)
+        expected = {
+            born: today.year - born.year - ((today.month, today.day) < (born.month, born.day)) for born in births
+        }
+        ages = dict(Child.objects.with_age(today).values_list("date_of_birth", "age"))
+        self.assertEqual(ages, expected)
+
+    def test_for_children_selects_in_one_query(self):
+        from core.models import Suggestion
+
+        today = date.today()
+        three = Child.objects.create(user=self.user, name="Three", date_of_birth=date(today.year - 3, 1, 1))
+        seven = Child.objects.create(user=self.user, name="Seven", date_of_birth=date(today.year - 7, 1, 1))
+        with self.assertNumQueries(1):
+            rows = list(Suggestion.objects.for_children([three.pk, seven.pk], today).order_by("min_age"))
+        self.assertEqual([row.title for row in rows], ["Toddler", "School"])
+        self.assertEqual(
+            [(getattr(row, f"for_child_{three.pk}"), getattr(row, f"for_child_{seven.pk}")) for row in rows],
+            [(True, False), (False, True)],
+        )
+        self.assertFalse(Suggestion.objects.for_children([], today).exists())
+
+    def test_list_endpoint_filters_by_child_age(self):
+        today = date.today()
+        child = Child.objects.create(user=self.user, name="Four", date_of_birth=date(today.year - 4, 1, 1))
+        resp = self.client.get(f"/api/suggestions/?child_id={child.id}")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([item["title"] for item in resp.data], ["Preschool"])
+
+        unknown = Child.objects.create(user=self.user, name="Unknown", date_of_birth=None)
+        resp = self.client.get(f"/api/suggestions/?child_id={unknown.id}")
+        self.assertEqual(resp.data, [])
+
+    def test_default_range_applies_without_birth_date(self):
+        from core.models import Suggestion
+
+        child = Child.objects.create(user=self.user, name="Unknown", date_of_birth=None)
+        rows = Suggestion.objects.for_children([child.pk], date.today(), default_range=(4, 8))
+        self.assertEqual(sorted(row.title for row in rows), ["Preschool", "School"])
+
+
+@override_settings(STORAGES={"staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"}})
+class AdminChangelistTests(TestCase):
+    """Admin changelists for the big tables run a fixed number of queries."""
+
+    databases = "__all__"
+
+    def setUp(self):
+        self.admin = _make_admin()
+        self.client.force_login(self.admin)
+        self.skill = SkillCategory.objects.create(name="Art")
+
+    def _add_activities(self, count):
+        from core.models import ActivitySkill
+
+        for index in range(count):
+            user = _make_user(email=f"parent{time.time_ns()}@example.com")
+            child = Child.objects.create(user=user, name=f"Child {index}", date_of_birth="2020-01-01")
+            activity = Activity.objects.create(child=child, title=f"Activity {index}", activity_date=date.today())
+            ActivitySkill.objects.create(activity=activity, skill=self.skill)
+
+    def _queries(self, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        urls = ("/admin/core/activity/", "/admin/core/activityskill/", "/admin/core/subscription/")
+        self._add_activities(2)
+        few = [self._queries(url) for url in urls]
+        self._add_activities(8)
+        self.assertEqual([self._queries(url) for url in urls], few)
+
+    def test_exact_search_and_date_drilldown(self):
+        self._add_activities(3)
+        activity = Activity.objects.select_related("child__user").first()
+        resp = self.client.get("/admin/core/activity/", {"q": activity.child.user.email})
+        self.assertEqual(list(resp.context["cl"].result_list), [activity])
+        resp = self.client.get("/admin/core/activity/", {"q": "not-a-number"})
+        self.assertEqual(resp.status_code, 200)
+        today = date.today()
+        resp = self.client.get(
+            "/admin/core/activity/",
+            {"activity_date__year": today.year, "activity_date__month": today.month},
+        )
+        self.assertEqual(resp.context["cl"].result_count, 3)
+
+    def test_changelist_order_matches_the_date_index(self):
+        # activity_changelist_by_date in core.query_plans checks this order is index-served.
+        resp = self.client.get("/admin/core/activity/")
+        self.assertEqual(resp.context["cl"].queryset.query.order_by, ("-activity_date", "-created_at", "-pk"))
+
+
+class BulkSetPlanTests(TestCase):
+    """Plan changes for many users in a few statements per chunk."""
+
+    databases = "__all__"
+
+    def setUp(self):
+        self.users = [_make_user(email=f"promo{index}@example.com") for index in range(5)]
+        # One user already on Plus, one with a Subscription row from before.
+        Subscription.objects.create(user=self.users[0], plan=PLAN_PLUS)
+        Subscription.objects.create(user=self.users[1], plan=PLAN_FREE)
+
+    def _plans(self):
+        return [get_plan_info(User.objects.get(pk=user.pk))["plan"] for user in self.users]
+
+    def test_bulk_upsert_by_email_and_id(self):
+        from contextlib import nullcontext
+
+        from core.plan_service import bulk_set_user_plan
+        from core.sharding import is_sharded
+
+        identifiers = [self.users[0].email, str(self.users[1].pk), self.users[2].email, self.users[3].pk, "ghost@example.com"]
+        versions = dict(User.objects.values_list("pk", "data_version"))
+        # Two chunks: each resolves users once, then one upsert, one version bump
+        # and one lookup for archives to restore inside a savepoint. (Spread
+        # over shards, each shard adds its own lookups.)
+        with self.assertNumQueries(12) if not is_sharded() else nullcontext():
+            result = bulk_set_user_plan(identifiers, PLAN_PLUS, chunk_size=3)
+
+        self.assertEqual((result.processed, result.changed, result.unchanged), (5, 3, 1))
+        self.assertEqual(result.missing, ["ghost@example.com"])
+        bumped = {pk for pk, version in User.objects.values_list("pk", "data_version") if version != versions[pk]}
+        self.assertEqual(bumped, {self.users[1].pk, self.users[2].pk, self.users[3].pk})
+        self.assertEqual(self._plans(), [PLAN_PLUS, PLAN_PLUS, PLAN_PLUS, PLAN_PLUS, PLAN_FREE])
+
+    def test_dry_run_writes_nothing(self):
+        from core.plan_service import bulk_set_user_plan
+
+        result = bulk_set_user_plan([user.email for user in self.users], PLAN_PLUS, dry_run=True)
+        self.assertEqual((result.changed, result.unchanged), (4, 1))
+        self.assertEqual(Subscription.objects.filter(plan=PLAN_PLUS).count(), 1)
+
+    def test_command_reads_file(self):
+        import tempfile
+        from io import StringIO
+        from pathlib import Path
+
+        from django.core.management import call_command
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "users.txt"
+            path.write_text(f"# promo list\n{self.users[2].email}\n\n{self.users[3].pk}\nnobody@example.com\n")
+            out = StringIO()
+            call_command("bulk_set_plan", "plus", "--file", str(path), stdout=out, stderr=StringIO())
+        self.assertIn("Moved 2 user(s) to the plus plan (0 already on it, 1 not found)", out.getvalue())
+        self.assertEqual(self._plans()[2:4], [PLAN_PLUS, PLAN_PLUS])
+
+    def test_admin_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(user=_make_admin())
+        payload = {"users": [self.users[4].email, "missing@example.com"], "plan": "plus", "dry_run": True}
+        resp = client.post("/api/admin/bulk-set-plan/", payload, format="json")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual((resp.data["changed"], resp.data["missing"]), (1, ["missing@example.com"]))
+        self.assertEqual(self._plans()[4], PLAN_FREE)
+
+        payload["dry_run"] = False
+        client.post("/api/admin/bulk-set-plan/", payload, format="json")
+        self.assertEqual(self._plans()[4], PLAN_PLUS)
+
+        resp = client.post("/api/admin/bulk-set-plan/", {"users": "all", "plan": "plus"}, format="json")
+        self.assertEqual(resp.status_code, 400)
+        client.force_authenticate(user=self.users[0])
+        resp = client.post("/api/admin/bulk-set-plan/", payload, format="json")
+        self.assertEqual(resp.status_code, 403)
+
+
+class ActivityArchiveTests(TestCase):
+    """Old activities of Free accounts move to compressed archives and back."""
+
+    databases = "__all__"
+
+    def setUp(self):
+        from core.models import ActivitySkill
+        from core.trends import rebuild_rollups
+
+        self.user = _make_user()
+        self.child = Child.objects.create(user=self.user, name="Alice", date_of_birth="2020-01-01")
+        self.skills = [SkillCategory.objects.create(name=name) for name in ("Art", "Literacy")]
+        today = date.today()
+        self.old_days = [today - timedelta(days=offset) for offset in (400, 399, 398, 200)]
+        self.old = []
+        for index, day in enumerate(self.old_days):
+            activity = Activity.objects.create(
+                child=self.child, title=f"Old {index}", activity_date=day, duration_minutes=10 * (index + 1)
+            )
+            ActivitySkill.objects.create(activity=activity, skill=self.skills[index % 2])
+            self.old.append(activity)
+        self.recent = Activity.objects.create(child=self.child, title="Recent", activity_date=today)
+        # The skill links above bypass the m2m signals.
+        rebuild_rollups()
+
+    def _rollups(self):
+        from core.models import WeeklyRollup
+
+        return set(
+            WeeklyRollup.objects.values_list("week_start", "skill_id", "activity_count", "total_minutes")
+        )
+
+    def _streak(self):
+        from core.models import ChildStreak
+
+        streak = ChildStreak.objects.get(child=self.child)
+        return streak.current_streak, streak.longest_streak
+
+    def _archive(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command("archive_activities", stdout=out)
+        return out.getvalue()
+
+    def test_archive_keeps_rollups_and_streaks(self):
+        from core.models import ActivityArchive, Tombstone
+        from core.streaks import rebuild_streak
+        from core.trends import rebuild_rollups, refresh_week
+
+        rollups, streak = self._rollups(), self._streak()
+        self.assertIn("Archived 4 activities", self._archive())
+
+        self.assertEqual(list(Activity.objects.values_list("pk", flat=True)), [self.recent.pk])
+        self.assertEqual(sum(ActivityArchive.objects.values_list("activity_count", flat=True)), 4)
+        self.assertEqual(
+            set(Tombstone.objects.values_list("object_id", flat=True)), {activity.pk for activity in self.old}
+        )
+
+        # Recomputing from scratch (and per week) still counts the archived rows.
+        rebuild_rollups()
+        for day in self.old_days:
+            refresh_week(self.child.pk, day)
+        self.assertEqual(self._rollups(), rollups)
+        rebuild_streak(self.child.pk)
+        self.assertEqual(self._streak(), streak)
+        self.assertEqual(streak[1], 3)
+
+        # Backdating into an archived month merges into the same archive on the next run.
+        Activity.objects.create(child=self.child, title="Late entry", activity_date=self.old_days[0])
+        self._archive()
+        self.assertEqual(
+            ActivityArchive.objects.get(child=self.child, month=self.old_days[0].replace(day=1)).activity_count,
+            len([day for day in self.old_days if day.replace(day=1) == self.old_days[0].replace(day=1)]) + 1,
+        )
+
+    def test_upgrade_restores_archived_activities(self):
+        from core.models import ActivityArchive, Tombstone
+        from core.plan_service import set_user_plan
+
+        originals = {
+            activity.pk: (activity.title, activity.activity_date, activity.created_at, [s.pk for s in activity.skills.all()])
+            for activity in Activity.objects.prefetch_related("skills")
+        }
+        rollups = self._rollups()
+        self._archive()
+        set_user_plan(self.user, PLAN_PLUS)
+
+        restored = {
+            activity.pk: (activity.title, activity.activity_date, activity.created_at, [s.pk for s in activity.skills.all()])
+            for activity in Activity.objects.prefetch_related("skills")
+        }
+        self.assertEqual(restored, originals)
+        self.assertFalse(ActivityArchive.objects.exists())
+        self.assertFalse(Tombstone.objects.exists())
+        self.assertEqual(self._rollups(), rollups)
+
+        # Plus accounts keep everything live.
+        self.assertIn("Archived 0 activities", self._archive())
+
+
+class PartitioningTests(TestCase):
+    """Date-range partitioning of core_activity (conversion needs PostgreSQL)."""
+
+    databases = "__all__"
+
+    def test_partition_ranges(self):
+        from core.partitioning import partition_name, partition_ranges
+
+        quarters = partition_ranges(date(2025, 11, 20), date(2026, 4, 1), "quarter")
+        self.assertEqual(
+            quarters,
+            [
+                (date(2025, 10, 1), date(2026, 1, 1)),
+                (date(2026, 1, 1), date(2026, 4, 1)),
+                (date(2026, 4, 1), date(2026, 7, 1)),
+            ],
+        )
+        self.assertEqual(
+            [partition_name(start, "quarter") for start, _ in quarters],
+            ["core_activity_y2025q4", "core_activity_y2026q1", "core_activity_y2026q2"],
+        )
+        self.assertEqual(partition_ranges(date(2024, 6, 1), date(2025, 1, 1), "year")[-1], (date(2025, 1, 1), date(2026, 1, 1)))
+
+    def test_other_databases_keep_the_regular_table(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+        from django.db import connection
+
+        if connection.vendor == "postgresql":
+            self.skipTest("PostgreSQL supports partitioning")
+        out = StringIO()
+        call_command("partition_activities", "create-future", stdout=out)
+        self.assertIn("keeps the regular activity table", out.getvalue())
+
+    def test_command_runs_on_every_shard(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        from core.sharding import shard_aliases
+
+        out = StringIO()
+        call_command("partition_activities", "status", stdout=out)
+        self.assertEqual([line.split(":")[0] for line in out.getvalue().splitlines() if not line.startswith(" ")], shard_aliases())
+        out = StringIO()
+        call_command("partition_activities", "status", "--shard", shard_aliases()[-1], stdout=out)
+        self.assertTrue(out.getvalue().startswith(f"{shard_aliases()[-1]}: "))
+
+    def test_convert_prunes_partitions(self):
+        from django.db import connection
+
+        from core.models import ActivitySkill
+        from core.partitioning import convert_activity_table, create_future_partitions, list_partitions
+        from core.query_plans import explain
+
+        if connection.vendor != "postgresql":
+            self.skipTest("Partitioning needs PostgreSQL")
+        user = _make_user()
+        child = Child.objects.create(user=user, name="Alice", date_of_birth="2020-01-01")
+        skill = SkillCategory.objects.create(name="Art")
+        today = date.today()
+        for day in (date(today.year - 2, 3, 1), date(today.year - 1, 7, 1), today):
+            activity = Activity.objects.create(child=child, title=f"On {day}", activity_date=day)
+            ActivitySkill.objects.create(activity=activity, skill=skill)
+
+        convert_activity_table("year", ahead=1)
+        names = [partition.name for partition in list_partitions()]
+        self.assertEqual(names[-1], "core_activity_default")
+        self.assertIn(f"core_activity_y{today.year + 1}", names)
+        self.assertEqual(create_future_partitions(ahead=1), [])
+        self.assertEqual(create_future_partitions(ahead=2), [f"core_activity_y{today.year + 2}"])
+
+        # Rows, new ids and ORM cascades keep working.
+        self.assertEqual(Activity.objects.filter(child=child).count(), 3)
+        newest = Activity.objects.create(child=child, title="New", activity_date=today)
+        self.assertGreater(newest.pk, Activity.objects.exclude(pk=newest.pk).order_by("-pk").first().pk)
+
+        plan = explain(Activity.objects.filter(child=child, activity_date__range=[date(today.year, 1, 1), today]))
+        self.assertIn(f"core_activity_y{today.year}", plan)
+        self.assertNotIn(f"core_activity_y{today.year - 1}", plan)
+        self.assertNotIn("core_activity_default", plan)
+
+        child.delete()
+        self.assertFalse(ActivitySkill.objects.exists())
+
+
+@override_settings(
+    THROTTLE_BUDGETS={
+        "anon": {"capacity": 2, "refill_per_minute": 60},
+        "free": {"capacity": 10, "refill_per_minute": 60},
+        "plus": {"capacity": 40, "refill_per_minute": 60},
+    }
+)
+class ThrottlingTests(TestCase):
+    """Per-user token buckets weighted by endpoint cost, and PDF load shedding."""
+
+    databases = "__all__"
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.client = APIClient()
+        self.user = _make_user()
+        self.client.force_authenticate(user=self.user)
+        self.child = Child.objects.create(user=self.user, name="Alice", date_of_birth="2020-01-01")
+
+    def test_expensive_requests_drain_the_bucket_first(self):
+        from unittest import mock
+
+        with mock.patch("core.throttling.time.time", return_value=1000.0):
+            for _ in range(2):
+                self.assertEqual(self.client.get(f"/api/reports/?child_id={self.child.id}").status_code, 200)
+            resp = self.client.get(f"/api/reports/?child_id={self.child.id}")
+            self.assertEqual(resp.status_code, 429)
+            self.assertEqual(resp["Retry-After"], "5")
+            # A year-long report costs more than the whole Free bucket; it waits for a full one.
+            resp = self.client.get(f"/api/reports/?child_id={self.child.id}&time_range=thisyear")
+            self.assertEqual(resp["Retry-After"], "10")
+        with mock.patch("core.throttling.time.time", return_value=1001.0):
+            self.assertEqual(self.client.get("/api/skills/").status_code, 200)
+            self.assertEqual(self.client.get("/api/skills/").status_code, 429)
+
+    def test_budgets_follow_the_plan(self):
+        from unittest import mock
+
+        Subscription.objects.create(user=self.user, plan=PLAN_PLUS)
+        self.client.force_authenticate(user=User.objects.get(pk=self.user.pk))
+        with mock.patch("core.throttling.time.time", return_value=1000.0):
+            statuses = [self.client.get(f"/api/reports/?child_id={self.child.id}").status_code for _ in range(9)]
+        self.assertEqual(statuses, [200] * 8 + [429])
+
+        anonymous = APIClient()
+        with mock.patch("core.throttling.time.time", return_value=1000.0):
+            statuses = [anonymous.post("/api/auth/signup/", {}).status_code for _ in range(3)]
+        self.assertEqual(statuses, [400, 400, 429])
+
+    @override_settings(PDF_RENDER_LIMITS={"MAX_CONCURRENT": 1, "MAX_PER_USER": 1, "RETRY_AFTER": 7})
+    def test_pdf_renders_shed_load_instead_of_queueing(self):
+        from core.throttling import RenderBusy, pdf_renders
+
+        with pdf_renders.slot("u1"):
+            with self.assertRaises(RenderBusy) as busy:
+                with pdf_renders.slot("u1"):
+                    pass
+            self.assertEqual(busy.exception.status_code, 429)
+            with self.assertRaises(RenderBusy) as busy:
+                with pdf_renders.slot("u2"):
+                    pass
+            self.assertEqual((busy.exception.status_code, busy.exception.retry_after), (503, 7))
+        with pdf_renders.slot("u2"):
+            pass
+
+        Subscription.objects.create(user=self.user, plan=PLAN_PLUS)
+        self.client.force_authenticate(user=User.objects.get(pk=self.user.pk))
+        with pdf_renders.slot("someone-else"):
+            resp = self.client.get(f"/api/reports/monthly/?child_id={self.child.id}&month=2026-01")
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(resp["Retry-After"], "7")
+
+
+class FastJSONRendererTests(TestCase):
+    """orjson-backed rendering/parsing matches DRF's JSON and falls back without orjson."""
+
+    databases = "__all__"
+
+    def _payload(self):
+        from decimal import Decimal
+        from uuid import UUID
+
+        from django.utils.translation import gettext_lazy
+
+        return {
+            "day": date(2026, 3, 1),
+            "amount": Decimal("1.50"),
+            "label": gettext_lazy("Art"),
+            "ids": (x for x in (1, 2)),
+            "uuid": UUID(int=1),
+            "nested": [{"title": "Ünïcode", 7: None}],
+        }
+
+    def test_output_matches_drf_json_renderer(self):
+        import json
+
+        from rest_framework.renderers import JSONRenderer
+
+        from core.renderers import FastJSONRenderer
+
+        fast = json.loads(FastJSONRenderer().render(self._payload()))
+        self.assertEqual(fast, json.loads(JSONRenderer().render(self._payload())))
+        self.assertIn("Ünïcode".encode(), FastJSONRenderer().render(self._payload()))
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+    def test_falls_back_without_orjson(self):
+        from io import BytesIO
+        from unittest import mock
+
+        from rest_framework.renderers import JSONRenderer
+
+        from core.renderers import FastJSONParser, FastJSONRenderer, dumps
+
+        with mock.patch("core.renderers.orjson", None):
+            self.assertEqual(dumps(self._payload()), JSONRenderer().render(self._payload()))
+            self.assertEqual(dumps([1], indent=True), b"[\n  1\n]")
+            self.assertEqual(FastJSONRenderer().render(self._payload()), JSONRenderer().render(self._payload()))
+            self.assertEqual(FastJSONParser().parse(BytesIO(b'{"a": [1]}')), {"a": [1]})
+
+    def test_api_uses_fast_json(self):
+        client = APIClient()
+        user = _make_user()
+        client.force_authenticate(user=user)
+        resp = client.post("/api/children/", data=b'{"name": "Alice", "date_of_birth": "2020-01-01"}', content_type="application/json")
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.json()["name"], "Alice")
+        resp = client.post("/api/children/", data=b'{"name": ', content_type="application/json")
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("JSON parse error", resp.json()["detail"])
+
+
+class LiveEventTests(TestCase):
+    """Change events are published once per child on commit and streamed as SSE."""
+
+    databases = "__all__"
+
+    def setUp(self):
+        self.user = _make_user()
+        self.child = Child.objects.create(user=self.user, name="Alice", date_of_birth=date(2019, 1, 1))
+        self.skill = SkillCategory.objects.create(name="Art")
+        self.child.refresh_from_db()
+
+    def test_commit_publishes_one_event_per_child(self):
+        from unittest import mock
+
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        broker = mock.Mock()
+        with mock.patch("core.events.get_broker", return_value=broker):
+            with self.captureOnCommitCallbacks(execute=True):
+                resp = client.post(
+                    "/api/activities/",
+                    {"child": self.child.id, "title": "Painting", "duration_minutes": 30,
+                     "activity_date": timezone.localdate().isoformat(), "skill_ids": [self.skill.id]},
+                    format="json",
+                )
+            self.assertEqual(resp.status_code, 201)
+        broker.publish.assert_called_once()
+        channel, event = broker.publish.call_args.args
+        self.assertEqual(channel, f"user:{self.user.pk}")
+        self.child.refresh_from_db()
+        self.assertEqual(event["child_id"], self.child.pk)
+        self.assertEqual(event["data_version"], self.child.data_version)
+        self.assertEqual((event["activities"], event["minutes"]), (1, 30))
+        self.assertEqual(event["skills"], {str(self.skill.pk): 1})
+
+    def test_uncommitted_writes_publish_nothing(self):
+        from unittest import mock
+
+        broker = mock.Mock()
+        with mock.patch("core.events.get_broker", return_value=broker):
+            Activity.objects.create(child=self.child, title="Blocks", activity_date=timezone.localdate())
+        broker.publish.assert_not_called()
+
+    def test_child_delete_bumps_and_publishes_once(self):
+        from core.models import Reflection
+
+        for index in range(3):
+            Activity.objects.create(child=self.child, title=f"Play {index}", activity_date=timezone.localdate())
+        Reflection.objects.create(child=self.child, week_start_date="2026-10-12", content="Busy week")
+        version = User.objects.get(pk=self.user.pk).data_version
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.child.delete()
+        self.assertEqual(User.objects.get(pk=self.user.pk).data_version, version + 1)
+        self.assertEqual(callbacks, [])
+
+    def test_rolled_back_writes_publish_nothing(self):
+        from unittest import mock
+
+        from django.db import transaction
+
+        other = Child.objects.create(user=self.user, name="Bob", date_of_birth=date(2020, 1, 1))
+        broker = mock.Mock()
+        with mock.patch("core.events.get_broker", return_value=broker):
+            with self.captureOnCommitCallbacks(execute=True):
+                try:
+                    with transaction.atomic():
+                        Activity.objects.create(child=self.child, title="Blocks", activity_date=timezone.localdate())
+                        raise ValueError
+                except ValueError:
+                    pass
+                Activity.objects.create(child=other, title="Puzzle", activity_date=timezone.localdate())
+        broker.publish.assert_called_once()
+        self.assertEqual(broker.publish.call_args.args[1]["child_id"], other.pk)
+
+    def test_stream_needs_asgi(self):
+        resp = self.client.get("/api/events/")
+        self.assertEqual(resp.status_code, 501)
+        self.assertFalse(resp.streaming)
+
+    async def test_in_process_broker_delivers_from_other_threads(self):
+        from asgiref.sync import sync_to_async
+
+        from core.events import InProcessBroker
+
+        broker = InProcessBroker()
+        async with broker.subscribe("user:1") as subscription:
+            await sync_to_async(broker.publish, thread_sensitive=False)("user:1", {"type": "ping"})
+            await sync_to_async(broker.publish, thread_sensitive=False)("user:2", {"type": "other"})
+            self.assertEqual(await subscription.get(1), {"type": "ping"})
+            self.assertIsNone(await subscription.get(0.01))
+        self.assertEqual(broker._subscriptions, {})
+
+    async def test_stream_sends_hello_then_changes(self):
+        import json
+
+        from asgiref.sync import sync_to_async
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        from core.events import get_broker, user_channel
+
+        resp = await self.async_client.get("/api/events/")
+        self.assertEqual(resp.status_code, 401)
+
+        token = await sync_to_async(AccessToken.for_user)(self.user)
+        resp = await self.async_client.get(f"/api/events/?token={token}")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp["Content-Type"], "text/event-stream")
+        stream = aiter(resp.streaming_content)
+        first = (await anext(stream)).decode()
+        self.assertTrue(first.startswith("retry: "))
+        self.assertIn("event: hello", first)
+        hello = json.loads(first.split("data: ", 1)[1])
+        self.assertEqual(hello["children"], {str(self.child.pk): self.child.data_version})
+
+        get_broker().publish(user_channel(self.user.pk), {"type": "child_changed", "child_id": self.child.pk})
+        event = (await anext(stream)).decode()
+        self.assertEqual(event, f'event: child_changed\ndata: {{"type":"child_changed","child_id":{self.child.pk}}}\n\n')
+        await stream.aclose()
+
+
+class SlowRequestProfilerTests(TestCase):
+    """Slow requests keep a bounded ring of profiles that admins can list and download."""
+
+    databases = "__all__"
+
+    def setUp(self):
+        import tempfile
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.user = _make_user()
+        self.admin = _make_admin()
+        Child.objects.create(user=self.user, name="Alice", date_of_birth=date(2019, 1, 1))
+
+    def _settings(self, **overrides):
+        return override_settings(PROFILER={"ENABLED": True, "THRESHOLD_MS": 0, "DIR": self.tmp.name, "MAX_PROFILES": 2, **overrides})
+
+    def _request_children(self, times=1):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        for _ in range(times):
+            self.assertEqual(client.get("/api/children/").status_code, 200)
+
+    def test_slow_requests_are_kept_in_a_ring(self):
+        with self._settings():
+            self._request_children(times=3)
+            admin = APIClient()
+            admin.force_authenticate(user=self.admin)
+            profiles = admin.get("/api/admin/profiles/").json()["profiles"]
+        self.assertEqual(len(profiles), 2)
+        latest = profiles[0]
+        self.assertEqual((latest["method"], latest["path"], latest["status"]), ("GET", "/api/children/", 200))
+        self.assertEqual(latest["user_id"], self.user.pk)
+        self.assertGreater(latest["query_count"], 0)
+        self.assertNotIn("queries", latest)
+
+        with self._settings():
+            detail = admin.get(f"/api/admin/profiles/{latest['id']}/").json()
+            self.assertTrue(any("core_child" in query["sql"] for query in detail["queries"]))
+            self.assertIn("cumulative", detail["summary"])
+            download = admin.get(f"/api/admin/profiles/{latest['id']}/download/")
+            self.assertEqual(download.status_code, 200)
+            self.assertGreater(len(b"".join(download.streaming_content)), 0)
+            download.close()
+            self.assertEqual(admin.get("/api/admin/profiles/../download/").status_code, 404)
+            self.assertEqual(admin.get("/api/admin/profiles/0000000000000-deadbeef/").status_code, 404)
+
+    def test_fast_requests_and_disabled_profiler_keep_nothing(self):
+        from core.profiling import list_profiles
+
+        with self._settings(THRESHOLD_MS=60_000):
+            self._request_children()
+            self.assertEqual(list_profiles(), [])
+        with override_settings(PROFILER={"ENABLED": False, "THRESHOLD_MS": 0, "DIR": self.tmp.name}):
+            self._request_children()
+            self.assertEqual(list_profiles(), [])
+
+    def test_admin_only(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        self.assertEqual(client.get("/api/admin/profiles/").status_code, 403)
+
+
+class SlowQueryLogTests(TestCase):
+    """Slow statements are aggregated by fingerprint with caller, plan and a report."""
+
+    databases = "__all__"
+
+    def setUp(self):
+        self.users = [_make_user(email=f"parent{i}@example.com") for i in range(2)]
+        for user in self.users:
+            Child.objects.create(user=user, name="Alice", date_of_birth=date(2019, 1, 1))
+        self.admin = _make_admin()
+
+    def _log_everything(self):
+        return override_settings(SLOW_QUERY_LOG={"ENABLED": True, "THRESHOLD_MS": 0, "EXPLAIN_SAMPLE_RATE": 1.0})
+
+    def test_normalize_sql_collapses_literals_and_lists(self):
+        from core.slow_queries import fingerprint, normalize_sql
+
+        first = normalize_sql('SELECT "t"."id" FROM "t" WHERE "t"."id" IN (%s, %s, %s) AND name = \'x\'  LIMIT 21')
+        second = normalize_sql('SELECT "t"."id" FROM "t" WHERE "t"."id" IN (%s) AND name = \'it\'\'s\' LIMIT 5')
+        self.assertEqual(first, 'SELECT "t"."id" FROM "t" WHERE "t"."id" IN (...) AND name = ? LIMIT ?')
+        self.assertEqual(fingerprint(first), fingerprint(second))
+        self.assertEqual(normalize_sql("INSERT INTO t2 (a) VALUES (%s), (%s), (%s)"), "INSERT INTO t2 (a) VALUES (%s), ...")
+
+    def test_requests_aggregate_slow_queries_with_caller_and_plan(self):
+        from core.models import SlowQuery
+
+        with self._log_everything():
+            for user in self.users:
+                client = APIClient()
+                client.force_authenticate(user=user)
+                self.assertEqual(client.get("/api/children/").status_code, 200)
+
+        children = SlowQuery.objects.get(sql__startswith='SELECT "core_child"', sql__contains='"core_child"."user_id" = %s')
+        self.assertEqual(children.calls, 2)
+        self.assertEqual(children.view, "core.views.ChildViewSet")
+        self.assertTrue(children.source.startswith("core/"), children.source)
+        self.assertTrue(children.explain)
+        self.assertIsNotNone(children.explained_at)
+
+    def test_disabled_by_default(self):
+        from core.models import SlowQuery
+
+        client = APIClient()
+        client.force_authenticate(user=self.users[0])
+        client.get("/api/children/")
+        self.assertFalse(SlowQuery.objects.exists())
+
+    def test_admin_endpoint_and_command(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        with self._log_everything():
+            client = APIClient()
+            client.force_authenticate(user=self.users[0])
+            client.get("/api/children/")
+
+        admin = APIClient()
+        admin.force_authenticate(user=self.admin)
+        resp = admin.get("/api/admin/slow-queries/?sort=calls&limit=5&plans=true")
+        self.assertEqual(resp.status_code, 200)
+        queries = resp.json()["queries"]
+        self.assertTrue(0 < len(queries) <= 5)
+        self.assertIn("explain", queries[0])
+        self.assertIn("avg_ms", queries[0])
+        self.assertEqual(admin.get("/api/admin/slow-queries/?sort=bogus").status_code, 400)
+        self.assertEqual(admin.get("/api/admin/slow-queries/?limit=0").status_code, 400)
+        self.assertEqual(client.get("/api/admin/slow-queries/").status_code, 403)
+
+        out = StringIO()
+        call_command("slow_queries", "--sort", "avg", stdout=out)
+        self.assertIn("core.views.ChildViewSet", out.getvalue())
+        call_command("slow_queries", "--reset", stdout=StringIO())
+        out = StringIO()
+        call_command("slow_queries", stdout=out)
+        self.assertIn("No slow queries recorded.", out.getvalue())
+
+
+class ShardingTests(TestCase):
+    """User-id sharding; the multi-database tests run under config.test_settings (two SQLite shards)."""
+
+    databases = "__all__"
+
+    def _require_shards(self):
+        from core.sharding import shard_aliases
+
+        if len(shard_aliases()) < 3:
+            self.skipTest("Sharding needs two SHARD_DATABASE_URLS (see config.test_settings)")
+        SkillCategory.objects.create(name="Art")
+
+    def _client(self, user):
+        client = APIClient()
+        client.force_authenticate(user=User.objects.get(pk=user.pk))
+        return client
+
+    def _log_activity(self, user):
+        client = self._client(user)
+        child_id = client.post("/api/children/", {"name": "Alice", "date_of_birth": "2019-01-01"}, format="json").json()["id"]
+        resp = client.post(
+            "/api/activities/",
+            {"child": child_id, "title": "Painting", "activity_date": timezone.localdate().isoformat(),
+             "skill_ids": [SkillCategory.objects.get().pk]},
+            format="json",
+        )
+        self.assertEqual(resp.status_code, 201)
+        return child_id
+
+    def test_router_is_inactive_with_one_database(self):
+        from core.sharding import ShardRouter, shard_counts
+
+        with override_settings(SHARDS=["default"]):
+            self.assertIsNone(ShardRouter().db_for_read(Activity))
+            self.assertIsNone(ShardRouter().db_for_write(SkillCategory))
+            self.assertEqual([row["shard"] for row in shard_counts()], ["default"])
+
+    def test_user_rows_live_on_their_shard(self):
+        self._require_shards()
+        user = _make_user()
+        User.objects.filter(pk=user.pk).update(shard="shard_1")
+        user.refresh_from_db()
+        user.save()  # copies the user row to shard_1
+
+        child_id = self._log_activity(user)
+        self.assertTrue(Child.objects.using("shard_1").filter(pk=child_id, user=user).exists())
+        self.assertFalse(Child.objects.using("default").filter(pk=child_id).exists())
+        self.assertEqual(Activity.objects.using("shard_1").get().skills.get().name, "Art")
+        self.assertTrue(SkillCategory.objects.using("shard_2").filter(name="Art").exists())
+        self.assertEqual([c["id"] for c in self._client(user).get("/api/children/").json()], [child_id])
+        # The user directory, and version bumps, stay on default.
+        self.assertGreater(User.objects.using("default").get(pk=user.pk).data_version, user.data_version)
+
+    def test_new_users_go_to_the_emptiest_shard(self):
+        from core.sharding import shard_counts
+
+        self._require_shards()
+        users = [_make_user(email=f"parent{i}@example.com") for i in range(3)]
+        self.assertEqual(sorted(user.shard for user in users), ["default", "shard_1", "shard_2"])
+        self.assertTrue(User.objects.using(users[1].shard).filter(pk=users[1].pk).exists())
+        self.assertEqual(sum(row["users"] for row in shard_counts()), 3)
+
+    def test_bulk_set_plan_writes_each_users_shard(self):
+        self._require_shards()
+        users = [_make_user(email=f"parent{i}@example.com") for i in range(3)]
+        Subscription.objects.using(users[2].shard).create(user=users[2], plan=PLAN_PLUS)
+        admin = APIClient()
+        admin.force_authenticate(user=User.objects.get(pk=_make_admin().pk))
+        payload = {"users": [user.email for user in users], "plan": "plus"}
+
+        resp = admin.post("/api/admin/bulk-set-plan/", {**payload, "dry_run": True}, format="json")
+        self.assertEqual((resp.data["changed"], resp.data["unchanged"]), (2, 1))
+        resp = admin.post("/api/admin/bulk-set-plan/", payload, format="json")
+        self.assertEqual((resp.data["changed"], resp.data["unchanged"]), (2, 1))
+        for user in users:
+            self.assertEqual(Subscription.objects.using(user.shard).get(user=user).plan, PLAN_PLUS)
+        self.assertEqual(
+            set(Subscription.objects.using("default").filter(user__in=users).values_list("user_id", flat=True)),
+            {user.pk for user in users if user.shard == "default"},
+        )
+        resp = admin.post("/api/admin/bulk-set-plan/", payload, format="json")
+        self.assertEqual((resp.data["changed"], resp.data["unchanged"]), (0, 3))
+
+    def test_maintenance_commands_walk_every_shard(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        from core.cache_warming import active_user_ids
+        from core.models import WeeklyRollup
+
+        self._require_shards()
+        users = [_make_user(email=f"parent{i}@example.com") for i in range(3)]
+        on_shard_2 = next(user for user in users if user.shard == "shard_2")
+        child_id = self._log_activity(on_shard_2)
+        self.assertIn(on_shard_2.pk, active_user_ids(7))
+        WeeklyRollup.objects.using("shard_2").all().delete()
+
+        call_command("build_rollups", "--shard", "shard_1", stdout=StringIO())
+        self.assertFalse(WeeklyRollup.objects.using("shard_2").exists())
+        call_command("build_rollups", stdout=StringIO())
+        self.assertTrue(WeeklyRollup.objects.using("shard_2").filter(child_id=child_id).exists())
+        out = StringIO()
+        call_command("rebuild_streaks", "--verify", stdout=out)
+        self.assertIn("All 1 child streak(s) match", out.getvalue())
+
+    @override_settings(STORAGES={"staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"}})
+    def test_admin_changelist_picks_a_shard(self):
+        self._require_shards()
+        users = [_make_user(email=f"parent{i}@example.com") for i in range(3)]
+        on_shard_2 = next(user for user in users if user.shard == "shard_2")
+        self._log_activity(on_shard_2)
+        activity = Activity.objects.using("shard_2").get()
+        self.client.force_login(_make_admin())
+
+        resp = self.client.get("/admin/core/activity/")
+        self.assertEqual(list(resp.context["cl"].result_list), [])
+        resp = self.client.get("/admin/core/activity/", {"shard": "shard_2"})
+        self.assertEqual(list(resp.context["cl"].result_list), [activity])
+        resp = self.client.get(f"/admin/core/activity/{activity.pk}/change/", {"_changelist_filters": "shard=shard_2"})
+        self.assertEqual(resp.status_code, 200)
+
+    def test_move_user_keeps_ids_and_timestamps(self):
+        from core.sharding import cross_shard, move_user
+
+        self._require_shards()
+        user = _make_user()
+        child_id = self._log_activity(user)
+        source = User.objects.get(pk=user.pk).shard
+        target = "shard_2" if source != "shard_2" else "shard_1"
+        activity = Activity.objects.using(source).get()
+
+        moved = move_user(User.objects.get(pk=user.pk), target)
+        self.assertEqual((moved["child"], moved["activity"], moved["activityskill"]), (1, 1, 1))
+        self.assertEqual(User.objects.get(pk=user.pk).shard, target)
+        self.assertFalse(Activity.objects.using(source).exists())
+        copy = Activity.objects.using(target).get(pk=activity.pk)
+        self.assertEqual((copy.created_at, copy.child_id), (activity.created_at, child_id))
+        self.assertEqual(len(cross_shard(Activity.objects.all())), 1)
+        self.assertEqual([c["id"] for c in self._client(user).get("/api/children/").json()], [child_id])
+
+    def test_rebalance_and_id_ranges(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        from core.sharding import SHARD_ID_SPAN, rebalance_plan
+
+        self._require_shards()
+        users = [_make_user(email=f"parent{i}@example.com") for i in range(4)]
+        User.objects.filter(pk__in=[user.pk for user in users]).update(shard="default")
+        self.assertEqual(len(rebalance_plan()), 2)
+        call_command("shards", "init", stdout=StringIO())
+        call_command("shards", "rebalance", stdout=StringIO())
+        self.assertEqual(rebalance_plan(), [])
+        on_shard_2 = User.objects.filter(shard="shard_2").first()
+        child_id = self._log_activity(on_shard_2)
+        self.assertGreater(child_id, 2 * SHARD_ID_SPAN)
+
+        admin = APIClient()
+        admin.force_authenticate(user=_make_admin())
+        located = admin.get(f"/api/admin/shards/?user={on_shard_2.email}").json()
+        self.assertEqual((located["shard"], located["children"], located["activities"]), ("shard_2", 1, 1))
+        shards = admin.get("/api/admin/shards/").json()["shards"]
+        self.assertEqual([row["shard"] for row in shards], ["default", "shard_1", "shard_2"])
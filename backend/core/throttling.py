@@ -0,0 +1,154 @@
+"""
+Cost-aware request throttling and load shedding.
+
+``CostThrottle`` gives every user (or anonymous client IP) a token bucket
+sized by plan (``settings.THROTTLE_BUDGETS``). A request spends its view's
+``throttle_cost`` — 1 for lists and lookups, more for reports and far more
+for PDFs — so a burst of expensive calls runs out long before a burst of
+cheap ones. A refused request gets DRF's 429 with ``Retry-After`` set to
+the time until the bucket holds enough tokens.
+
+``pdf_renders`` caps how many PDFs render at once, overall and per user
+(``settings.PDF_RENDER_LIMITS``). The caller gets a 503 or 429 with
+``Retry-After`` right away instead of queueing behind a busy renderer.
+
+State lives in the Django cache: per process with the default local-memory
+cache, shared between workers and machines with Redis. Updates are
+read-modify-write, so concurrent requests in different processes can
+occasionally overspend a bucket by a request; the budgets are for load
+protection, not billing.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.throttling import BaseThrottle
+
+_DEFAULT_BUDGET = {"capacity": 60, "refill_per_minute": 60}
+_LIMIT_DEFAULTS = {
+    "MAX_CONCURRENT": 2,  # PDFs rendering at once across the deployment
+    "MAX_PER_USER": 1,
+    "SLOT_TIMEOUT": 120,  # seconds before a slot held by a crashed worker frees itself
+    "RETRY_AFTER": 10,
+}
+
+
+def _budget(tier: str) -> dict:
+    budgets = getattr(settings, "THROTTLE_BUDGETS", {})
+    return {**_DEFAULT_BUDGET, **budgets.get(tier, budgets.get("free", {}))}
+
+
+def view_cost(request, view) -> int:
+    """Tokens a request to ``view`` spends: ``get_throttle_cost(request)`` or ``throttle_cost``."""
+    if hasattr(view, "get_throttle_cost"):
+        return view.get_throttle_cost(request)
+    return getattr(view, "throttle_cost", 1)
+
+
+class CostThrottle(BaseThrottle):
+    """Token bucket per user, refilled continuously at the plan's rate."""
+
+    cache_prefix = "throttle"
+
+    def _tier_and_ident(self, request) -> tuple[str, str]:
+        from core.plan_service import get_subscription
+
+        user = request.user
+        if user is not None and user.is_authenticated:
+            return get_subscription(user).plan, f"u{user.pk}"
+        return "anon", f"ip{self.get_ident(request)}"
+
+    def allow_request(self, request, view) -> bool:
+        tier, ident = self._tier_and_ident(request)
+        budget = _budget(tier)
+        capacity = budget["capacity"]
+        rate = budget["refill_per_minute"] / 60
+        # A request dearer than the whole bucket still gets through when it is full.
+        cost = min(view_cost(request, view), capacity)
+
+        key = f"{self.cache_prefix}:{ident}"
+        now = time.time()
+        state = cache.get(key)
+        tokens = capacity if state is None else min(capacity, state[0] + (now - state[1]) * rate)
+        if tokens < cost:
+            self.retry_after = (cost - tokens) / rate
+            return False
+        # An untouched bucket is full again after capacity / rate seconds.
+        cache.set(key, (tokens - cost, now), math.ceil(capacity / rate) + 1)
+        return True
+
+    def wait(self):
+        return getattr(self, "retry_after", None)
+
+
+class RenderBusy(Exception):
+    def __init__(self, status_code: int, retry_after: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+class ConcurrencyLimiter:
+    """At most ``MAX_CONCURRENT`` holders overall and ``MAX_PER_USER`` per user.
+
+    Slots are cache keys taken with ``cache.add`` (atomic on every backend)
+    and expire after ``SLOT_TIMEOUT`` in case their holder dies.
+    """
+
+    def __init__(self, name: str, setting: str):
+        self.name = name
+        self.setting = setting
+
+    def _limits(self) -> dict:
+        return {**_LIMIT_DEFAULTS, **getattr(settings, self.setting, {})}
+
+    def _take(self, prefix: str, count: int, token: str, timeout: int) -> str | None:
+        for index in range(count):
+            key = f"{prefix}:{index}"
+            if cache.add(key, token, timeout):
+                return key
+        return None
+
+    def _release(self, key: str, token: str) -> None:
+        if cache.get(key) == token:
+            cache.delete(key)
+
+    @contextmanager
+    def slot(self, holder: str):
+        """Hold a slot for ``holder`` or raise ``RenderBusy``."""
+        limits = self._limits()
+        token = uuid.uuid4().hex
+        retry_after = limits["RETRY_AFTER"]
+
+        own = self._take(f"{self.name}:holder:{holder}", limits["MAX_PER_USER"], token, limits["SLOT_TIMEOUT"])
+        if own is None:
+            raise RenderBusy(
+                status.HTTP_429_TOO_MANY_REQUESTS,
+                retry_after,
+                "A report for this account is already being generated. Try again shortly.",
+            )
+        try:
+            shared = self._take(f"{self.name}:slot", limits["MAX_CONCURRENT"], token, limits["SLOT_TIMEOUT"])
+            if shared is None:
+                raise RenderBusy(
+                    status.HTTP_503_SERVICE_UNAVAILABLE,
+                    retry_after,
+                    "The report generator is busy. Try again shortly.",
+                )
+            try:
+                yield
+            finally:
+                self._release(shared, token)
+        finally:
+            self._release(own, token)
+
+
+pdf_renders = ConcurrencyLimiter("pdf-render", "PDF_RENDER_LIMITS")
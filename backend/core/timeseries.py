@@ -0,0 +1,127 @@
+"""
+Per-skill activity time series at day, week or month granularity.
+
+``build_timeseries`` answers "how many activities per skill in each
+period" for an arbitrary date range with one grouped query: the database
+truncates each activity date to its bucket and counts (and optionally sums
+durations) per (bucket, skill). Buckets with no activity are filled with
+zeros here, so every series has one value per bucket.
+
+Buckets are labelled by the first day of their period (weeks start on
+Monday), so the first bucket may begin before ``start``.
+"""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+
+GRANULARITIES = {"day": TruncDay, "week": TruncWeek, "month": TruncMonth}
+MAX_BUCKETS = 2000
+
+
+class TimeSeriesError(ValueError):
+    pass
+
+
+def bucket_start(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(bucket: date, granularity: str) -> date:
+    if granularity == "day":
+        return bucket + timedelta(days=1)
+    if granularity == "week":
+        return bucket + timedelta(days=7)
+    if bucket.month == 12:
+        return bucket.replace(year=bucket.year + 1, month=1)
+    return bucket.replace(month=bucket.month + 1)
+
+
+def bucket_starts(start: date, end: date, granularity: str) -> list[date]:
+    """Every bucket label from the one containing ``start`` to the one containing ``end``."""
+    buckets = []
+    bucket = bucket_start(start, granularity)
+    while bucket <= end:
+        buckets.append(bucket)
+        bucket = _next_bucket(bucket, granularity)
+    return buckets
+
+
+def count_buckets(start: date, end: date, granularity: str) -> int:
+    first, last = bucket_start(start, granularity), bucket_start(end, granularity)
+    if first > last:
+        return 0
+    if granularity == "day":
+        return (last - first).days + 1
+    if granularity == "week":
+        return (last - first).days // 7 + 1
+    return (last.year - first.year) * 12 + last.month - first.month + 1
+
+
+def build_timeseries(
+    child,
+    start: date,
+    end: date,
+    granularity: str = "month",
+    include_duration: bool = False,
+    vis_start: date | None = None,
+) -> dict:
+    """Zero-filled per-skill counts for ``child`` between ``start`` and ``end``.
+
+    ``start`` is clamped to the plan visibility window. Raises
+    ``TimeSeriesError`` for an unknown granularity or a (clamped) range
+    that would produce more than ``MAX_BUCKETS`` buckets.
+    """
+    from core.models import ActivitySkill
+
+    if granularity not in GRANULARITIES:
+        raise TimeSeriesError(f"granularity must be one of: {', '.join(GRANULARITIES)}.")
+    if start > end:
+        raise TimeSeriesError("start must not be after end.")
+    if vis_start and start < vis_start:
+        start = vis_start
+    if count_buckets(start, end, granularity) > MAX_BUCKETS:
+        raise TimeSeriesError(f"A series may contain at most {MAX_BUCKETS} buckets; use a coarser granularity.")
+
+    buckets = bucket_starts(start, end, granularity) if start <= end else []
+    position = {bucket: index for index, bucket in enumerate(buckets)}
+
+    aggregates = {"count": Count("activity_id")}
+    if include_duration:
+        aggregates["minutes"] = Sum("activity__duration_minutes")
+    rows = (
+        ActivitySkill.objects.filter(activity__child=child, activity__activity_date__range=[start, end])
+        .annotate(bucket=GRANULARITIES[granularity]("activity__activity_date"))
+        .values("bucket", "skill__name")
+        .annotate(**aggregates)
+        .order_by()
+    ) if buckets else []
+
+    series: dict[str, list[int]] = {}
+    durations: dict[str, list[int]] = {}
+    for row in rows:
+        index = position[row["bucket"]]
+        name = row["skill__name"]
+        series.setdefault(name, [0] * len(buckets))[index] = row["count"]
+        if include_duration:
+            durations.setdefault(name, [0] * len(buckets))[index] = row["minutes"] or 0
+
+    payload = {
+        "granularity": granularity,
+        "start": start,
+        "end": end,
+        "buckets": buckets,
+        "series": dict(sorted(series.items())),
+        "visibility_limited": vis_start is not None,
+        "visibility_start": str(vis_start) if vis_start else None,
+    }
+    if include_duration:
+        payload["duration_minutes"] = dict(sorted(durations.items()))
+    return payload
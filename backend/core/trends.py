@@ -0,0 +1,235 @@
+"""
+Long-term trend lines (Plus) served from precomputed weekly rollups.
+
+``WeeklyRollup`` holds, per child and week, the activity count and minutes
+for each skill plus one overall volume row, including archived activities
+(``core.archive``). Signals keep the rows of the
+touched weeks current (``schedule_week_refresh``: each week once, when the
+transaction commits); ``rebuild_rollups`` recomputes
+them wholesale from grouped queries (``python manage.py build_rollups``)
+after bulk loads that bypass signals.
+
+``build_trends`` reads a child's rollups in one query into dense week ×
+skill arrays, downsamples them to at most ``max_points`` buckets of whole
+weeks, and computes rolling averages with cumulative sums, so the cost is
+independent of how many years of history a child has.
+"""
+
+from __future__ import annotations
+
+import math
+from collections import defaultdict
+from datetime import date, timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncWeek
+
+from core.archive import archived_week_totals
+from core.events import pending_on_commit
+from core.sharding import atomic_for, use_shard
+from core.timeseries import bucket_start
+
+DEFAULT_MAX_POINTS = 104
+MAX_TREND_POINTS = 520
+DEFAULT_WINDOW = 4
+
+
+def _rollup_rows(activities, activity_skills, archived=()) -> list:
+    """WeeklyRollup instances aggregating the given activities by week.
+
+    ``archived`` adds ``(child_id, week_start, skill_id, activities, minutes)``
+    totals of archived activities (``core.archive.archived_week_totals``).
+    """
+    from core.models import WeeklyRollup
+
+    volume = (
+        activities.annotate(week=TruncWeek("activity_date"))
+        .values_list("child_id", "week")
+        .annotate(count=Count("id"), minutes=Sum("duration_minutes"))
+        .order_by()
+    )
+    per_skill = (
+        activity_skills.annotate(week=TruncWeek("activity__activity_date"))
+        .values_list("activity__child_id", "week", "skill_id")
+        .annotate(count=Count("activity_id"), minutes=Sum("activity__duration_minutes"))
+        .order_by()
+    )
+    totals = defaultdict(lambda: [0, 0])
+    for child_id, week, count, minutes in volume:
+        totals[child_id, week, None] = [count, minutes or 0]
+    for child_id, week, skill_id, count, minutes in per_skill:
+        totals[child_id, week, skill_id] = [count, minutes or 0]
+    for child_id, week, skill_id, count, minutes in archived:
+        totals[child_id, week, skill_id][0] += count
+        totals[child_id, week, skill_id][1] += minutes
+    return [
+        WeeklyRollup(
+            child_id=child_id,
+            week_start=week,
+            skill_id=skill_id,
+            activity_count=count,
+            total_minutes=minutes,
+        )
+        for (child_id, week, skill_id), (count, minutes) in totals.items()
+    ]
+
+
+def refresh_week(child_id: int, day: date) -> None:
+    """Recompute the rollup rows of the week containing ``day``."""
+    from core.models import Activity, ActivityArchive, ActivitySkill, WeeklyRollup
+
+    week_start = bucket_start(day, "week")
+    week = [week_start, week_start + timedelta(days=6)]
+    archives = ActivityArchive.objects.filter(
+        child_id=child_id, month__in={week[0].replace(day=1), week[1].replace(day=1)}
+    )
+    rollups = _rollup_rows(
+        Activity.objects.filter(child_id=child_id, activity_date__range=week),
+        ActivitySkill.objects.filter(activity__child_id=child_id, activity__activity_date__range=week),
+        archived_week_totals(archives, week_start),
+    )
+    with atomic_for(WeeklyRollup):
+        WeeklyRollup.objects.filter(child_id=child_id, week_start=week_start).delete()
+        WeeklyRollup.objects.bulk_create(rollups)
+
+
+class _WeekRefreshes:
+    """Weeks touched in one transaction, refreshed by one on_commit callback."""
+
+    def __init__(self, using: str):
+        self.using = using
+        self.weeks: set[tuple[int, date]] = set()
+
+    def __call__(self) -> None:
+        # The commit may happen outside the ``use_shard`` block that wrote the rows.
+        with use_shard(self.using):
+            for child_id, week_start in sorted(self.weeks):
+                refresh_week(child_id, week_start)
+
+
+def schedule_week_refresh(child_id: int, day: date, using: str | None = None) -> None:
+    """Refresh the week containing ``day`` once the current transaction commits.
+
+    An activity saved with its skills, or many activities of the same week,
+    refresh the week's rows once. Outside a transaction this refreshes
+    straight away.
+    """
+    connection = transaction.get_connection(using)
+    week = (child_id, bucket_start(day, "week"))
+    refreshes = pending_on_commit(connection, _WeekRefreshes)
+    if refreshes is not None:
+        refreshes.weeks.add(week)
+        return
+    refreshes = _WeekRefreshes(connection.alias)
+    refreshes.weeks.add(week)
+    transaction.on_commit(refreshes, using=connection.alias)
+
+
+def rebuild_rollups(child_ids: list[int] | None = None) -> int:
+    """Recompute all rollups (or those of ``child_ids``); returns rows written."""
+    from core.models import Activity, ActivityArchive, ActivitySkill, WeeklyRollup
+
+    activities = Activity.objects.all()
+    activity_skills = ActivitySkill.objects.all()
+    archives = ActivityArchive.objects.all()
+    existing = WeeklyRollup.objects.all()
+    if child_ids is not None:
+        activities = activities.filter(child_id__in=child_ids)
+        activity_skills = activity_skills.filter(activity__child_id__in=child_ids)
+        archives = archives.filter(child_id__in=child_ids)
+        existing = existing.filter(child_id__in=child_ids)
+
+    rollups = _rollup_rows(activities, activity_skills, archived_week_totals(archives))
+    with atomic_for(WeeklyRollup):
+        existing.delete()
+        WeeklyRollup.objects.bulk_create(rollups, batch_size=1000)
+    return len(rollups)
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over ``window`` rows; the first rows average what exists."""
+    totals = np.cumsum(values, axis=0, dtype=float)
+    totals[window:] = totals[window:] - totals[:-window].copy()
+    counts = np.minimum(np.arange(1, len(values) + 1), window)
+    return totals / counts.reshape((-1,) + (1,) * (values.ndim - 1))
+
+
+def _downsample(values: np.ndarray, factor: int) -> np.ndarray:
+    """Per-week means over consecutive groups of ``factor`` weeks."""
+    weeks = len(values)
+    bins = math.ceil(weeks / factor)
+    padded = np.zeros((bins * factor,) + values.shape[1:], dtype=float)
+    padded[:weeks] = values
+    sums = padded.reshape((bins, factor) + values.shape[1:]).sum(axis=1)
+    sizes = np.full(bins, factor, dtype=float)
+    sizes[-1] = weeks - (bins - 1) * factor
+    return sums / sizes.reshape((-1,) + (1,) * (values.ndim - 1))
+
+
+def _rounded(values: np.ndarray) -> list:
+    return np.round(values, 2).tolist()
+
+
+def build_trends(
+    child,
+    start: date | None = None,
+    end: date | None = None,
+    max_points: int = DEFAULT_MAX_POINTS,
+    window: int = DEFAULT_WINDOW,
+) -> dict:
+    """Weekly activity volume and per-skill counts with rolling averages.
+
+    With more weeks than ``max_points``, consecutive weeks are merged into
+    buckets of ``weeks_per_point`` and values become per-week means.
+    ``window`` is measured in points.
+    """
+    end = end or date.today()
+    rollups = child.weekly_rollups.filter(week_start__lte=end)
+    if start is not None:
+        rollups = rollups.filter(week_start__gte=bucket_start(start, "week"))
+    rows = list(rollups.values_list("week_start", "skill__name", "activity_count", "total_minutes"))
+
+    if start is None:
+        start = min((row[0] for row in rows), default=end)
+    first_week = bucket_start(start, "week")
+    weeks = (bucket_start(end, "week") - first_week).days // 7 + 1
+    skill_names = sorted({row[1] for row in rows if row[1] is not None})
+    column = {name: index for index, name in enumerate(skill_names)}
+
+    volume = np.zeros((weeks, 2))
+    skills = np.zeros((weeks, len(skill_names)))
+    for week_start, skill_name, count, minutes in rows:
+        week = (week_start - first_week).days // 7
+        if skill_name is None:
+            volume[week] = (count, minutes)
+        else:
+            skills[week, column[skill_name]] = count
+
+    factor = max(math.ceil(weeks / max(max_points, 1)), 1)
+    if factor > 1:
+        volume = _downsample(volume, factor)
+        skills = _downsample(skills, factor)
+    volume_rolling = rolling_mean(volume[:, 0], window)
+    skills_rolling = rolling_mean(skills, window)
+
+    return {
+        "start": first_week,
+        "end": end,
+        "weeks_per_point": factor,
+        "window": window,
+        "points": [first_week + timedelta(weeks=factor * index) for index in range(len(volume))],
+        "volume": {
+            "activities": _rounded(volume[:, 0]),
+            "minutes": _rounded(volume[:, 1]),
+            "activities_rolling": _rounded(volume_rolling),
+        },
+        "skills": {
+            name: {
+                "activities": _rounded(skills[:, index]),
+                "rolling": _rounded(skills_rolling[:, index]),
+            }
+            for name, index in column.items()
+        },
+    }
@@ -3,16 +3,30 @@ from rest_framework.routers import DefaultRouter
 
 from core.views import (
     ActivityViewSet,
+    AdminBulkSetPlanView,
+    AdminProfileDetailView,
+    AdminProfileDownloadView,
+    AdminProfileListView,
     AdminSetPlanView,
+    AdminShardView,
+    AdminSlowQueryView,
+    BatchView,
     ChildViewSet,
+    EventStreamView,
+    HeatmapView,
+    HouseholdDashboardView,
     MonthlySnapshotPdfView,
 	MyPlanView,
 	ReflectionViewSet,
 	ReportsView,
+    ReportTimeSeriesView,
     SignupView,
     SkillAnalysisView,
     SkillCategoryListView,
+    SkillCooccurrenceView,
     SuggestionListView,
+    SyncView,
+    TrendsView,
     WeeklyDashboardView,
 )
 
@@ -25,13 +39,31 @@ urlpatterns = [
     path("auth/signup/", SignupView.as_view(), name="signup"),
     path("skills/", SkillCategoryListView.as_view(), name="skills"),
     path("dashboard/weekly/", WeeklyDashboardView.as_view(), name="weekly-dashboard"),
+    path("dashboard/household/", HouseholdDashboardView.as_view(), name="household-dashboard"),
     path("suggestions/", SuggestionListView.as_view(), name="suggestions"),
     path("skill-analysis/", SkillAnalysisView.as_view(), name="skill-analysis"),
+    path("skill-cooccurrence/", SkillCooccurrenceView.as_view(), name="skill-cooccurrence"),
     path("reports/", ReportsView.as_view(), name="reports"),
+    path("heatmap/", HeatmapView.as_view(), name="heatmap"),
+    path("reports/timeseries/", ReportTimeSeriesView.as_view(), name="report-timeseries"),
     path("reports/monthly/", MonthlySnapshotPdfView.as_view(), name="monthly-report"),
+    path("trends/", TrendsView.as_view(), name="trends"),
+    path("sync/", SyncView.as_view(), name="sync"),
+    path("events/", EventStreamView.as_view(), name="events"),
+    path("batch/", BatchView.as_view(), name="batch"),
     # Plan endpoints
     path("me/plan/", MyPlanView.as_view(), name="my-plan"),
     path("admin/set-plan/", AdminSetPlanView.as_view(), name="admin-set-plan"),
+    path("admin/bulk-set-plan/", AdminBulkSetPlanView.as_view(), name="admin-bulk-set-plan"),
+    path("admin/shards/", AdminShardView.as_view(), name="admin-shards"),
+    path("admin/slow-queries/", AdminSlowQueryView.as_view(), name="admin-slow-queries"),
+    path("admin/profiles/", AdminProfileListView.as_view(), name="admin-profiles"),
+    path("admin/profiles/<str:profile_id>/", AdminProfileDetailView.as_view(), name="admin-profile"),
+    path(
+        "admin/profiles/<str:profile_id>/download/",
+        AdminProfileDownloadView.as_view(),
+        name="admin-profile-download",
+    ),
 ]
 
 urlpatterns += router.urls
@@ -0,0 +1,151 @@
+"""
+Per-user and per-child data versions, and the ETags derived from them.
+
+Every write that changes what a user can see bumps ``User.data_version``
+(and ``Child.data_version`` when the write belongs to one child). The
+counters only ever go up, so a response computed at version N is valid for
+as long as the version is still N. List and detail GETs use that to answer
+``If-None-Match`` with a 304 without touching the queryset or serializer.
+
+The bumps are wired to model signals in ``core.signals``. Bulk operations
+that bypass signals (``QuerySet.update``, ``bulk_create``) must call the
+bump helpers themselves.
+"""
+
+from __future__ import annotations
+
+import hashlib
+
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+# Bump when a serializer's output changes shape so cached bodies are refetched.
+ETAG_SCHEMA = 2
+
+
+def bump_user_version(user_id: int) -> None:
+    from core.models import User
+
+    User.objects.filter(pk=user_id).update(data_version=F("data_version") + 1)
+
+
+def bump_user_versions(user_ids) -> None:
+    """``bump_user_version`` for many users in one UPDATE (bulk writes)."""
+    from core.models import User
+
+    User.objects.filter(pk__in=user_ids).update(data_version=F("data_version") + 1)
+
+
+def bump_child_version(child_id: int, user_id: int | None = None) -> None:
+    """Bump a child's version and its owner's (user lists include child data).
+
+    Without ``user_id`` the owner is resolved inside the UPDATE, which saves
+    loading the child just to read its ``user_id``.
+    """
+    from core.models import Child, User
+
+    from core.sharding import is_sharded
+
+    Child.objects.filter(pk=child_id).update(data_version=F("data_version") + 1)
+    if user_id is None and is_sharded():
+        # Users live on the default database, the child on its owner's shard.
+        user_id = Child.objects.filter(pk=child_id).values_list("user_id", flat=True).first()
+    if user_id is None:
+        User.objects.filter(children=child_id).update(data_version=F("data_version") + 1)
+    else:
+        bump_user_version(user_id)
+
+
+def bump_all_user_versions() -> None:
+    """Invalidate every user's ETags — used when shared reference data changes."""
+    from core.models import User
+
+    User.objects.update(data_version=F("data_version") + 1)
+
+
+def get_user_version(user_id: int) -> int:
+    from core.models import User
+
+    return User.objects.filter(pk=user_id).values_list("data_version", flat=True).first() or 0
+
+
+def get_child_version(child_id, user_id: int) -> int | None:
+    """Return the child's version, or ``None`` if it isn't the user's child."""
+    from core.models import Child
+
+    try:
+        return Child.objects.filter(pk=child_id, user_id=user_id).values_list("data_version", flat=True).first()
+    except (TypeError, ValueError):
+        return None
+
+
+def make_etag(*parts) -> str:
+    """Build a weak ETag from the parts that determine a response body."""
+    raw = ":".join(str(part) for part in (ETAG_SCHEMA, *parts))
+    return 'W/"%s"' % hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+
+
+def etag_matches(request, etag: str) -> bool:
+    """Weak comparison of ``etag`` against the request's If-None-Match."""
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    candidates = parse_etags(header)
+    if "*" in candidates:
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.removeprefix("W/") == opaque for candidate in candidates)
+
+
+class DataVersionETagMixin:
+    """Conditional GET for DRF list/retrieve views.
+
+    The ETag covers the user, the data version, the view, today's date and
+    the full query string. ``?child_id=`` narrows the version to that child
+    so writes to a sibling don't invalidate it.
+    """
+
+    etag_scope: str = ""
+
+    def get_data_version(self, request) -> tuple[str, int]:
+        child_id = request.query_params.get("child_id")
+        if child_id:
+            version = get_child_version(child_id, request.user.id)
+            if version is not None:
+                return f"c{child_id}", version
+        return f"u{request.user.id}", get_user_version(request.user.id)
+
+    def get_data_etag(self, request) -> str:
+        scope, version = self.get_data_version(request)
+        # Bodies also change with the date: children's ages and the Free
+        # plan's visibility window.
+        return make_etag(
+            self.etag_scope or type(self).__name__,
+            request.user.id,
+            scope,
+            version,
+            timezone.localdate(),
+            request.get_full_path(),
+        )
+
+    def _conditional(self, request, render):
+        etag = self.get_data_etag(request)
+        if etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = render()
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response["ETag"] = etag
+            response["Cache-Control"] = "private, no-cache"
+            patch_vary_headers(response, ["Authorization"])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(request, lambda: super(DataVersionETagMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(request, lambda: super(DataVersionETagMixin, self).retrieve(request, *args, **kwargs))
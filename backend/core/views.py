@@ -1,24 +1,43 @@
 from datetime import date, datetime, timedelta
 
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Q
-from django.http import HttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.views import View
 from rest_framework import generics, permissions, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import AuthenticationFailed, PermissionDenied
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from weasyprint import HTML
+from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from core.batch import BatchError, parse_batch, run_batch
+from core.events import event_stream
+from core.heatmap import MAX_HEATMAP_DAYS, build_heatmap
 from core.models import Activity, Child, Reflection, SkillCategory, Suggestion
 from core.plan_service import (
+	bulk_set_user_plan,
 	can_add_child,
 	get_plan_info,
+	get_subscription,
 	get_visibility_start,
 	set_user_plan,
 )
 from core.plans import PLAN_FREE, PLAN_PLUS
+from core.profiling import list_profiles, load_profile, profile_path
+from core.report_service import (
+	DEFAULT_REPORT_TIME_RANGE,
+	build_household_dashboard,
+	cached_report,
+	cached_skill_analysis,
+	cached_skill_cooccurrence,
+	cached_weekly_dashboard,
+	clamp_to_visibility,
+	render_monthly_snapshot_pdf,
+)
 from core.serializers import (
 	ActivitySerializer,
 	ChildSerializer,
@@ -26,8 +45,16 @@ from core.serializers import (
 	SignupSerializer,
 	SkillCategorySerializer,
 	SuggestionSerializer,
-	build_skill_counts_for_child,
 )
+from core.sharding import locate_user, shard_counts
+from core.singleflight import flight_key, reports_flight
+from core.slow_queries import REPORT_SORTS, slow_query_report
+from core.streaks import streak_summary
+from core.sync import InvalidCursor, build_sync_payload, decode_cursor
+from core.throttling import RenderBusy, pdf_renders
+from core.timeseries import TimeSeriesError, build_timeseries
+from core.trends import DEFAULT_MAX_POINTS, DEFAULT_WINDOW, MAX_TREND_POINTS, build_trends
+from core.versioning import DataVersionETagMixin
 
 User = get_user_model()
 
@@ -66,12 +93,184 @@ class AdminSetPlanView(APIView):
 		return Response({"detail": f"User {user.email} is now on the {sub.get_plan_display()} plan."})
 
 
+class AdminBulkSetPlanView(APIView):
+	"""POST /api/admin/bulk-set-plan/ — admin-only: set the plan of many users.
+
+	Body: { "users": [<email or id>, ...], "plan": "free"|"plus", "dry_run": false }
+	"""
+	permission_classes = [permissions.IsAdminUser]
+	MAX_USERS = 50_000
+	MAX_MISSING_LISTED = 100
+
+	def post(self, request):
+		users = request.data.get("users")
+		plan = request.data.get("plan")
+		if not isinstance(users, list) or plan not in (PLAN_FREE, PLAN_PLUS):
+			return Response(
+				{"detail": "users (list of emails or ids) and plan ('free'|'plus') are required."},
+				status=status.HTTP_400_BAD_REQUEST,
+			)
+		if len(users) > self.MAX_USERS:
+			return Response(
+				{"detail": f"At most {self.MAX_USERS} users per request; use the bulk_set_plan command for more."},
+				status=status.HTTP_400_BAD_REQUEST,
+			)
+
+		dry_run = str(request.data.get("dry_run", "")).lower() in ("1", "true")
+		result = bulk_set_user_plan(users, plan, dry_run=dry_run)
+		return Response({
+			"plan": plan,
+			"dry_run": dry_run,
+			"processed": result.processed,
+			"changed": result.changed,
+			"unchanged": result.unchanged,
+			"missing_count": len(result.missing),
+			"missing": result.missing[:self.MAX_MISSING_LISTED],
+		})
+
+
+class AdminShardView(APIView):
+	"""GET /api/admin/shards/[?user=<email or id>] — admin-only: users and rows per shard.
+
+	With ``user``, where that account lives and how many children and
+	activities it has there (see core.sharding).
+	"""
+	permission_classes = [permissions.IsAdminUser]
+
+	def get(self, request):
+		identifier = request.query_params.get("user")
+		if identifier:
+			located = locate_user(identifier)
+			if located is None:
+				raise Http404
+			return Response(located)
+		return Response({"shards": shard_counts()})
+
+
+class AdminProfileListView(APIView):
+	"""GET /api/admin/profiles/ — admin-only: kept slow-request profiles, newest first."""
+	permission_classes = [permissions.IsAdminUser]
+
+	def get(self, request):
+		return Response({"profiles": list_profiles()})
+
+
+class AdminProfileDetailView(APIView):
+	"""GET /api/admin/profiles/<id>/ — a profile's record, query log and top functions."""
+	permission_classes = [permissions.IsAdminUser]
+
+	def get(self, request, profile_id):
+		record = load_profile(profile_id)
+		if record is None:
+			raise Http404
+		return Response(record)
+
+
+class AdminProfileDownloadView(APIView):
+	"""GET /api/admin/profiles/<id>/download/ — the raw cProfile file (for pstats/snakeviz)."""
+	permission_classes = [permissions.IsAdminUser]
+
+	def get(self, request, profile_id):
+		path = profile_path(profile_id)
+		if path is None:
+			raise Http404
+		return FileResponse(path.open("rb"), as_attachment=True, filename=path.name, content_type="application/octet-stream")
+
+
+class AdminSlowQueryView(APIView):
+	"""GET /api/admin/slow-queries/?sort=total|max|calls|avg|recent&limit=20&plans=true
+
+	Admin-only: the slow-query log aggregated by SQL fingerprint (see
+	core.slow_queries); ``plans=true`` adds the latest sampled EXPLAIN.
+	"""
+	permission_classes = [permissions.IsAdminUser]
+	MAX_LIMIT = 500
+
+	def get(self, request):
+		sort = request.query_params.get("sort", "total")
+		if sort not in REPORT_SORTS:
+			return Response(
+				{"detail": f"sort must be one of: {', '.join(REPORT_SORTS)}."},
+				status=status.HTTP_400_BAD_REQUEST,
+			)
+		try:
+			limit = int(request.query_params.get("limit", 20))
+		except ValueError:
+			limit = 0
+		if not 1 <= limit <= self.MAX_LIMIT:
+			return Response(
+				{"detail": f"limit must be an integer between 1 and {self.MAX_LIMIT}."},
+				status=status.HTTP_400_BAD_REQUEST,
+			)
+		with_plans = request.query_params.get("plans", "").lower() in ("1", "true")
+		return Response({"sort": sort, "queries": slow_query_report(sort, limit, with_plans)})
+
+
+class BatchView(APIView):
+	"""POST /api/batch/ — run several GET API calls in one round trip.
+
+	Body: { "requests": [ { "path": "/api/me/plan/", "headers": {...} }, ... ] }
+
+	Sub-requests run in-process as the calling user and come back in order,
+	each with its own ``status``, selected ``headers`` and ``body``.
+	"""
+	permission_classes = [permissions.IsAuthenticated]
+
+	def post(self, request):
+		try:
+			specs = parse_batch(request.data)
+		except BatchError as exc:
+			return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+		return Response({"responses": run_batch(request, specs)})
+
+
+def _stream_user(request):
+	authentication = JWTAuthentication()
+	try:
+		raw_token = request.GET.get("token")
+		if raw_token:
+			return authentication.get_user(authentication.get_validated_token(raw_token))
+		result = authentication.authenticate(request)
+	except AuthenticationFailed:
+		return None
+	return result[0] if result else None
+
+
+class EventStreamView(View):
+	"""GET /api/events/ — live change events for the user's children (server-sent events).
+
+	A plain async Django view, so an open stream holds no worker thread
+	under ASGI. Under WSGI (``runserver`` included) Django would buffer the
+	whole stream before sending any of it, so the view answers 501 there.
+	``EventSource`` can't send an ``Authorization`` header; the access token
+	may be passed as ``?token=`` instead.
+	"""
+
+	async def get(self, request):
+		if not isinstance(request, ASGIRequest):
+			return JsonResponse(
+				{"detail": "Live events need an ASGI server."},
+				status=status.HTTP_501_NOT_IMPLEMENTED,
+			)
+		user = await sync_to_async(_stream_user)(request)
+		if user is None:
+			return JsonResponse(
+				{"detail": "Authentication credentials were not provided."},
+				status=status.HTTP_401_UNAUTHORIZED,
+			)
+		response = StreamingHttpResponse(event_stream(user.pk), content_type="text/event-stream")
+		response["Cache-Control"] = "no-cache"
+		# Keeps nginx-style proxies from buffering the stream.
+		response["X-Accel-Buffering"] = "no"
+		return response
+
+
 class SignupView(generics.CreateAPIView):
 	serializer_class = SignupSerializer
 	permission_classes = [permissions.AllowAny]
 
 
-class ChildViewSet(viewsets.ModelViewSet):
+class ChildViewSet(DataVersionETagMixin, viewsets.ModelViewSet):
 	serializer_class = ChildSerializer
 	permission_classes = [permissions.IsAuthenticated]
 
@@ -88,8 +287,13 @@ class ChildViewSet(viewsets.ModelViewSet):
 			)
 		serializer.save(user=self.request.user)
 
+	@action(detail=True, methods=["get"])
+	def streak(self, request, pk=None):
+		"""Logging streak and balanced-week consistency for a child."""
+		return Response(streak_summary(self.get_object()))
+
 
-class ActivityViewSet(viewsets.ModelViewSet):
+class ActivityViewSet(DataVersionETagMixin, viewsets.ModelViewSet):
 	serializer_class = ActivitySerializer
 	permission_classes = [permissions.IsAuthenticated]
 
@@ -101,7 +305,26 @@ class ActivityViewSet(viewsets.ModelViewSet):
 		return queryset
 
 
-class SkillCategoryListView(generics.ListAPIView):
+class SyncView(APIView):
+	"""GET /api/sync/?since=<cursor> — rows changed or deleted since the cursor.
+
+	Omit ``since`` for a full snapshot. Every response carries the cursor for
+	the next call; ``full`` is true when the client should replace its local
+	copy rather than merge (first sync, or a cursor older than tombstone
+	retention).
+	"""
+	permission_classes = [permissions.IsAuthenticated]
+
+	def get(self, request):
+		since = request.query_params.get("since")
+		try:
+			since_at = decode_cursor(since) if since else None
+		except InvalidCursor:
+			return Response({"detail": "Invalid sync cursor."}, status=status.HTTP_400_BAD_REQUEST)
+		return Response(build_sync_payload(request.user, since_at, {"request": request, "view": self}))
+
+
+class SkillCategoryListView(DataVersionETagMixin, generics.ListAPIView):
 	queryset = SkillCategory.objects.all()
 	serializer_class = SkillCategorySerializer
 	permission_classes = [permissions.IsAuthenticated]
@@ -116,41 +339,19 @@ class WeeklyDashboardView(APIView):
 			return Response({"detail": "child_id is required"}, status=status.HTTP_400_BAD_REQUEST)
 
 		child = get_object_or_404(Child, id=child_id, user=request.user)
+		vis_start = get_visibility_start(request.user)
+		cached = cached_weekly_dashboard(child, get_subscription(request.user).plan, vis_start, date.today())
+		return cached.apply_to(Response(cached.payload))
 
-		today = date.today()
-		date_from = today - timedelta(days=6)
 
-		# Apply plan visibility window — clamp date_from if needed
-		vis_start = get_visibility_start(request.user)
-		if vis_start and date_from < vis_start:
-			date_from = vis_start
-
-		activities = child.activities.filter(activity_date__range=[date_from, today]).prefetch_related("skills")
-		activity_count = activities.count()
-
-		skill_counts = build_skill_counts_for_child(child, date_from, today)
-		missing_skills = [entry["skill"] for entry in skill_counts if entry["count"] == 0]
-
-		recent_activities = []
-		for activity in activities.order_by("-activity_date", "-created_at")[:10]:
-			recent_activities.append(
-				{
-					"id": activity.id,
-					"title": activity.title,
-					"activity_date": activity.activity_date,
-					"duration_minutes": activity.duration_minutes,
-					"skills": [skill.name for skill in activity.skills.all()],
-				}
-			)
+class HouseholdDashboardView(APIView):
+	permission_classes = [permissions.IsAuthenticated]
+	throttle_cost = 3
 
-		return Response(
-			{
-				"activity_count": activity_count,
-				"skill_counts": skill_counts,
-				"missing_skills": missing_skills,
-				"recent_activities": recent_activities,
-			}
-		)
+	def get(self, request):
+		children = list(Child.objects.filter(user=request.user))
+		vis_start = get_visibility_start(request.user)
+		return Response(build_household_dashboard(children, vis_start, date.today()))
 
 
 class SuggestionListView(generics.ListAPIView):
@@ -167,9 +368,7 @@ class SuggestionListView(generics.ListAPIView):
 
 		if child_id:
 			child = get_object_or_404(Child, id=child_id, user=self.request.user)
-			if child.age is None:
-				return queryset.none()
-			queryset = queryset.filter(min_age__lte=child.age, max_age__gte=child.age)
+			queryset = queryset.for_children([child.pk], timezone.localdate())
 
 		# Free plan: cap at 3 generic suggestions
 		plan_info = get_plan_info(self.request.user)
@@ -179,6 +378,9 @@ class SuggestionListView(generics.ListAPIView):
 
 class MonthlySnapshotPdfView(APIView):
 	permission_classes = [permissions.IsAuthenticated]
+	throttle_cost = 30
+	# A PDF has no place in a batch's JSON body (see core.batch).
+	batchable = False
 
 	def get(self, request):
 		child_id = request.query_params.get("child_id")
@@ -197,57 +399,17 @@ class MonthlySnapshotPdfView(APIView):
 
 		child = get_object_or_404(Child, id=child_id, user=request.user)
 		month_start = datetime.strptime(month_value, "%Y-%m").date().replace(day=1)
-		if month_start.month == 12:
-			month_end = month_start.replace(year=month_start.year + 1, month=1, day=1) - timedelta(days=1)
-		else:
-			month_end = month_start.replace(month=month_start.month + 1, day=1) - timedelta(days=1)
-
-		activities = child.activities.filter(activity_date__range=[month_start, month_end]).prefetch_related("skills")
-		total_activities = activities.count()
-
-		skill_distribution = (
-			activities.values("skills__name")
-			.annotate(count=Count("id"))
-			.order_by("skills__name")
-		)
-
-		activities_html = "".join(
-			[
-				f"<li><strong>{activity.activity_date}</strong> — {activity.title}"
-				f" ({', '.join([s.name for s in activity.skills.all()])})</li>"
-				for activity in activities
-			]
-		)
-		skills_html = "".join(
-			[f"<li>{row['skills__name'] or 'Unmapped'}: {row['count']}</li>" for row in skill_distribution]
-		)
 
-		html = f"""
-		<html>
-		  <head>
-			<style>
-			  body {{ font-family: Arial, sans-serif; color: #2f3b2f; padding: 24px; }}
-			  h1 {{ color: #3f5f4a; margin-bottom: 4px; }}
-			  h2 {{ color: #516a5a; margin-top: 20px; }}
-			  .meta {{ color: #67766d; margin-bottom: 16px; }}
-			  ul {{ padding-left: 20px; }}
-			</style>
-		  </head>
-		  <body>
-			<h1>EarlyLedge Monthly Snapshot</h1>
-			<div class="meta">{child.name} • {month_start.strftime('%B %Y')}</div>
-			<p>Total activities: <strong>{total_activities}</strong></p>
-
-			<h2>Skill distribution</h2>
-			<ul>{skills_html or '<li>No activities logged.</li>'}</ul>
-
-			<h2>Activities</h2>
-			<ul>{activities_html or '<li>No activities logged.</li>'}</ul>
-		  </body>
-		</html>
-		"""
-
-		pdf = HTML(string=html).write_pdf()
+		key = flight_key("monthly-pdf", child, {"month": month_start})
+		try:
+			with pdf_renders.slot(f"u{request.user.pk}"):
+				pdf = reports_flight.do(key, lambda: render_monthly_snapshot_pdf(child, month_start))
+		except RenderBusy as exc:
+			return Response(
+				{"detail": exc.detail},
+				status=exc.status_code,
+				headers={"Retry-After": str(exc.retry_after)},
+			)
 		response = HttpResponse(pdf, content_type="application/pdf")
 		response["Content-Disposition"] = (
 			f'attachment; filename="earlyledge-{child.name.lower()}-{month_value}.pdf"'
@@ -257,6 +419,7 @@ class MonthlySnapshotPdfView(APIView):
 
 class SkillAnalysisView(APIView):
 	permission_classes = [permissions.IsAuthenticated]
+	throttle_cost = 3
 
 	def get(self, request):
 		child_id = request.query_params.get("child_id")
@@ -264,226 +427,159 @@ class SkillAnalysisView(APIView):
 			return Response({"error": "child_id is required"}, status=status.HTTP_400_BAD_REQUEST)
 
 		child = get_object_or_404(Child, id=child_id, user=request.user)
-		
-		# Analyze last 14 days of activities (clamped by plan visibility window)
-		two_weeks_ago = date.today() - timedelta(days=14)
 		vis_start = get_visibility_start(request.user)
-		if vis_start and two_weeks_ago < vis_start:
-			two_weeks_ago = vis_start
-		
-		# Get all skills and their usage in the last 2 weeks
-		all_skills = SkillCategory.objects.all()
-		recent_activities = Activity.objects.filter(
-			child=child,
-			activity_date__gte=two_weeks_ago
-		)
-		
-		# Count skill usage
-		skill_counts = {}
-		for skill in all_skills:
-			count = recent_activities.filter(skills=skill).count()
-			skill_counts[skill.name] = count
-		
-		# Find most used and least used skills
-		total_activities = recent_activities.count()
-		if total_activities == 0:
-			return Response({
-				"rich_skills": [],
-				"missing_skills": list(skill_counts.keys()),
-				"personalized_suggestions": [],
-				"analysis_text": "No activities logged in the past two weeks. Start by adding some activities!"
-			})
-		
-		# Sort skills by usage
-		sorted_skills = sorted(skill_counts.items(), key=lambda x: x[1], reverse=True)
-		
-		# Rich skills (top 2-3 with multiple activities)
-		rich_skills = [name for name, count in sorted_skills if count >= 2][:3]
-		
-		# Separate completely missing skills (0 activities) from low-activity skills (1 activity)
-		zero_activity_skills = [name for name, count in sorted_skills if count == 0]
-		low_activity_skills = [name for name, count in sorted_skills if count == 1]
-		
-		# Prioritize zero-activity skills, then low-activity skills
-		missing_skills = zero_activity_skills + low_activity_skills
-		
-		# Get suggestions for all skills (both rich and missing)
-		all_available_skills = list(skill_counts.keys())  # Include ALL skills, not just rich + missing
-		suggestions_queryset = Suggestion.objects.filter(
-			skill__name__in=all_available_skills,
-			min_age__lte=child.age or 8,
-			max_age__gte=child.age or 4
-		).select_related('skill')
-		
-		personalized_suggestions = []
-		# First add missing skills suggestions (prioritized)
-		for suggestion in suggestions_queryset.filter(skill__name__in=missing_skills):
-			personalized_suggestions.append({
-				"id": suggestion.id,
-				"title": suggestion.title,
-				"description": suggestion.description,
-				"skill_name": suggestion.skill.name,
-				"duration_range": f"{suggestion.min_age}-{suggestion.max_age} years"
-			})
-		
-		# Then add rich skills suggestions (secondary priority)
-		for suggestion in suggestions_queryset.filter(skill__name__in=rich_skills):
-			personalized_suggestions.append({
-				"id": suggestion.id,
-				"title": suggestion.title,
-				"description": suggestion.description,
-				"skill_name": suggestion.skill.name,
-				"duration_range": f"{suggestion.min_age}-{suggestion.max_age} years"
-			})
-		
-		# Finally add suggestions for any other skills (so all skills appear in filters)
-		other_skills = [name for name in skill_counts.keys() if name not in rich_skills and name not in missing_skills]
-		for suggestion in suggestions_queryset.filter(skill__name__in=other_skills):
-			personalized_suggestions.append({
-				"id": suggestion.id,
-				"title": suggestion.title,
-				"description": suggestion.description,
-				"skill_name": suggestion.skill.name,
-				"duration_range": f"{suggestion.min_age}-{suggestion.max_age} years"
-			})
-
-		# Ensure ALL skills appear in the response (add placeholders for skills without age-appropriate suggestions)
-		skills_with_suggestions = set(s["skill_name"] for s in personalized_suggestions)
-		for skill_name in skill_counts.keys():
-			if skill_name not in skills_with_suggestions:
-				# Add a generic placeholder so the skill appears in filters
-				personalized_suggestions.append({
-					"id": f"placeholder_{skill_name.lower().replace(' ', '_').replace('/', '_')}",
-					"title": f"Explore {skill_name}",
-					"description": f"Great {skill_name.lower()} activities are perfect for developing important skills. Check back for more suggestions!",
-					"skill_name": skill_name,
-					"duration_range": "All ages"
-				})
-		
-		# Generate analysis text
-		if rich_skills and missing_skills:
-			rich_text = " and ".join(rich_skills[:2]) if len(rich_skills) > 1 else rich_skills[0]
-			missing_text = " or ".join(missing_skills[:2])
-			analysis_text = f"This week has been rich in {rich_text} activities. You might enjoy adding some {missing_text} activities."
-		elif rich_skills:
-			rich_text = " and ".join(rich_skills[:2]) if len(rich_skills) > 1 else rich_skills[0]
-			analysis_text = f"Great focus on {rich_text} activities recently! Consider exploring some other skill areas."
-		else:
-			analysis_text = "You've been exploring various skills. Keep up the great work!"
-		
-		return Response({
-			"rich_skills": rich_skills,
-			"missing_skills": missing_skills,
-			"personalized_suggestions": personalized_suggestions,
-			"analysis_text": analysis_text,
-			"total_recent_activities": total_activities
-		})
+		today = date.today()
+
+		cached = cached_skill_analysis(child, get_subscription(request.user).plan, vis_start, today)
+		return cached.apply_to(Response(cached.payload))
 
 
 class ReportsView(APIView):
 	permission_classes = [permissions.IsAuthenticated]
 
+	def get_throttle_cost(self, request):
+		# A year of data costs several times a week's.
+		if request.query_params.get("time_range") == "thisyear":
+			return 15
+		return 5
+
 	def get(self, request):
 		child_id = request.query_params.get("child_id")
-		time_range = request.query_params.get("time_range", "last3months")
-		
+		time_range = request.query_params.get("time_range", DEFAULT_REPORT_TIME_RANGE)
+
 		if not child_id:
 			return Response({"error": "child_id is required"}, status=status.HTTP_400_BAD_REQUEST)
 
 		child = get_object_or_404(Child, id=child_id, user=request.user)
-		
-		# Calculate date ranges
+		vis_start = get_visibility_start(request.user)
 		today = date.today()
-		if time_range == "last30days":
-			start_date = today - timedelta(days=30)
-		elif time_range == "last3months":
-			start_date = today - timedelta(days=90)
-		elif time_range == "thisyear":
-			start_date = date(today.year, 1, 1)
-		else:
-			start_date = today - timedelta(days=90)  # default
-		
-		# Apply plan visibility window — clamp start_date for Free users
+
+		cached = cached_report(child, get_subscription(request.user).plan, time_range, vis_start, today)
+		return cached.apply_to(Response(cached.payload))
+
+
+class SkillCooccurrenceView(APIView):
+	permission_classes = [permissions.IsAuthenticated]
+	throttle_cost = 3
+
+	def get(self, request):
+		child_id = request.query_params.get("child_id")
+		if not child_id:
+			return Response({"detail": "child_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+		today = date.today()
+		try:
+			end = date.fromisoformat(request.query_params.get("end", today.isoformat()))
+			start = date.fromisoformat(request.query_params.get("start", (end - timedelta(days=90)).isoformat()))
+		except ValueError:
+			return Response({"detail": "start and end must be YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+		if start > end:
+			return Response({"detail": "start must not be after end"}, status=status.HTTP_400_BAD_REQUEST)
+
+		child = get_object_or_404(Child, id=child_id, user=request.user)
 		vis_start = get_visibility_start(request.user)
-		if vis_start and start_date < vis_start:
-			start_date = vis_start
-		
-		# Get activities in range
-		activities = Activity.objects.filter(
-			child=child,
-			activity_date__gte=start_date,
-			activity_date__lte=today
-		).prefetch_related('skills')
-		
-		# Calculate total stats
-		total_activities = activities.count()
-		total_minutes = sum(a.duration_minutes or 0 for a in activities)
-		total_hours = total_minutes // 60
-		remaining_minutes = total_minutes % 60
-		
-		# Calculate activities per week
-		days_in_range = (today - start_date).days
-		weeks_in_range = max(days_in_range / 7, 1)
-		activities_per_week = round(total_activities / weeks_in_range, 1)
-		
-		# Get skill distribution
-		skill_counts = {}
-		for activity in activities:
-			for skill in activity.skills.all():
-				skill_counts[skill.name] = skill_counts.get(skill.name, 0) + 1
-		
-		# Sort skills by count
-		sorted_skills = sorted(skill_counts.items(), key=lambda x: x[1], reverse=True)
-		
-		# Generate growth highlights
-		growth_highlights = []
-		if sorted_skills:
-			top_skill = sorted_skills[0][0]
-			growth_highlights.append(f"{top_skill} activities have been thriving recently")
-		
-		if len(sorted_skills) >= 3:
-			growth_highlights.append(f"Balanced exploration across {len(sorted_skills)} skill areas")
-		elif len(sorted_skills) == 0:
-			growth_highlights.append("Ready to start exploring new activities together!")
-		
-		# Monthly breakdown for chart
-		monthly_data = []
-		current_month = start_date.replace(day=1)
-		
-		while current_month <= today.replace(day=1):
-			month_end = (current_month + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-			month_activities = activities.filter(
-				activity_date__gte=current_month,
-				activity_date__lte=min(month_end, today)
+		cached = cached_skill_cooccurrence(child, get_subscription(request.user).plan, start, end, vis_start)
+		return cached.apply_to(Response(cached.payload))
+
+
+class HeatmapView(APIView):
+	permission_classes = [permissions.IsAuthenticated]
+	throttle_cost = 2
+
+	def get(self, request):
+		child_id = request.query_params.get("child_id")
+		if not child_id:
+			return Response({"detail": "child_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+		today = date.today()
+		try:
+			end = date.fromisoformat(request.query_params.get("end", today.isoformat()))
+			start = date.fromisoformat(request.query_params.get("start", (end - timedelta(days=364)).isoformat()))
+		except ValueError:
+			return Response({"detail": "start and end must be YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+		if start > end:
+			return Response({"detail": "start must not be after end"}, status=status.HTTP_400_BAD_REQUEST)
+		if (end - start).days >= MAX_HEATMAP_DAYS:
+			return Response(
+				{"detail": f"A heatmap may span at most {MAX_HEATMAP_DAYS} days"}, status=status.HTTP_400_BAD_REQUEST
 			)
-			
-			month_skill_counts = {}
-			for activity in month_activities:
-				for skill in activity.skills.all():
-					month_skill_counts[skill.name] = month_skill_counts.get(skill.name, 0) + 1
-			
-			monthly_data.append({
-				"month": current_month.strftime("%B %Y"),
-				**month_skill_counts
-			})
-			
-			current_month = (current_month + timedelta(days=32)).replace(day=1)
-		
+
+		child = get_object_or_404(Child, id=child_id, user=request.user)
+		vis_start = get_visibility_start(request.user)
+		# A range that ends before the visibility window comes back empty.
+		start = clamp_to_visibility(start, vis_start)
 		return Response({
-			"total_activities": total_activities,
-			"total_hours": total_hours,
-			"total_minutes": remaining_minutes,
-			"activities_per_week": activities_per_week,
-			"skill_distribution": sorted_skills,
-			"growth_highlights": growth_highlights,
-			"monthly_data": monthly_data,
-			"time_range": time_range,
+			**build_heatmap(child, start, end, today),
 			"visibility_limited": vis_start is not None,
 			"visibility_start": str(vis_start) if vis_start else None,
 		})
 
 
-class ReflectionViewSet(viewsets.ModelViewSet):
+class ReportTimeSeriesView(APIView):
+	permission_classes = [permissions.IsAuthenticated]
+	throttle_cost = 3
+
+	def get(self, request):
+		child_id = request.query_params.get("child_id")
+		if not child_id:
+			return Response({"detail": "child_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+		today = date.today()
+		try:
+			end = date.fromisoformat(request.query_params.get("end", today.isoformat()))
+			start = date.fromisoformat(request.query_params.get("start", (end - timedelta(days=90)).isoformat()))
+		except ValueError:
+			return Response({"detail": "start and end must be YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+
+		child = get_object_or_404(Child, id=child_id, user=request.user)
+		try:
+			payload = build_timeseries(
+				child,
+				start,
+				end,
+				granularity=request.query_params.get("granularity", "month"),
+				include_duration=request.query_params.get("include_duration") in ("1", "true"),
+				vis_start=get_visibility_start(request.user),
+			)
+		except TimeSeriesError as exc:
+			return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+		return Response(payload)
+
+
+class TrendsView(APIView):
+	permission_classes = [permissions.IsAuthenticated]
+	throttle_cost = 3
+
+	def get(self, request):
+		child_id = request.query_params.get("child_id")
+		if not child_id:
+			return Response({"detail": "child_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+		if not get_plan_info(request.user)["long_term_trends"]:
+			return Response(
+				{"detail": "Long-term trends are available on the Plus plan. Upgrade to unlock this feature."},
+				status=status.HTTP_403_FORBIDDEN,
+			)
+
+		params = request.query_params
+		try:
+			start = date.fromisoformat(params["start"]) if "start" in params else None
+			end = date.fromisoformat(params["end"]) if "end" in params else date.today()
+			max_points = min(max(int(params.get("max_points", DEFAULT_MAX_POINTS)), 2), MAX_TREND_POINTS)
+			window = min(max(int(params.get("window", DEFAULT_WINDOW)), 1), 52)
+		except ValueError:
+			return Response(
+				{"detail": "start/end must be YYYY-MM-DD; max_points and window must be integers"},
+				status=status.HTTP_400_BAD_REQUEST,
+			)
+		if start is not None and start > end:
+			return Response({"detail": "start must not be after end"}, status=status.HTTP_400_BAD_REQUEST)
+
+		child = get_object_or_404(Child, id=child_id, user=request.user)
+		return Response(build_trends(child, start, end, max_points=max_points, window=window))
+
+
+class ReflectionViewSet(DataVersionETagMixin, viewsets.ModelViewSet):
 	serializer_class = ReflectionSerializer
 	permission_classes = [permissions.IsAuthenticated]
 	
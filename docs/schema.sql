@@ -55,7 +55,14 @@ CREATE TABLE core_suggestion (
 
 CREATE INDEX idx_child_user_id ON core_child (user_id);
 CREATE INDEX idx_activity_child_id ON core_activity (child_id);
-CREATE INDEX idx_activity_date ON core_activity (activity_date);
 CREATE INDEX idx_activityskill_activity_id ON core_activityskill (activity_id);
 CREATE INDEX idx_activityskill_skill_id ON core_activityskill (skill_id);
 CREATE INDEX idx_suggestion_skill_id ON core_suggestion (skill_id);
+
+-- Composite indexes for the hot API filters (see core/query_plans.py)
+CREATE INDEX child_user_name_idx ON core_child (user_id, name);
+CREATE INDEX activity_child_date_idx ON core_activity (child_id, activity_date DESC, created_at DESC) INCLUDE (duration_minutes);
+CREATE INDEX activity_date_idx ON core_activity (activity_date DESC, created_at DESC, id DESC);
+CREATE INDEX activityskill_skill_idx ON core_activityskill (skill_id, activity_id);
+CREATE INDEX suggestion_skill_age_idx ON core_suggestion (skill_id, min_age, max_age);
+CREATE INDEX suggestion_age_idx ON core_suggestion (min_age, max_age);